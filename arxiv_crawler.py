@@ -1,12 +1,23 @@
 import os
+import re
+import gzip
 import json
 import time
+import math
+import hashlib
 import random
 import logging
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone 
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
 from pathlib import Path
 import schedule
 import arxiv
+import requests
 
 # 配置日志 - 解决中文乱码问题
 logging.basicConfig(
@@ -24,6 +35,21 @@ class Config:
     LAST_CRAWL_TIME_PATH = BASE_DIR / "last_crawl_time.json"
     FAILED_INTERVALS_PATH = BASE_DIR / "failed_intervals.json"
     
+    # 追加写入存储：新论文先写入分段文件，全局 arxiv_id 索引跨分片、跨运行持久化
+    STORE_DIR = BASE_DIR / "store"
+    SEGMENTS_DIR = STORE_DIR / "segments"
+    ID_INDEX_PATH = STORE_DIR / "arxiv_id_index.tsv"
+    CHANGES_LOG_PATH = STORE_DIR / "changes.jsonl"
+    SEGMENT_MAX_PAPERS = 2000
+    
+    # 分片粒度：weekly / monthly / yearly，可按年份单独覆盖
+    SHARD_GRANULARITY = "monthly"
+    SHARD_GRANULARITY_BY_YEAR = {
+        2024: "yearly"
+    }
+    # 分片格式：json（带 metadata 的单个JSON文档）或 jsonl（每行一篇论文，元数据写入 .meta.json 旁路文件）
+    SHARD_FORMAT = "json"
+    
     KEYWORDS = [
         "LLM", 
         "large language model"
@@ -34,42 +60,71 @@ class Config:
     END_DATE_2024 = datetime(2024, 12, 31, tzinfo=timezone.utc)
     START_DATE_2025 = datetime(2025, 1, 1, tzinfo=timezone.utc)
     
+    # arXiv API 地址，离线测试和压测时可指向本地替身服务（arxiv_mock_server.py）
+    ARXIV_API_URL = "https://export.arxiv.org/api/query?{}"
+    
     # 调整爬取参数
     MAX_RESULTS_PER_REQUEST = 25
-    BASE_DELAY = 30
+    BASE_DELAY = 30                 # 请求失败后重试前的冷却时间（秒）
     MAX_RETRIES = 5
+    # 并发爬取：多个区间共享同一个客户端和连接池，所有请求经过全局限速器
+    CRAWL_WORKERS = 4
+    REQUEST_INTERVAL = 3.0          # 全局请求最小间隔（秒），arXiv 要求不超过每3秒1次
     API_RESULT_LIMIT = 800
     INCREMENTAL_CHECK_HOUR = 12 
     
+    # 自适应区间规划：根据历史每日结果数合并稀疏日期、预先拆分密集日期
+    WINDOW_DENSITY_PATH = STORE_DIR / "window_density.json"
+    WINDOW_TARGET_RESULTS = 500     # 规划时每个区间的目标结果数
+    WINDOW_SPLIT_RATIO = 0.9        # 结果数达到 API_RESULT_LIMIT 的该比例时二分重查
+    MAX_WINDOW_DAYS = 7
+    MIN_WINDOW_MINUTES = 60
+    DEFAULT_DAILY_ESTIMATE = 150    # 没有历史数据时的每日结果数估计
+    
+    # 全量爬取断点续传：每完成一个区间追加一条记录，重启后跳过已完成的时间段
+    CRAWL_LEDGER_PATH = STORE_DIR / "crawl_ledger.jsonl"
+    
+    # 失败区间后台重试：指数退避 + 随机抖动，超过最大次数标记为永久失败
+    RETRY_POLL_INTERVAL = 300       # 后台线程检查到期任务的间隔（秒）
+    RETRY_BASE_DELAY = 600          # 第一次重试前的等待时间（秒），之后每次翻倍
+    RETRY_MAX_DELAY = 6 * 3600
+    RETRY_MAX_ATTEMPTS = 6
+    
+    # 本地元数据快照回填：按批读取快照行，由多个进程并行匹配关键词
+    BACKFILL_CHUNK_LINES = 5000
+    BACKFILL_WORKERS = 4
+    
+    # 爬取指标导出
+    METRICS_JSON_PATH = STORE_DIR / "crawl_metrics.json"
+    METRICS_PROM_PATH = STORE_DIR / "crawl_metrics.prom"
+    
     @classmethod
     def ensure_directories(cls):
         if not cls.BASE_DIR.exists():
             cls.BASE_DIR.mkdir(parents=True, exist_ok=True)
+        if not cls.SEGMENTS_DIR.exists():
+            cls.SEGMENTS_DIR.mkdir(parents=True, exist_ok=True)
         if not cls.FAILED_INTERVALS_PATH.exists():
             with open(cls.FAILED_INTERVALS_PATH, 'w', encoding='utf-8') as f:
                 json.dump([], f, ensure_ascii=False)
     
     @classmethod
-    def save_failed_interval(cls, start, end, error):
-        failed = {
-            "start": start.isoformat(),
-            "end": end.isoformat(),
-            "error": str(error),
-            # 优化：统一使用UTC时间记录
-            "record_time": datetime.now(timezone.utc).isoformat()
-        }
-        # 优化：使用更安全的文件写入方式，避免'r+'模式的风险
-        try:
-            with open(cls.FAILED_INTERVALS_PATH, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            data = []
-        
-        data.append(failed)
-        
-        with open(cls.FAILED_INTERVALS_PATH, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-
+    def get_shard_granularity(cls, year):
+        granularity = cls.SHARD_GRANULARITY_BY_YEAR.get(year, cls.SHARD_GRANULARITY)
+        if granularity not in ("weekly", "monthly", "yearly"):
+            raise ValueError(f"不支持的分片粒度: {granularity}")
+        return granularity
+    
+    @classmethod
+    def get_shard_suffix(cls):
+        if cls.SHARD_FORMAT not in ("json", "jsonl"):
+            raise ValueError(f"不支持的分片格式: {cls.SHARD_FORMAT}")
+        return f".{cls.SHARD_FORMAT}"
+    
+    @classmethod
+    def save_failed_interval(cls, start, end, error, job=None):
+        # 失败区间统一进入去重的重试队列，由后台线程按退避策略重试
+        failed_queue.add(start, end, error, job)
         logging.warning(f"已记录失败区间: {start.date()} 至 {end.date()}")
     
     @classmethod
@@ -98,6 +153,253 @@ class Config:
         return cls.START_DATE_2025
 
 
+# 失败区间重试队列
+class FailedIntervalQueue:
+    """
+    以 failed_intervals.json 为持久化的去重工作队列。
+    每条记录: {"start", "end", "error", "record_time", "status", "attempts", "next_retry", "job"}，
+    status 为 pending / resolved / failed；job 为区间所属的爬取任务，重试成功后据此写入完成记录。
+    队列常驻内存，只在状态变化时整体原子写回。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = None
+        self._lock = threading.RLock()
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = []
+        self._entries = []
+        for entry in data:
+            # 兼容旧格式：没有状态字段的记录视为待重试
+            entry.setdefault("status", "pending")
+            entry.setdefault("attempts", 0)
+            entry.setdefault("next_retry", entry.get("record_time"))
+            self._entries.append(entry)
+        return self._entries
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _backoff(attempts):
+        delay = min(Config.RETRY_BASE_DELAY * (2 ** attempts), Config.RETRY_MAX_DELAY)
+        return delay * random.uniform(0.5, 1.5)
+
+    def add(self, start, end, error, job=None):
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            entries = self._load()
+            for entry in entries:
+                if entry["status"] != "pending" or entry.get("job") != job:
+                    continue
+                # 已有待重试区间覆盖了该区间，只更新错误信息
+                if datetime.fromisoformat(entry["start"]) <= start and end <= datetime.fromisoformat(entry["end"]):
+                    entry["error"] = str(error)
+                    entry["record_time"] = now.isoformat()
+                    self._save()
+                    return
+            entries.append({
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "error": str(error),
+                # 优化：统一使用UTC时间记录
+                "record_time": now.isoformat(),
+                "status": "pending",
+                "attempts": 0,
+                "next_retry": (now + timedelta(seconds=self._backoff(0))).isoformat(),
+                "job": job
+            })
+            self._save()
+
+    def due(self, now=None):
+        """返回已到重试时间的待重试区间"""
+        now = now or datetime.now(timezone.utc)
+        with self._lock:
+            return [
+                dict(entry) for entry in self._load()
+                if entry["status"] == "pending" and datetime.fromisoformat(entry["next_retry"]) <= now
+            ]
+
+    def _find(self, entry):
+        for candidate in self._load():
+            if candidate["start"] == entry["start"] and candidate["end"] == entry["end"] and candidate["status"] == "pending":
+                return candidate
+        return None
+
+    def mark_resolved(self, entry, count):
+        with self._lock:
+            target = self._find(entry)
+            if target is None:
+                return
+            target["status"] = "resolved"
+            target["attempts"] += 1
+            target["resolved_count"] = count
+            target["resolved_time"] = datetime.now(timezone.utc).isoformat()
+            self._save()
+
+    def mark_retry_failed(self, entry, error):
+        """记录一次重试失败，返回更新后的状态"""
+        with self._lock:
+            target = self._find(entry)
+            if target is None:
+                return None
+            target["attempts"] += 1
+            target["error"] = str(error)
+            if target["attempts"] >= Config.RETRY_MAX_ATTEMPTS:
+                target["status"] = "failed"
+            else:
+                next_retry = datetime.now(timezone.utc) + timedelta(seconds=self._backoff(target["attempts"]))
+                target["next_retry"] = next_retry.isoformat()
+            self._save()
+            return target["status"]
+
+    def counts(self):
+        with self._lock:
+            result = {"pending": 0, "resolved": 0, "failed": 0}
+            for entry in self._load():
+                result[entry["status"]] = result.get(entry["status"], 0) + 1
+            return result
+
+
+failed_queue = FailedIntervalQueue(Config.FAILED_INTERVALS_PATH)
+
+
+# 爬取指标
+class CrawlMetrics:
+    """
+    线程安全的爬取指标收集器。计数器从进程启动开始累计（对应 Prometheus counter 语义），
+    begin_run/export 之间记录的区间明细和计数器增量构成一次运行的统计。
+    导出为 JSON 文件（METRICS_JSON_PATH）和 Prometheus 文本格式文件（METRICS_PROM_PATH）。
+    """
+
+    COUNTERS = {
+        "api_pages": "成功请求的API页数",
+        "api_retries": "API请求重试次数",
+        "api_errors": "API请求失败次数",
+        "api_seconds": "API请求累计耗时（秒）",
+        "windows": "完成的查询区间数",
+        "windows_failed": "存在失败请求的查询区间数",
+        "papers_fetched": "从API获取的论文数",
+        "papers_added": "新增写入存储的论文数",
+        "papers_updated": "更新到新版本的论文数",
+        "bytes_written": "写入分片、分段文件的字节数",
+        "shard_rewrites": "分片整体重写次数",
+        "shard_rewrite_seconds": "分片整体重写累计耗时（秒）",
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {name: 0 for name in self.COUNTERS}
+        self._run_label = None
+        self._run_started = None
+        self._run_base = dict(self._counters)
+        self._run_windows = []
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def begin_run(self, label):
+        with self._lock:
+            self._run_label = label
+            self._run_started = time.monotonic()
+            self._run_base = dict(self._counters)
+            self._run_windows = []
+
+    def record_window(self, start, end, papers, added, updated, complete, seconds):
+        with self._lock:
+            self._counters["windows"] += 1
+            if not complete:
+                self._counters["windows_failed"] += 1
+            self._counters["papers_fetched"] += papers
+            self._counters["papers_added"] += added
+            self._counters["papers_updated"] += updated
+            self._run_windows.append({
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "papers": papers,
+                "added": added,
+                "updated": updated,
+                "complete": complete,
+                "seconds": round(seconds, 3),
+                "papers_per_second": round(papers / seconds, 3) if seconds > 0 else None
+            })
+
+    @staticmethod
+    def _percentile(values, q):
+        if not values:
+            return None
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = time.monotonic() - self._run_started if self._run_started else 0.0
+            run_counters = {name: self._counters[name] - self._run_base[name] for name in self.COUNTERS}
+            latencies = [w["seconds"] for w in self._run_windows]
+            return {
+                "run": {
+                    "label": self._run_label,
+                    "finished_at": datetime.now(timezone.utc).isoformat(),
+                    "elapsed_seconds": round(elapsed, 3),
+                    "papers_per_second": round(run_counters["papers_fetched"] / elapsed, 3) if elapsed > 0 else None,
+                    "window_seconds_p50": self._percentile(latencies, 0.5),
+                    "window_seconds_p95": self._percentile(latencies, 0.95),
+                    "window_seconds_max": max(latencies) if latencies else None,
+                    "counters": run_counters,
+                    "windows": list(self._run_windows)
+                },
+                "totals": dict(self._counters)
+            }
+
+    def to_prometheus(self, snapshot):
+        lines = []
+        for name, help_text in self.COUNTERS.items():
+            metric = f"arxiv_crawler_{name}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {snapshot['totals'][name]}")
+        run = snapshot["run"]
+        label = (run["label"] or "").replace('"', '')
+        for name in ("elapsed_seconds", "papers_per_second", "window_seconds_p50", "window_seconds_p95", "window_seconds_max"):
+            if run[name] is None:
+                continue
+            metric = f"arxiv_crawler_last_run_{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f'{metric}{{run="{label}"}} {run[name]}')
+        return "\n".join(lines) + "\n"
+
+    def export(self):
+        """把当前运行的统计写入 JSON 和 Prometheus 文本文件"""
+        snapshot = self.snapshot()
+        Config.METRICS_JSON_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(Config.METRICS_JSON_PATH, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=2)
+        with open(Config.METRICS_PROM_PATH, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus(snapshot))
+        run = snapshot["run"]
+        logging.info(
+            f"[{run['label']}] 指标已导出：耗时 {run['elapsed_seconds']} 秒，API页数 {run['counters']['api_pages']}，"
+            f"重试 {run['counters']['api_retries']} 次，吞吐 {run['papers_per_second']} 篇/秒，"
+            f"写入 {run['counters']['bytes_written']} 字节，分片重写耗时 {round(run['counters']['shard_rewrite_seconds'], 3)} 秒"
+        )
+        return snapshot
+
+
+crawl_metrics = CrawlMetrics()
+
+
 # 数据处理函数
 def format_paper_data(arxiv_result):
     # 优化：直接使用从API获取的、带时区的datetime对象
@@ -115,15 +417,45 @@ def format_paper_data(arxiv_result):
 
 def get_file_path_for_date(publish_date):
     year = publish_date.year
-    month = publish_date.month
-    if year == 2024:
-        return Config.BASE_DIR / "arxiv_2024_llm_papers.json"
-    elif year == 2025:
-        return Config.BASE_DIR / f"arxiv_2025_{month:02d}_llm_papers.json"
+    granularity = Config.get_shard_granularity(year)
+    suffix = Config.get_shard_suffix()
+    if granularity == "yearly":
+        return Config.BASE_DIR / f"arxiv_{year}_llm_papers{suffix}"
+    elif granularity == "weekly":
+        iso_year, iso_week, _ = publish_date.isocalendar()
+        return Config.BASE_DIR / f"arxiv_{iso_year}_w{iso_week:02d}_llm_papers{suffix}"
     else:
-        return Config.BASE_DIR / f"arxiv_{year}_{month:02d}_llm_papers.json"
+        return Config.BASE_DIR / f"arxiv_{year}_{publish_date.month:02d}_llm_papers{suffix}"
+
+def get_metadata_path(file_path):
+    """JSONL 分片的元数据旁路文件：arxiv_xxx_llm_papers.jsonl -> arxiv_xxx_llm_papers.meta.json"""
+    return file_path.with_name(f"{file_path.stem}.meta.json")
+
+def build_metadata(total_papers):
+    return {
+        # 优化：统一使用UTC时间记录
+        "last_updated": datetime.now(timezone.utc).isoformat(),
+        "total_papers": total_papers,
+        "source": "arXiv",
+        "keywords": Config.KEYWORDS
+    }
+
+def iter_jsonl_papers(file_path):
+    """逐行读取 JSONL 文件，跳过中断写入留下的损坏行"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # 进程中断可能留下半行，跳过即可，对应论文未写入索引，会在下次爬取时重新写入
+                logging.warning(f"文件 {file_path} 中存在损坏的行，已跳过")
 
 def load_existing_papers(file_path):
+    if file_path.suffix == ".jsonl":
+        return list(iter_jsonl_papers(file_path)) if file_path.exists() else []
     if file_path.exists():
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
@@ -135,59 +467,362 @@ def load_existing_papers(file_path):
     return []
 
 def save_papers_to_file(papers, file_path):
+    rewrite_start = time.monotonic()
     sorted_papers = sorted(
         papers, 
         key=lambda x: x['published'], 
         reverse=True
     )
-    data = {
-        "metadata": {
-            # 优化：统一使用UTC时间记录
-            "last_updated": datetime.now(timezone.utc).isoformat(),
-            "total_papers": len(sorted_papers),
-            "source": "arXiv",
-            "keywords": Config.KEYWORDS
-        },
-        "papers": sorted_papers
-    }
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    # 先写临时文件再替换，避免合并过程中断导致分片损坏
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        if file_path.suffix == ".jsonl":
+            for paper in sorted_papers:
+                f.write(json.dumps(paper, ensure_ascii=False) + "\n")
+        else:
+            data = {
+                "metadata": build_metadata(len(sorted_papers)),
+                "papers": sorted_papers
+            }
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        written = f.tell()
+    os.replace(tmp_path, file_path)
+    if file_path.suffix == ".jsonl":
+        save_metadata(file_path, len(sorted_papers))
+    crawl_metrics.inc("bytes_written", written)
+    crawl_metrics.inc("shard_rewrites")
+    crawl_metrics.inc("shard_rewrite_seconds", time.monotonic() - rewrite_start)
     logging.info(f"已保存 {len(sorted_papers)} 篇论文到 {file_path}")
 
+def save_metadata(file_path, total_papers):
+    with open(get_metadata_path(file_path), 'w', encoding='utf-8') as f:
+        json.dump(build_metadata(total_papers), f, ensure_ascii=False, indent=2)
+
+def append_papers_to_jsonl(papers, file_path):
+    """向 JSONL 分片追加论文并更新旁路元数据，成本只与新论文数量相关"""
+    meta_path = get_metadata_path(file_path)
+    total = None
+    if meta_path.exists():
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                total = json.load(f)["total_papers"]
+        except (json.JSONDecodeError, KeyError):
+            logging.warning(f"元数据文件 {meta_path} 损坏，将重新统计论文数")
+    if total is None:
+        total = sum(1 for _ in iter_jsonl_papers(file_path)) if file_path.exists() else 0
+    with open(file_path, 'a', encoding='utf-8') as f:
+        offset = f.tell()
+        for paper in papers:
+            f.write(json.dumps(paper, ensure_ascii=False) + "\n")
+        crawl_metrics.inc("bytes_written", f.tell() - offset)
+    save_metadata(file_path, total + len(papers))
+
+
+def split_arxiv_id(arxiv_id):
+    """'2508.01234v2' -> ('2508.01234', 2)；没有版本号的 id 版本视为 0"""
+    match = re.match(r'^(.+?)v(\d+)$', arxiv_id)
+    if match:
+        return match.group(1), int(match.group(2))
+    return arxiv_id, 0
+
+
+class PaperStore:
+    """
+    追加写入的论文存储。
+    1. 新论文按分片追加到 store/segments/<分片文件名>/ 下的 JSONL 分段文件，写入成本只与新论文数量相关。
+       SHARD_FORMAT 为 jsonl 时分片本身就支持追加，新论文直接写入分片。
+    2. 全局 arxiv_id 索引（arxiv_id_index.tsv）同样只追加，以去掉版本号的基础 id 为键，跨分片、跨运行去重。
+       同一论文出现更高版本时执行 upsert：新版本写入分段，合并时替换旧版本，变更记录写入 changes.jsonl。
+    3. compact() 将分段合并回分片文件，每次爬取任务结束时执行一次，而不是每个区间执行一次。
+    """
+
+    def __init__(self):
+        # 基础 id -> (版本号, 分片文件名)
+        self._index = None
+        self._segment_counts = {}
+        self._lock = threading.RLock()
+
+    def _segments_dir_for(self, shard_path):
+        return Config.SEGMENTS_DIR / shard_path.name
+
+    def _index_paper(self, arxiv_id, shard_name):
+        base_id, version = split_arxiv_id(arxiv_id)
+        current = self._index.get(base_id)
+        if current is None or current[0] <= version:
+            self._index[base_id] = (version, shard_name)
+
+    def _load_index(self):
+        if self._index is not None:
+            return self._index
+        self._index = {}
+        if Config.ID_INDEX_PATH.exists():
+            with open(Config.ID_INDEX_PATH, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.rstrip('\n').split('\t')
+                    if len(parts) == 2:
+                        self._index_paper(parts[0], parts[1])
+        else:
+            self._rebuild_index()
+        return self._index
+
+    def _rebuild_index(self):
+        # 首次启用时扫描已有分片和分段，生成索引文件
+        logging.info("未找到 arxiv_id 索引，正在根据已有分片重建...")
+        shard_paths = list(Config.BASE_DIR.glob("arxiv_*_llm_papers.json")) + list(Config.BASE_DIR.glob("arxiv_*_llm_papers.jsonl"))
+        for shard_path in sorted(shard_paths):
+            for paper in load_existing_papers(shard_path):
+                self._index_paper(paper['arxiv_id'], shard_path.name)
+        for shard_path in self.pending_shards():
+            for segment_path in sorted(self._segments_dir_for(shard_path).glob("*.jsonl")):
+                for paper in iter_jsonl_papers(segment_path):
+                    self._index_paper(paper['arxiv_id'], shard_path.name)
+
+        Config.ID_INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(Config.ID_INDEX_PATH, 'w', encoding='utf-8') as f:
+            for base_id, (version, shard_name) in self._index.items():
+                arxiv_id = f"{base_id}v{version}" if version else base_id
+                f.write(f"{arxiv_id}\t{shard_name}\n")
+        logging.info(f"arxiv_id 索引重建完成，共 {len(self._index)} 条")
+
+    def contains(self, arxiv_id):
+        """判断该论文（任意版本）是否已存储"""
+        with self._lock:
+            return split_arxiv_id(arxiv_id)[0] in self._load_index()
+
+    def _append_segment(self, shard_path, papers):
+        segments_dir = self._segments_dir_for(shard_path)
+        segments_dir.mkdir(parents=True, exist_ok=True)
+
+        # 只在首次写入该分片时统计最后一个分段的行数，之后在内存中累加
+        if shard_path not in self._segment_counts:
+            existing = sorted(segments_dir.glob("*.jsonl"))
+            if existing:
+                seq = int(existing[-1].stem)
+                with open(existing[-1], 'r', encoding='utf-8') as f:
+                    count = sum(1 for _ in f)
+            else:
+                seq, count = 1, 0
+            self._segment_counts[shard_path] = [seq, count]
+
+        seq, count = self._segment_counts[shard_path]
+        if count >= Config.SEGMENT_MAX_PAPERS:
+            seq, count = seq + 1, 0
+
+        with open(segments_dir / f"{seq:06d}.jsonl", 'a', encoding='utf-8') as f:
+            offset = f.tell()
+            for paper in papers:
+                f.write(json.dumps(paper, ensure_ascii=False) + "\n")
+            crawl_metrics.inc("bytes_written", f.tell() - offset)
+        self._segment_counts[shard_path] = [seq, count + len(papers)]
+
+    def _append_index(self, shard_path, papers):
+        with open(Config.ID_INDEX_PATH, 'a', encoding='utf-8') as f:
+            for paper in papers:
+                f.write(f"{paper['arxiv_id']}\t{shard_path.name}\n")
+                self._index_paper(paper['arxiv_id'], shard_path.name)
+
+    def _append_changes(self, changes):
+        now = datetime.now(timezone.utc).isoformat()
+        with open(Config.CHANGES_LOG_PATH, 'a', encoding='utf-8') as f:
+            for change in changes:
+                f.write(json.dumps(dict(change, time=now), ensure_ascii=False) + "\n")
+
+    def add(self, new_papers):
+        """
+        按基础 id 执行 upsert：新论文追加，更高版本替换旧版本，相同或更低版本忽略。
+        返回 {"added": [...], "updated": [...]}，元素为变更记录 {"arxiv_id", "previous_id", "shard", "change"}。
+        """
+        with self._lock:
+            return self._add(new_papers)
+
+    def _add(self, new_papers):
+        index = self._load_index()
+
+        # 同一批次中同一论文出现多个版本时只保留最新版本
+        latest = {}
+        for paper in new_papers:
+            base_id, version = split_arxiv_id(paper['arxiv_id'])
+            if base_id not in latest or latest[base_id][0] < version:
+                latest[base_id] = (version, paper)
+
+        new_by_file = {}
+        updated_by_file = {}
+        changes = {"added": [], "updated": []}
+        for base_id, (version, paper) in latest.items():
+            if base_id in index:
+                old_version, old_shard = index[base_id]
+                if version <= old_version:
+                    continue
+                # 新版本写回旧版本所在的分片，合并时替换
+                file_path = Config.BASE_DIR / old_shard
+                updated_by_file.setdefault(file_path, []).append(paper)
+                previous_id = f"{base_id}v{old_version}" if old_version else base_id
+                changes["updated"].append({"arxiv_id": paper['arxiv_id'], "previous_id": previous_id, "shard": old_shard, "change": "updated"})
+            else:
+                publish_date = datetime.fromisoformat(paper['published'])
+                file_path = get_file_path_for_date(publish_date)
+                new_by_file.setdefault(file_path, []).append(paper)
+                changes["added"].append({"arxiv_id": paper['arxiv_id'], "previous_id": None, "shard": file_path.name, "change": "added"})
+
+        # 先写数据再写索引：中途中断时最多产生重复行，合并时会按基础 id 去重
+        for file_path, papers in new_by_file.items():
+            if file_path.suffix == ".jsonl":
+                append_papers_to_jsonl(papers, file_path)
+            else:
+                self._append_segment(file_path, papers)
+            self._append_index(file_path, papers)
+            logging.info(f"成功向 {file_path} 追加了 {len(papers)} 篇新论文。")
+
+        for file_path, papers in updated_by_file.items():
+            # 更新的论文无论分片格式都先写入分段，合并时替换旧版本，避免分片中同一论文出现多行
+            self._append_segment(file_path, papers)
+            self._append_index(file_path, papers)
+            logging.info(f"{file_path} 中有 {len(papers)} 篇论文更新到了新版本。")
+
+        if changes["added"] or changes["updated"]:
+            self._append_changes(changes["added"] + changes["updated"])
+        return changes
+
+    def pending_shards(self):
+        """返回存在未合并分段的分片路径"""
+        if not Config.SEGMENTS_DIR.exists():
+            return []
+        return [
+            Config.BASE_DIR / segments_dir.name
+            for segments_dir in sorted(Config.SEGMENTS_DIR.iterdir())
+            if segments_dir.is_dir() and any(segments_dir.glob("*.jsonl"))
+        ]
+
+    def compact(self, shard_paths=None):
+        """将分段合并回分片文件，默认合并所有存在分段的分片"""
+        with self._lock:
+            self._compact(shard_paths)
+
+    def _compact(self, shard_paths):
+        if shard_paths is None:
+            shard_paths = self.pending_shards()
+
+        for shard_path in shard_paths:
+            segments_dir = self._segments_dir_for(shard_path)
+            segment_paths = sorted(segments_dir.glob("*.jsonl"))
+            if not segment_paths:
+                continue
+
+            # 按基础 id 合并，同一论文只保留最高版本（同版本以后写入的为准）
+            papers_by_base = {}
+            versions = {}
+            def keep(paper):
+                base_id, version = split_arxiv_id(paper['arxiv_id'])
+                if versions.get(base_id, -1) <= version:
+                    papers_by_base[base_id] = paper
+                    versions[base_id] = version
+
+            for paper in load_existing_papers(shard_path):
+                keep(paper)
+            before = len(papers_by_base)
+            for segment_path in segment_paths:
+                for paper in iter_jsonl_papers(segment_path):
+                    keep(paper)
+
+            save_papers_to_file(list(papers_by_base.values()), shard_path)
+            for segment_path in segment_paths:
+                segment_path.unlink()
+            if not any(segments_dir.iterdir()):
+                segments_dir.rmdir()
+            self._segment_counts.pop(shard_path, None)
+            logging.info(f"分片 {shard_path} 合并完成，新增 {len(papers_by_base) - before} 篇论文")
+
+
+paper_store = PaperStore()
+
 def add_new_papers(new_papers):
-    papers_to_add_by_file = {}
-    for paper in new_papers:
-        publish_date = datetime.fromisoformat(paper['published'])
-        file_path = get_file_path_for_date(publish_date)
-        if file_path not in papers_to_add_by_file:
-            papers_to_add_by_file[file_path] = []
-        papers_to_add_by_file[file_path].append(paper)
-
-    for file_path, papers in papers_to_add_by_file.items():
-        existing_papers = load_existing_papers(file_path)
-        existing_ids = {p['arxiv_id'] for p in existing_papers}
-        
-        unique_new = [p for p in papers if p['arxiv_id'] not in existing_ids]
-        
-        if unique_new:
-            all_papers = existing_papers + unique_new
-            save_papers_to_file(all_papers, file_path)
-            logging.info(f"成功向 {file_path} 添加了 {len(unique_new)} 篇新论文。")
+    return paper_store.add(new_papers)
+
+# 全局限速与共享客户端
+class RateLimiter:
+    """线程安全的全局限速器：保证任意两次请求之间至少间隔 interval 秒"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._next_time - now)
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class RateLimitedClient(arxiv.Client):
+    """
+    所有爬取线程共享的 arXiv 客户端。
+    arxiv.Client 自带的延时只针对单个客户端且不是线程安全的，这里把它关掉，
+    改由全局限速器控制总请求速率，并复用同一个连接池。
+    """
+
+    def __init__(self, limiter, pool_size):
+        super().__init__(
+            page_size=Config.MAX_RESULTS_PER_REQUEST,
+            delay_seconds=0,
+            num_retries=Config.MAX_RETRIES
+        )
+        self.limiter = limiter
+        self.query_url_format = Config.ARXIV_API_URL
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    def _parse_feed(self, url, first_page=True, _try_index=0):
+        # 父类在失败重试时会递归调用本方法，因此每次重试同样经过冷却和限速
+        if _try_index > 0:
+            crawl_metrics.inc("api_retries")
+            time.sleep(Config.BASE_DELAY)
+        self.limiter.acquire()
+        request_start = time.monotonic()
+        try:
+            feed = super()._parse_feed(url, first_page=first_page, _try_index=_try_index)
+        except Exception:
+            # 父类内部递归重试，只在最外层统计一次失败
+            if _try_index == 0:
+                crawl_metrics.inc("api_errors")
+            raise
+        finally:
+            if _try_index == 0:
+                crawl_metrics.inc("api_seconds", time.monotonic() - request_start)
+        if _try_index == 0:
+            crawl_metrics.inc("api_pages")
+        return feed
+
+
+_client_lock = threading.Lock()
+_shared_client = None
+
+def get_arxiv_client():
+    global _shared_client
+    with _client_lock:
+        if _shared_client is None:
+            _shared_client = RateLimitedClient(
+                RateLimiter(Config.REQUEST_INTERVAL),
+                pool_size=Config.CRAWL_WORKERS
+            )
+        return _shared_client
+
 
 # 核心爬取函数
-def search_arxiv_papers(start_date, end_date, max_results=None):
+def _fetch_papers(start_date, end_date, papers, max_results=None):
+    """查询 [start_date, end_date) 区间并把结果追加到 papers，出错时直接抛出（已获取的结果保留在 papers 中）"""
     keyword_queries = [f'ti:"{kw}"' for kw in Config.KEYWORDS] + [f'abs:"{kw}"' for kw in Config.KEYWORDS]
     query = f"({ ' OR '.join(keyword_queries) })"
-    start_str = start_date.strftime("%Y%m%d")
-    end_str = end_date.strftime("%Y%m%d")
+    # submittedDate 的上下界都是闭区间（精确到分钟），结束时间减去1分钟得到半开区间
+    start_str = start_date.strftime("%Y%m%d%H%M")
+    end_str = (end_date - timedelta(minutes=1)).strftime("%Y%m%d%H%M")
     query += f" AND submittedDate:[{start_str} TO {end_str}]"
-    logging.info(f"搜索查询: 时间范围：{start_date.date()} 至 {end_date.date()}")
+    logging.info(f"搜索查询: 时间范围：{start_date.isoformat()} 至 {end_date.isoformat()}")
     
-    client = arxiv.Client(
-        page_size=Config.MAX_RESULTS_PER_REQUEST,
-        delay_seconds=Config.BASE_DELAY,
-        num_retries=Config.MAX_RETRIES
-    )
+    client = get_arxiv_client()
     
     search = arxiv.Search(
         query=query,
@@ -196,100 +831,305 @@ def search_arxiv_papers(start_date, end_date, max_results=None):
         sort_order=arxiv.SortOrder.Descending
     )
     
+    found = 0
+    for result in client.results(search):
+        paper_data = format_paper_data(result)
+        papers.append(paper_data)
+        found += 1
+        
+        if found % 50 == 0:
+            logging.info(f"已找到 {found} 篇论文...")
+        
+        if max_results and found >= max_results:
+            break
+
+def search_arxiv_papers(start_date, end_date, max_results=None):
     papers = []
     try:
-        for result in client.results(search):
-            paper_data = format_paper_data(result)
-            papers.append(paper_data)
-            
-            if len(papers) % 50 == 0:
-                logging.info(f"已找到 {len(papers)} 篇论文...")
-            
-            if max_results and len(papers) >= max_results:
-                break
-    
+        _fetch_papers(start_date, end_date, papers, max_results)
     except Exception as e:
         logging.error(f"搜索过程中发生无法恢复的错误: {str(e)}，已获取 {len(papers)} 篇论文")
         Config.save_failed_interval(start_date, end_date, str(e))
     
     return papers
 
+def search_window(start, end, record_failure=True, job=None):
+    """
+    查询 [start, end) 区间，返回 (papers, complete)。
+    结果数接近 API_RESULT_LIMIT 时说明可能被截断，将区间二分后分别重查，直到 MIN_WINDOW_MINUTES。
+    complete 为 False 表示该区间有请求失败；record_failure 为 True 时失败的子区间会进入重试队列（连同所属的 job）。
+    """
+    papers = []
+    try:
+        _fetch_papers(start, end, papers, max_results=Config.API_RESULT_LIMIT)
+    except Exception as e:
+        logging.error(f"区间 {start.isoformat()}~{end.isoformat()} 查询失败: {str(e)}，已获取 {len(papers)} 篇论文")
+        if record_failure:
+            Config.save_failed_interval(start, end, str(e), job)
+        return papers, False
+
+    min_window = timedelta(minutes=Config.MIN_WINDOW_MINUTES)
+    if len(papers) >= Config.API_RESULT_LIMIT * Config.WINDOW_SPLIT_RATIO and end - start >= 2 * min_window:
+        mid = _floor_to_minute(start + (end - start) / 2)
+        logging.info(f"区间 {start.isoformat()}~{end.isoformat()} 返回 {len(papers)} 篇，接近上限，二分后重新查询")
+        left, left_complete = search_window(start, mid, record_failure, job)
+        right, right_complete = search_window(mid, end, record_failure, job)
+        # 二分前已获取的结果同样保留，重复的论文由存储层去重
+        merged = {p['arxiv_id']: p for p in papers + left + right}
+        return list(merged.values()), left_complete and right_complete
 
-# 时间范围拆分工具
-def split_time_range(start, end):
+    return papers, True
+
+
+# 时间范围拆分与规划工具
+def _floor_to_minute(dt):
+    return dt.replace(second=0, microsecond=0)
+
+def _next_midnight(dt):
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+def split_time_range(start, end, step=timedelta(days=1)):
+    """把 [start, end) 切分为首尾相接、互不重叠的半开区间"""
     ranges = []
     current_start = start
-    
-    while current_start <= end:
-        # 这样可以确保当天的数据能被完整获取。
-        current_end = current_start + timedelta(days=1)
-        # # 防止结束日期超出总范围
-        # if current_end > end:
-        #     current_end = end
-            
+    while current_start < end:
+        current_end = min(current_start + step, end)
         ranges.append((current_start, current_end))
-        
-        # 修正：循环步进一天，确保不会跳日。
-        # 虽然会有1天的重叠查询，但add_new_papers函数会去重。
-        current_start = current_start + timedelta(days=1)
-
-        # 如果开始日期已经等于结束日期，说明已经处理了最后一天，可以退出循环
-        if current_start > current_end:
-            break
-    
+        current_start = current_end
     return ranges
 
+def load_window_density():
+    """读取历史每日结果数 {"YYYY-MM-DD": 每日结果数}"""
+    if Config.WINDOW_DENSITY_PATH.exists():
+        try:
+            with open(Config.WINDOW_DENSITY_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            logging.warning("区间密度文件损坏，使用默认估计值")
+    return {}
+
+def save_window_density(density):
+    Config.WINDOW_DENSITY_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with open(Config.WINDOW_DENSITY_PATH, 'w', encoding='utf-8') as f:
+        json.dump(density, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+def record_window_density(density, start, end, count):
+    """把一个完整区间的结果数换算为每日结果数，记到区间覆盖的每一天上"""
+    days = (end - start).total_seconds() / 86400
+    if days <= 0:
+        return
+    per_day = count / days
+    current = start
+    while current < end:
+        density[current.date().isoformat()] = round(per_day, 2)
+        current = _next_midnight(current)
+
+def plan_time_windows(start, end, density=None):
+    """
+    根据历史每日结果数规划 [start, end) 的查询区间：
+    - 稀疏的日期合并成更宽的区间（不超过 MAX_WINDOW_DAYS），减少API调用次数
+    - 单日估计就超过 WINDOW_TARGET_RESULTS 的日期预先等分，避免触发结果上限
+    - 所有区间首尾相接、互不重叠
+    """
+    if density is None:
+        density = load_window_density()
+    default_estimate = (sum(density.values()) / len(density)) if density else Config.DEFAULT_DAILY_ESTIMATE
+    target = Config.WINDOW_TARGET_RESULTS
+    max_span = timedelta(days=Config.MAX_WINDOW_DAYS)
+
+    windows = []
+    window_start = start
+    window_estimate = 0.0
+    current = start
+    while current < end:
+        day_end = min(_next_midnight(current), end)
+        day_fraction = (day_end - current).total_seconds() / 86400
+        day_estimate = density.get(current.date().isoformat(), default_estimate) * day_fraction
+
+        if day_estimate > target:
+            # 先结束正在累积的区间，再把密集的这一天等分
+            if current > window_start:
+                windows.append((window_start, current))
+            parts = math.ceil(day_estimate / target)
+            step = _floor_to_minute(current + (day_end - current) / parts) - current
+            step = max(step, timedelta(minutes=Config.MIN_WINDOW_MINUTES))
+            windows.extend(split_time_range(current, day_end, step))
+            window_start, window_estimate = day_end, 0.0
+        elif current > window_start and (window_estimate + day_estimate > target or day_end - window_start > max_span):
+            windows.append((window_start, current))
+            window_start, window_estimate = current, day_estimate
+        else:
+            window_estimate += day_estimate
+        current = day_end
+
+    if window_start < end:
+        windows.append((window_start, end))
+    return windows
+
+
+# 区间完成记录（断点续传）
+class CrawlLedger:
+    """
+    只追加写入的区间完成记录，每行对应一个已完整爬取并写入存储的区间：
+    {"job", "start", "end", "count", "checksum", "completed_at"}，checksum 为排序后 arxiv_id 列表的 SHA-1。
+    全量爬取重启时按记录求出尚未覆盖的时间段，只对这些时间段重新规划区间。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def checksum(papers):
+        ids = sorted(p['arxiv_id'] for p in papers)
+        return hashlib.sha1("\n".join(ids).encode('utf-8')).hexdigest()
+
+    def record(self, job, start, end, papers):
+        entry = {
+            "job": job,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "count": len(papers),
+            "checksum": self.checksum(papers),
+            "completed_at": datetime.now(timezone.utc).isoformat()
+        }
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def entries(self, job):
+        if not self.path.exists():
+            return []
+        entries = []
+        with self._lock, open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 写入过程中被中断的最后一行，视为该区间未完成
+                    continue
+                if entry.get("job") == job:
+                    entries.append(entry)
+        return entries
+
+    def pending_ranges(self, job, start, end):
+        """返回 [start, end) 中尚未被已完成区间覆盖的时间段"""
+        done = sorted(
+            (datetime.fromisoformat(e["start"]), datetime.fromisoformat(e["end"]))
+            for e in self.entries(job)
+        )
+        pending = []
+        current = start
+        for done_start, done_end in done:
+            if done_end <= current:
+                continue
+            if done_start >= end:
+                break
+            if done_start > current:
+                pending.append((current, done_start))
+            current = max(current, done_end)
+        if current < end:
+            pending.append((current, end))
+        return pending
+
+
+crawl_ledger = CrawlLedger(Config.CRAWL_LEDGER_PATH)
+
+def plan_pending_windows(job, start, end):
+    """跳过记录中已完成的时间段，对剩余时间段规划查询区间"""
+    pending = crawl_ledger.pending_ranges(job, start, end)
+    if pending != [(start, end)]:
+        remaining = sum(((b - a) for a, b in pending), timedelta())
+        logging.info(f"[{job}] 从断点继续：剩余 {len(pending)} 个未完成时间段，共 {remaining}")
+    density = load_window_density()
+    return [window for a, b in pending for window in plan_time_windows(a, b, density)]
+
+
+# 并发爬取引擎
+def crawl_windows(time_ranges, label, workers=None, job=None):
+    """
+    并发爬取多个时间区间，所有线程共享同一个客户端和全局限速器。
+    每个区间完成后输出进度，并把完整区间的结果数记入区间密度供下次规划使用；
+    指定 job 时还会把完整区间写入完成记录，用于中断后续传。
+    返回 {"windows", "papers", "added", "updated", "failed"} 统计。
+    """
+    workers = workers or Config.CRAWL_WORKERS
+    total = len(time_ranges)
+    stats = {"windows": total, "papers": 0, "added": 0, "updated": 0, "failed": 0}
+    if total == 0:
+        return stats
+
+    def crawl_one(start, end):
+        window_start_time = time.monotonic()
+        papers, complete = search_window(start, end, job=job)
+        changes = add_new_papers(papers) if papers else {"added": [], "updated": []}
+        # 论文写入分段文件之后再记录完成，保证记录中的区间数据一定已落盘
+        if complete and job:
+            crawl_ledger.record(job, start, end, papers)
+        return len(papers), len(changes["added"]), len(changes["updated"]), complete, time.monotonic() - window_start_time
+
+    density = load_window_density()
+
+    logging.info(f"[{label}] 共 {total} 个区间，并发数 {workers}")
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(crawl_one, start, end): (start, end) for start, end in time_ranges}
+        for future in as_completed(futures):
+            start, end = futures[future]
+            done += 1
+            try:
+                found, added, updated, complete, elapsed = future.result()
+                crawl_metrics.record_window(start, end, found, added, updated, complete, elapsed)
+                stats["papers"] += found
+                stats["added"] += added
+                stats["updated"] += updated
+                if complete:
+                    record_window_density(density, start, end, found)
+                else:
+                    stats["failed"] += 1
+                logging.info(
+                    f"[{label}] 进度 {done}/{total} - 区间 {start.isoformat()} 至 {end.isoformat()} 完成: "
+                    f"获取 {found} 篇，新增 {added} 篇，更新 {updated} 篇，耗时 {elapsed:.1f} 秒"
+                )
+            except Exception as e:
+                stats["failed"] += 1
+                logging.error(f"[{label}] 进度 {done}/{total} - 区间 {start.isoformat()}~{end.isoformat()} 爬取失败: {str(e)}，继续下一个区间")
+                Config.save_failed_interval(start, end, str(e), job)
+
+    save_window_density(density)
+    logging.info(
+        f"[{label}] 全部区间完成：获取 {stats['papers']} 篇，新增 {stats['added']} 篇，更新 {stats['updated']} 篇，失败 {stats['failed']} 个区间"
+    )
+    return stats
+
 
 # 全量/增量爬取函数
 def full_crawl_2024():
     logging.info("开始全量爬取2024年的论文...")
-    time_ranges = split_time_range(Config.START_DATE_2024, Config.END_DATE_2024)
-    
-    for i, (start, end) in enumerate(time_ranges):
-        try:
-            logging.info(f"处理第 {i+1}/{len(time_ranges)} 个区间: {start.date()} 至 {end.date()}")
-            papers = search_arxiv_papers(start, end)
-            if papers:
-                add_new_papers(papers)
-        except Exception as e:
-            logging.error(f"区间 {start.date()}~{end.date()} 爬取失败: {str(e)}，继续下一个区间")
-            Config.save_failed_interval(start, end, str(e))
+    crawl_metrics.begin_run("full_2024")
+    # END_DATE_2024 为最后一天（含），半开区间的结束点取其后一天的零点
+    time_ranges = plan_pending_windows("full_2024", Config.START_DATE_2024, Config.END_DATE_2024 + timedelta(days=1))
+    crawl_windows(time_ranges, "2024全量", job="full_2024")
     
+    paper_store.compact()
+    crawl_metrics.export()
     logging.info("2024年论文全量爬取完成")
 
 def full_crawl_2025_until_now():
     logging.info("开始全量爬取2025年至当前日期的论文...")
+    crawl_metrics.begin_run("full_2025")
     # 优化：统一使用UTC时间
     current_date = datetime.now(timezone.utc)
     
-    # 动态确定要爬取的月份范围
-    start_month_date = Config.START_DATE_2025
-    while start_month_date <= current_date:
-        year = start_month_date.year
-        month = start_month_date.month
-        
-        # 计算当月最后一天
-        if month == 12:
-            end_of_month = datetime(year + 1, 1, 1, tzinfo=timezone.utc) - timedelta(days=1)
-        else:
-            end_of_month = datetime(year, month + 1, 1, tzinfo=timezone.utc) - timedelta(days=1)
-        
-        end_date_for_month = min(end_of_month, current_date)
-        
-        logging.info(f"开始处理 {year}年{month}月 的论文...")
-        time_ranges = split_time_range(start_month_date, end_date_for_month)
-        for sub_start, sub_end in time_ranges:
-            try:
-                papers = search_arxiv_papers(sub_start, sub_end)
-                if papers:
-                    add_new_papers(papers)
-            except Exception as e:
-                logging.error(f"子区间 {sub_start.date()}~{sub_end.date()} 爬取失败: {str(e)}，继续下一个子区间")
-                Config.save_failed_interval(sub_start, sub_end, str(e))
-        
-        # 前进到下一个月的第一天
-        start_month_date = end_of_month + timedelta(days=1)
+    # 区间由规划器按历史密度生成，可以跨月，论文写入时会按发布日期路由到对应分片
+    time_ranges = plan_pending_windows("full_2025", Config.START_DATE_2025, _floor_to_minute(current_date))
+    crawl_windows(time_ranges, "2025全量", job="full_2025")
 
+    paper_store.compact()
+    crawl_metrics.export()
     Config.save_last_crawl_time(current_date)
     logging.info("2025年至当前日期的论文全量爬取完成")
 
@@ -306,6 +1146,7 @@ def incremental_crawl():
     if (current_time - last_run_time) < timedelta(hours=1):
         logging.info("距离上次爬取不足1小时，跳过本次增量爬取")
         return
+    crawl_metrics.begin_run("incremental")
 
     # --- 1. 定义常规延时爬取的窗口 ---
     today_at_crawl_hour = current_time.replace(hour=Config.INCREMENTAL_CHECK_HOUR, minute=0, second=0, microsecond=0)
@@ -329,17 +1170,9 @@ def incremental_crawl():
 
         logging.info(f"检测到数据空缺，开始追赶爬取: {catch_up_start.isoformat()} 至 {catch_up_end.isoformat()}")
         
-        # 使用split_time_range来处理可能长达数天的追赶窗口
-        time_ranges = split_time_range(catch_up_start, catch_up_end)
-        for start, end in time_ranges:
-            try:
-                logging.info(f"追赶处理区间: {start.date()} 至 {end.date()}")
-                papers = search_arxiv_papers(start, end)
-                if papers:
-                    add_new_papers(papers)
-            except Exception as e:
-                logging.error(f"追赶区间 {start.date()}~{end.date()} 爬取失败: {str(e)}，继续下一个区间")
-                Config.save_failed_interval(start, end, str(e))
+        # 使用区间规划器来处理可能长达数天的追赶窗口
+        time_ranges = plan_time_windows(catch_up_start, catch_up_end)
+        crawl_windows(time_ranges, "追赶爬取")
         
         logging.info("追赶爬取完成。")
 
@@ -347,20 +1180,276 @@ def incremental_crawl():
     logging.info(f"开始常规延时增量爬取，目标日期窗口: {delayed_window_start.isoformat()} 至 {delayed_window_end.isoformat()}")
     
     try:
-        new_papers = search_arxiv_papers(delayed_window_start, delayed_window_end)
+        window_start_time = time.monotonic()
+        new_papers, complete = search_window(delayed_window_start, delayed_window_end)
+        changes = {"added": [], "updated": []}
         if new_papers:
             logging.info(f"在常规延时窗口中发现 {len(new_papers)} 篇新论文，正在添加...")
-            add_new_papers(new_papers)
-        else:
+            changes = add_new_papers(new_papers)
+        crawl_metrics.record_window(
+            delayed_window_start, delayed_window_end, len(new_papers),
+            len(changes["added"]), len(changes["updated"]), complete, time.monotonic() - window_start_time
+        )
+        if not new_papers:
             logging.info(f"在常规延时窗口中未发现新论文")
     except Exception as e:
         logging.error(f"常规延时增量爬取窗口 {delayed_window_start.date()}~{delayed_window_end.date()} 失败: {str(e)}")
         Config.save_failed_interval(delayed_window_start, delayed_window_end, str(e))
     
+    paper_store.compact()
+    crawl_metrics.export()
+
     # 4. 无论如何，都保存当前时间作为“最后一次运行”的时间戳
     Config.save_last_crawl_time(current_time)
 
 
+# 本地元数据快照回填
+def _keyword_pattern(keyword, raw=False):
+    words = [re.escape(word) for word in keyword.split()]
+    if raw:
+        # 原始 JSON 行中的换行是转义后的 \n，预筛选只需要是精确匹配的超集
+        return r'(?:\s|\\[nrt])+'.join(words)
+    # 近似 API 的分词匹配：不区分大小写、按整词匹配，允许复数形式（LLM -> LLMs）
+    return r'(?<![A-Za-z0-9])' + r'\s+'.join(words) + r'(?:s|es)?(?![A-Za-z0-9])'
+
+@lru_cache(maxsize=None)
+def _compile_keyword_patterns(keywords):
+    raw_pattern = re.compile("|".join(_keyword_pattern(kw, raw=True) for kw in keywords), re.IGNORECASE)
+    exact_pattern = re.compile("|".join(_keyword_pattern(kw) for kw in keywords), re.IGNORECASE)
+    return raw_pattern, exact_pattern
+
+def _parse_snapshot_date(text):
+    # 快照中版本时间的格式为 "Mon, 2 Apr 2007 19:18:42 GMT"
+    return parsedate_to_datetime(text).astimezone(timezone.utc)
+
+def format_snapshot_paper(record):
+    """把元数据快照中的一条记录转换为与 format_paper_data 相同的结构"""
+    versions = record.get("versions") or []
+    if versions:
+        published = _parse_snapshot_date(versions[0]["created"])
+        updated = _parse_snapshot_date(versions[-1]["created"])
+        arxiv_id = f"{record['id']}{versions[-1]['version']}"
+    else:
+        published = updated = datetime.fromisoformat(record["update_date"]).replace(tzinfo=timezone.utc)
+        arxiv_id = f"{record['id']}v1"
+
+    if record.get("authors_parsed"):
+        # authors_parsed 的每一项为 [姓, 名, 后缀]，转换为 API 返回的 "名 姓" 形式
+        authors = [" ".join(part for part in (parts[1], parts[0], *parts[2:]) if part) for parts in record["authors_parsed"]]
+    else:
+        authors = [name.strip() for name in re.split(r',| and ', record.get("authors", "")) if name.strip()]
+
+    categories = (record.get("categories") or "").split()
+    return {
+        "title": re.sub(r'\s+', ' ', record.get("title", "")).strip(),
+        "abstract": record.get("abstract", "").strip(),
+        "authors": authors,
+        "published": published.isoformat(),
+        "updated": updated.isoformat(),
+        "arxiv_id": arxiv_id,
+        "url": f"http://arxiv.org/pdf/{arxiv_id}",
+        "categories": categories,
+        "primary_category": categories[0] if categories else ""
+    }
+
+def _match_snapshot_chunk(lines, keywords, start_iso, end_iso):
+    """
+    处理快照中的一批原始行，返回 (行数, 区间内命中的论文, 命中关键词的最晚发布时间, 损坏行数)。
+    先用一个合并后的正则在原始行上整批预筛选，只解析候选行的 JSON，再在标题和摘要上精确匹配。
+    """
+    raw_pattern, exact_pattern = _compile_keyword_patterns(keywords)
+    start = datetime.fromisoformat(start_iso)
+    end = datetime.fromisoformat(end_iso)
+    papers = []
+    latest = None
+    skipped = 0
+    for line in lines:
+        if not raw_pattern.search(line):
+            continue
+        try:
+            record = json.loads(line)
+            if not (exact_pattern.search(record.get("title", "")) or exact_pattern.search(record.get("abstract", ""))):
+                continue
+            paper = format_snapshot_paper(record)
+        except (json.JSONDecodeError, KeyError, IndexError, TypeError, ValueError):
+            skipped += 1
+            continue
+        published = datetime.fromisoformat(paper["published"])
+        latest = published if latest is None else max(latest, published)
+        if start <= published < end:
+            papers.append(paper)
+    return len(lines), papers, latest, skipped
+
+def _iter_snapshot_chunks(snapshot_path, chunk_lines):
+    opener = gzip.open if snapshot_path.suffix == ".gz" else open
+    with opener(snapshot_path, 'rt', encoding='utf-8') as f:
+        chunk = []
+        for line in f:
+            chunk.append(line)
+            if len(chunk) >= chunk_lines:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def _record_backfill_coverage(start, end, covered):
+    """
+    把快照覆盖的时间段写入全量爬取的完成记录，之后 full_crawl_2024 / full_crawl_2025_until_now 会跳过这些时间段；
+    同时用每日论文数更新区间密度，供增量爬取规划区间。
+    """
+    jobs = [
+        ("full_2024", Config.START_DATE_2024, Config.END_DATE_2024 + timedelta(days=1)),
+        ("full_2025", Config.START_DATE_2025, end),
+    ]
+    for job, job_start, job_end in jobs:
+        clip_start, clip_end = max(start, job_start), min(end, job_end)
+        if clip_start >= clip_end:
+            continue
+        papers = [{"arxiv_id": arxiv_id} for published, arxiv_id in covered if clip_start <= published < clip_end]
+        crawl_ledger.record(job, clip_start, clip_end, papers)
+        logging.info(f"[{job}] 已记录快照覆盖的时间段 {clip_start.isoformat()} 至 {clip_end.isoformat()}，共 {len(papers)} 篇")
+
+    density = load_window_density()
+    per_day = {}
+    for published, _ in covered:
+        day = published.date().isoformat()
+        per_day[day] = per_day.get(day, 0) + 1
+    current = start
+    while current < end:
+        day = current.date().isoformat()
+        density[day] = per_day.get(day, 0)
+        current = _next_midnight(current)
+    save_window_density(density)
+
+def backfill_from_snapshot(snapshot_path, start=None, end=None, workers=None):
+    """
+    从本地下载的 arXiv 元数据快照（每行一条记录的 JSONL，可为 .gz）回填 [start, end) 内的论文，默认回填2024年。
+    按 Config.KEYWORDS 匹配标题和摘要，结果经过与 API 爬取相同的存储层写入分片。
+    快照按 BACKFILL_CHUNK_LINES 行分批交给进程池匹配，同时在途的批次有上限，内存占用与快照大小无关。
+    快照覆盖的时间段会写入全量爬取的完成记录，API 只需要负责快照之后的时间段。
+    """
+    snapshot_path = Path(snapshot_path)
+    start = start or Config.START_DATE_2024
+    end = end or Config.END_DATE_2024 + timedelta(days=1)
+    workers = workers or Config.BACKFILL_WORKERS
+    keywords = tuple(Config.KEYWORDS)
+    logging.info(f"开始从快照 {snapshot_path} 回填 {start.isoformat()} 至 {end.isoformat()} 的论文，进程数 {workers}")
+    crawl_metrics.begin_run("backfill")
+
+    stats = {"lines": 0, "matched": 0, "added": 0, "updated": 0, "skipped": 0}
+    covered = []
+    latest = None
+
+    def consume(result):
+        nonlocal latest
+        lines, papers, chunk_latest, skipped = result
+        stats["lines"] += lines
+        stats["skipped"] += skipped
+        if chunk_latest is not None:
+            latest = chunk_latest if latest is None else max(latest, chunk_latest)
+        if papers:
+            changes = add_new_papers(papers)
+            stats["matched"] += len(papers)
+            stats["added"] += len(changes["added"])
+            stats["updated"] += len(changes["updated"])
+            crawl_metrics.inc("papers_fetched", len(papers))
+            crawl_metrics.inc("papers_added", len(changes["added"]))
+            crawl_metrics.inc("papers_updated", len(changes["updated"]))
+            covered.extend((datetime.fromisoformat(p["published"]), p["arxiv_id"]) for p in papers)
+        logging.info(f"[快照回填] 已扫描 {stats['lines']} 行，命中 {stats['matched']} 篇，新增 {stats['added']} 篇，更新 {stats['updated']} 篇")
+
+    chunks = _iter_snapshot_chunks(snapshot_path, Config.BACKFILL_CHUNK_LINES)
+    if workers <= 1:
+        for chunk in chunks:
+            consume(_match_snapshot_chunk(chunk, keywords, start.isoformat(), end.isoformat()))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight = deque()
+            for chunk in chunks:
+                in_flight.append(executor.submit(_match_snapshot_chunk, chunk, keywords, start.isoformat(), end.isoformat()))
+                # 按提交顺序消费，在途批次不超过进程数的两倍
+                if len(in_flight) >= workers * 2:
+                    consume(in_flight.popleft().result())
+            while in_flight:
+                consume(in_flight.popleft().result())
+
+    paper_store.compact()
+    if stats["skipped"]:
+        logging.warning(f"[快照回填] 跳过了 {stats['skipped']} 条无法解析的记录")
+
+    # 快照最后一天可能不完整，覆盖范围只记到最晚发布时间所在日期的零点
+    if latest is not None:
+        covered_end = min(end, latest.replace(hour=0, minute=0, second=0, microsecond=0))
+        if covered_end > start:
+            _record_backfill_coverage(start, covered_end, covered)
+        if covered_end < end:
+            logging.warning(f"[快照回填] 快照只覆盖到 {covered_end.isoformat()}，之后的时间段仍需通过 API 爬取")
+
+    crawl_metrics.export()
+    logging.info(
+        f"快照回填完成：扫描 {stats['lines']} 行，命中 {stats['matched']} 篇，新增 {stats['added']} 篇，更新 {stats['updated']} 篇"
+    )
+    return stats
+
+
+# 失败区间后台重试
+class FailedIntervalRetryWorker(threading.Thread):
+    """
+    后台守护线程：定期从失败区间队列中取出到期的区间重新爬取。
+    与定时增量爬取共享客户端和全局限速器，但运行在独立线程中，不会阻塞调度器。
+    """
+
+    def __init__(self, poll_interval=None):
+        super().__init__(name="failed-interval-retry", daemon=True)
+        self.poll_interval = poll_interval or Config.RETRY_POLL_INTERVAL
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run_once(self):
+        """处理一次所有到期的失败区间，返回成功恢复的区间数"""
+        resolved = 0
+        for entry in failed_queue.due():
+            if self._stop_event.is_set():
+                break
+            start = datetime.fromisoformat(entry["start"])
+            end = datetime.fromisoformat(entry["end"])
+            logging.info(f"重试失败区间 {entry['start']} 至 {entry['end']}（第 {entry['attempts'] + 1} 次）")
+            try:
+                papers, complete = search_window(start, end, record_failure=False)
+                if papers:
+                    add_new_papers(papers)
+                if not complete:
+                    raise RuntimeError("区间中仍有请求失败")
+            except Exception as e:
+                status = failed_queue.mark_retry_failed(entry, e)
+                if status == "failed":
+                    logging.error(f"失败区间 {entry['start']} 至 {entry['end']} 已达到最大重试次数，标记为永久失败: {str(e)}")
+                else:
+                    logging.warning(f"失败区间 {entry['start']} 至 {entry['end']} 重试失败: {str(e)}，稍后继续重试")
+                continue
+            failed_queue.mark_resolved(entry, len(papers))
+            if entry.get("job"):
+                # 恢复的区间同样写入完成记录，续传时不再重新爬取
+                crawl_ledger.record(entry["job"], start, end, papers)
+            resolved += 1
+            logging.info(f"失败区间 {entry['start']} 至 {entry['end']} 重试成功，获取 {len(papers)} 篇论文")
+
+        if resolved:
+            paper_store.compact()
+        return resolved
+
+    def run(self):
+        logging.info(f"失败区间重试线程已启动，当前队列状态: {failed_queue.counts()}")
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"失败区间重试线程出错: {str(e)}")
+            self._stop_event.wait(self.poll_interval)
+
+
 # 定时任务与主函数
 def setup_scheduled_tasks():
     schedule.every().day.at(f"{Config.INCREMENTAL_CHECK_HOUR:02}:00").do(incremental_crawl)
@@ -382,6 +1471,8 @@ def run_scheduler_continuously(schedule_instance, interval=1):
 def main(skip_full_crawl=False):
     logging.info("=== 启动arXiv论文爬取系统（最终优化版） ===")
     Config.ensure_directories()
+    # 合并上次运行中断时遗留的分段
+    paper_store.compact()
     
     if not skip_full_crawl:
         try:
@@ -401,10 +1492,29 @@ def main(skip_full_crawl=False):
         except Exception as e:
             logging.error(f"启动时的追赶任务失败: {e}")
     
+    retry_worker = FailedIntervalRetryWorker()
+    retry_worker.start()
+    
     scheduler = setup_scheduled_tasks()
     run_scheduler_continuously(scheduler)
+    retry_worker.stop()
     
+def _parse_cli_date(text):
+    value = datetime.fromisoformat(text)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
 if __name__ == "__main__":
-    # 首次运行时，可以设为False来执行全量爬取。
-    # 日常运行时，可以设为True来跳过全量爬取，只依赖追赶和定时任务。
-    main(skip_full_crawl=True)
+    parser = argparse.ArgumentParser(description="arXiv论文爬取系统")
+    parser.add_argument("--backfill", metavar="SNAPSHOT", help="从本地 arXiv 元数据快照（JSONL，可为 .gz）回填历史论文后退出")
+    parser.add_argument("--start", type=_parse_cli_date, help="回填起始日期（含），默认 2024-01-01")
+    parser.add_argument("--end", type=_parse_cli_date, help="回填结束日期（不含），默认 2025-01-01")
+    parser.add_argument("--workers", type=int, help="回填时的进程数，默认 Config.BACKFILL_WORKERS")
+    args = parser.parse_args()
+
+    if args.backfill:
+        Config.ensure_directories()
+        backfill_from_snapshot(args.backfill, args.start, args.end, args.workers)
+    else:
+        # 首次运行时，可以设为False来执行全量爬取。
+        # 日常运行时，可以设为True来跳过全量爬取，只依赖追赶和定时任务。
+        main(skip_full_crawl=True)
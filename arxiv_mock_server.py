@@ -0,0 +1,328 @@
+"""
+arXiv API 离线替身服务。
+从本地论文分片（json / jsonl）或按参数合成的论文生成 arXiv 风格的 Atom 响应，
+支持配置响应延迟、错误率、空页率和结果数上限，用于在离线环境下测试和压测爬虫。
+
+用法示例：
+    python arxiv_mock_server.py --fixtures arxiv_papers_new/arxiv_2025_08_llm_papers.json --latency 0.2 --error-rate 0.05
+然后把爬虫的 Config.ARXIV_API_URL 设为 http://127.0.0.1:8765/api/query?{}
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape, quoteattr
+
+ATOM_HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<feed xmlns="http://www.w3.org/2005/Atom" '
+    'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+    'xmlns:arxiv="http://arxiv.org/schemas/atom">\n'
+)
+
+SYNTHETIC_TOPICS = [
+    "dialogue systems", "code generation", "retrieval augmented generation", "multimodal reasoning",
+    "instruction tuning", "emotion recognition", "machine translation", "agent planning"
+]
+
+
+# 测试数据加载
+def load_fixture_papers(paths):
+    """读取爬虫生成的分片文件（json 或 jsonl），返回论文列表"""
+    papers = []
+    for path in paths:
+        path = Path(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.suffix == ".jsonl":
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        papers.append(json.loads(line))
+            else:
+                data = json.load(f)
+                papers.extend(data.get('papers', []) if isinstance(data, dict) else data)
+    return papers
+
+def generate_synthetic_papers(start, days, per_day, seed=0):
+    """
+    生成与爬虫存储格式一致的合成论文：从 start 开始连续 days 天，每天 per_day 篇，
+    发布时间在一天内均匀分布，标题和摘要都包含关键词，保证能被爬虫的查询命中。
+    """
+    rng = random.Random(seed)
+    papers = []
+    for day in range(days):
+        day_start = start + timedelta(days=day)
+        for i in range(per_day):
+            published = day_start + timedelta(seconds=int((i + rng.random()) * 86400 / per_day))
+            topic = rng.choice(SYNTHETIC_TOPICS)
+            arxiv_id = f"{published:%y%m}.{day * per_day + i:05d}v1"
+            papers.append({
+                "title": f"Large Language Model Study {day * per_day + i} on {topic.title()}",
+                "abstract": f"We study how a large language model (LLM) handles {topic}. "
+                            f"This synthetic record is generated for offline crawler benchmarks.",
+                "authors": [f"Author {rng.randint(1, 500)}", f"Author {rng.randint(1, 500)}"],
+                "published": published.isoformat(),
+                "updated": published.isoformat(),
+                "arxiv_id": arxiv_id,
+                "url": f"http://arxiv.org/pdf/{arxiv_id}",
+                "categories": ["cs.CL", "cs.AI"],
+                "primary_category": "cs.CL"
+            })
+    return papers
+
+
+# 查询解析
+def _parse_query_time(text):
+    """submittedDate 的边界可以精确到天、分钟或秒，返回 (起点, 该精度下的下一个时间点)"""
+    formats = {8: ("%Y%m%d", timedelta(days=1)), 12: ("%Y%m%d%H%M", timedelta(minutes=1)), 14: ("%Y%m%d%H%M%S", timedelta(seconds=1))}
+    if len(text) not in formats:
+        raise ValueError(f"无法解析的时间: {text}")
+    fmt, unit = formats[len(text)]
+    value = datetime.strptime(text, fmt).replace(tzinfo=timezone.utc)
+    return value, value + unit
+
+def parse_search_query(search_query):
+    """
+    解析爬虫使用的查询子集：ti:"..." / abs:"..." / all:"..." 关键词（按 OR 处理）
+    以及 submittedDate:[起 TO 止]（两端均为闭区间）。返回 (关键词列表, 起始时间, 结束时间)，结束时间为开区间。
+    """
+    terms = [(field, phrase.lower()) for field, phrase in re.findall(r'(ti|abs|all):"([^"]+)"', search_query)]
+    start = end = None
+    match = re.search(r'submittedDate:\[(\d+)\s+TO\s+(\d+)\]', search_query)
+    if match:
+        start, _ = _parse_query_time(match.group(1))
+        _, end = _parse_query_time(match.group(2))
+    return terms, start, end
+
+
+class ArxivStandIn:
+    """
+    替身服务的数据与故障注入配置。
+    latency / jitter：每个请求的固定延迟和随机附加延迟（秒）；
+    error_rate：以该概率返回 error_status（默认 503）；
+    empty_page_rate：以该概率返回没有条目的非首页，触发 arxiv 库的 UnexpectedEmptyPageError 重试；
+    result_cap：单个查询最多返回的结果数，模拟 API 的结果截断。
+    """
+
+    def __init__(self, papers, latency=0.0, jitter=0.0, error_rate=0.0, error_status=503,
+                 empty_page_rate=0.0, result_cap=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.empty_page_rate = empty_page_rate
+        self.result_cap = result_cap
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # arXiv 的 submittedDate 对应第一版的发布时间，按时间倒序排列，与爬虫的排序方式一致
+        self.papers = sorted(papers, key=lambda p: p['published'], reverse=True)
+        self._published = [datetime.fromisoformat(p['published']) for p in self.papers]
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"requests": 0, "pages": 0, "entries": 0, "errors_injected": 0, "empty_pages_injected": 0}
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def _roll(self, rate):
+        with self._lock:
+            return rate > 0 and self._rng.random() < rate
+
+    def _delay(self):
+        if self.latency or self.jitter:
+            with self._lock:
+                extra = self._rng.uniform(0, self.jitter) if self.jitter else 0.0
+            time.sleep(self.latency + extra)
+
+    def count_in_range(self, start, end, keywords=None):
+        """[start, end) 内（标题或摘要包含任一关键词）的论文数，压测时用于核对爬取结果是否完整"""
+        terms = [(field, kw.lower()) for kw in keywords or [] for field in ("ti", "abs")]
+        return sum(
+            1 for paper, published in zip(self.papers, self._published)
+            if start <= published < end and (not terms or self._match_terms(paper, terms))
+        )
+
+    def search(self, search_query, start=0, max_results=10, ascending=False):
+        """返回 (总结果数, 当前页论文)"""
+        terms, range_start, range_end = parse_search_query(search_query)
+        matched = []
+        for paper, published in zip(self.papers, self._published):
+            if range_start and not (range_start <= published < range_end):
+                continue
+            if terms and not self._match_terms(paper, terms):
+                continue
+            matched.append(paper)
+        if ascending:
+            matched.reverse()
+        if self.result_cap is not None:
+            matched = matched[:self.result_cap]
+        return len(matched), matched[start:start + max_results]
+
+    @staticmethod
+    def _match_terms(paper, terms):
+        title = paper.get('title', '').lower()
+        abstract = paper.get('abstract', '').lower()
+        for field, phrase in terms:
+            if field in ("ti", "all") and phrase in title:
+                return True
+            if field in ("abs", "all") and phrase in abstract:
+                return True
+        return False
+
+    def handle_query(self, params):
+        """处理一次 /api/query 请求，返回 (状态码, 响应体)"""
+        with self._lock:
+            self.stats["requests"] += 1
+        self._delay()
+        if self._roll(self.error_rate):
+            with self._lock:
+                self.stats["errors_injected"] += 1
+            return self.error_status, b"Service Unavailable (injected)"
+
+        search_query = params.get("search_query", [""])[0]
+        start = int(params.get("start", ["0"])[0])
+        max_results = int(params.get("max_results", ["10"])[0])
+        ascending = params.get("sortOrder", ["descending"])[0] == "ascending"
+        try:
+            total, page = self.search(search_query, start, max_results, ascending)
+        except ValueError as e:
+            return 400, str(e).encode('utf-8')
+
+        if start > 0 and page and self._roll(self.empty_page_rate):
+            with self._lock:
+                self.stats["empty_pages_injected"] += 1
+            page = []
+        with self._lock:
+            self.stats["pages"] += 1
+            self.stats["entries"] += len(page)
+        return 200, render_feed(total, start, len(page), page).encode('utf-8')
+
+
+# Atom 响应生成
+def _atom_time(iso_text):
+    return datetime.fromisoformat(iso_text).astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def render_entry(paper):
+    arxiv_id = paper['arxiv_id']
+    published = _atom_time(paper['published'])
+    updated = _atom_time(paper.get('updated') or paper['published'])
+    pdf_url = paper.get('url') or f"http://arxiv.org/pdf/{arxiv_id}"
+    categories = paper.get('categories') or []
+    primary = paper.get('primary_category') or (categories[0] if categories else "cs.CL")
+    parts = [
+        "<entry>",
+        f"<id>http://arxiv.org/abs/{escape(arxiv_id)}</id>",
+        f"<updated>{updated}</updated>",
+        f"<published>{published}</published>",
+        f"<title>{escape(paper.get('title', ''))}</title>",
+        f"<summary>{escape(paper.get('abstract', ''))}</summary>",
+    ]
+    parts.extend(f"<author><name>{escape(name)}</name></author>" for name in paper.get('authors', []))
+    parts.append(f'<link href={quoteattr(f"http://arxiv.org/abs/{arxiv_id}")} rel="alternate" type="text/html"/>')
+    parts.append(f'<link title="pdf" href={quoteattr(pdf_url)} rel="related" type="application/pdf"/>')
+    parts.append(f'<arxiv:primary_category term={quoteattr(primary)} scheme="http://arxiv.org/schemas/atom"/>')
+    parts.extend(f'<category term={quoteattr(c)} scheme="http://arxiv.org/schemas/atom"/>' for c in categories)
+    parts.append("</entry>")
+    return "".join(parts)
+
+def render_feed(total, start, items, papers):
+    body = [
+        ATOM_HEADER,
+        '<title type="html">ArXiv Query (offline stand-in)</title>\n',
+        f"<updated>{datetime.now(timezone.utc):%Y-%m-%dT%H:%M:%SZ}</updated>\n",
+        f"<opensearch:totalResults>{total}</opensearch:totalResults>\n",
+        f"<opensearch:startIndex>{start}</opensearch:startIndex>\n",
+        f"<opensearch:itemsPerPage>{items}</opensearch:itemsPerPage>\n",
+    ]
+    body.extend(render_entry(paper) + "\n" for paper in papers)
+    body.append("</feed>\n")
+    return "".join(body)
+
+
+# HTTP 服务
+class _QueryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/api/query":
+            status, body, content_type = 404, b"Not Found", "text/plain"
+        else:
+            status, body = self.server.stand_in.handle_query(parse_qs(url.query))
+            content_type = "application/atom+xml; charset=utf-8" if status == 200 else "text/plain"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # 压测时请求量很大，不输出访问日志
+        pass
+
+
+def start_server(stand_in, host="127.0.0.1", port=0):
+    """
+    在后台线程中启动替身服务，port 为 0 时自动选择空闲端口。
+    返回 (server, query_url_format)，query_url_format 可直接赋给 Config.ARXIV_API_URL；结束时调用 server.shutdown()。
+    """
+    server = ThreadingHTTPServer((host, port), _QueryHandler)
+    server.daemon_threads = True
+    server.stand_in = stand_in
+    thread = threading.Thread(target=server.serve_forever, name="arxiv-stand-in", daemon=True)
+    thread.start()
+    bound_host, bound_port = server.server_address[:2]
+    return server, f"http://{bound_host}:{bound_port}/api/query?{{}}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="arXiv API 离线替身服务")
+    parser.add_argument("--fixtures", nargs="*", default=[], help="作为数据源的分片文件（json / jsonl）")
+    parser.add_argument("--synthetic-start", default="2025-01-01", help="合成论文的起始日期（未指定 --fixtures 时使用）")
+    parser.add_argument("--synthetic-days", type=int, default=30)
+    parser.add_argument("--synthetic-per-day", type=int, default=200)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的固定延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="每个请求的随机附加延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回错误状态码的概率")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--empty-page-rate", type=float, default=0.0, help="非首页返回空页的概率")
+    parser.add_argument("--result-cap", type=int, default=None, help="单个查询最多返回的结果数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.fixtures:
+        papers = load_fixture_papers(args.fixtures)
+    else:
+        start = datetime.fromisoformat(args.synthetic_start).replace(tzinfo=timezone.utc)
+        papers = generate_synthetic_papers(start, args.synthetic_days, args.synthetic_per_day, args.seed)
+
+    stand_in = ArxivStandIn(
+        papers, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        error_status=args.error_status, empty_page_rate=args.empty_page_rate,
+        result_cap=args.result_cap, seed=args.seed
+    )
+    server, url_format = start_server(stand_in, args.host, args.port)
+    print(f"替身服务已启动，共 {len(papers)} 篇论文，查询地址: {url_format}")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"请求统计: {stand_in.get_stats()}")
+    except KeyboardInterrupt:
+        print("用户中断，服务退出")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
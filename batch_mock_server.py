@@ -0,0 +1,299 @@
+"""
+OpenAI 兼容 Batch API 的离线替身服务。
+实现文件上传（/v1/files）、批处理任务（/v1/batches）、结果文件下载（/v1/files/{id}/content）和实时的 /v1/chat/completions，
+按用户消息中是否包含关键词给出 True/False 判定，可配置任务处理时长、单个请求的失败率和整个任务过期，
+用于在离线环境下测试筛选系统的 Batch API 模式（含失败请求改为实时请求的路径）。
+
+用法示例：
+    python batch_mock_server.py --processing-seconds 5 --request-error-rate 0.02
+然后在 config.json 中把 base_url 设为 http://127.0.0.1:8766/v1/ 并开启 batch_mode
+"""
+import re
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+DEFAULT_KEYWORDS = [
+    "emotion", "emotional support", "counsel", "psycholog", "mental health", "empath", "therapy",
+    "dialogue", "dialog", "conversation", "chatbot"
+]
+
+
+class BatchStandIn:
+    """
+    替身服务的状态与故障注入配置。
+    processing_seconds：批处理任务从创建到完成的时长；
+    request_error_rate：批处理中单个请求以该概率返回 500，写入错误文件；
+    expire_rate：整个任务以该概率过期（只完成一半请求），模拟服务商在完成窗口内没有处理完。
+    """
+
+    def __init__(self, keywords=None, processing_seconds=1.0, request_error_rate=0.0, expire_rate=0.0, seed=0):
+        self.keywords = [kw.lower() for kw in keywords or DEFAULT_KEYWORDS]
+        self.processing_seconds = processing_seconds
+        self.request_error_rate = request_error_rate
+        self.expire_rate = expire_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.files = {}
+        self.batches = {}
+        self.stats = {"files": 0, "batches": 0, "batch_requests": 0, "chat_requests": 0, "errors_injected": 0}
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def _roll(self, rate):
+        with self._lock:
+            return rate > 0 and self._rng.random() < rate
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def _is_relevant(self, text):
+        return any(kw in text.lower() for kw in self.keywords)
+
+    def judge(self, messages):
+        """
+        按最后一条用户消息是否包含关键词给出判定，返回 chat completion 响应体。
+        系统提示词要求按编号作答（粗筛批量模式）时，对用户消息中的每个 "N. 标题" 行各回答一行 "N: True/False"。
+        """
+        user_content = messages[-1]["content"] if messages else ""
+        system_content = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        numbered = re.findall(r'^\s*(\d+)\.\s+(.*)$', user_content, re.MULTILINE)
+        if numbered and "numbered" in system_content.lower():
+            verdict = "\n".join(f"{index}: {self._is_relevant(title)}" for index, title in numbered)
+        else:
+            verdict = "True" if self._is_relevant(user_content) else "False"
+        prompt_tokens = sum(len(message.get("content", "")) for message in messages) // 4 + 1
+        completion_tokens = len(verdict) // 4 + 1
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "stand-in",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": verdict}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        }
+
+    # 文件
+    def add_file(self, filename, purpose, content):
+        file_id = f"file-{uuid.uuid4().hex[:16]}"
+        with self._lock:
+            self.files[file_id] = {
+                "id": file_id,
+                "object": "file",
+                "bytes": len(content),
+                "created_at": int(time.time()),
+                "filename": filename,
+                "purpose": purpose,
+                "status": "processed",
+                "content": content
+            }
+            self.stats["files"] += 1
+        return self.file_object(file_id)
+
+    def file_object(self, file_id):
+        with self._lock:
+            entry = self.files.get(file_id)
+            return {k: v for k, v in entry.items() if k != "content"} if entry else None
+
+    def file_content(self, file_id):
+        with self._lock:
+            entry = self.files.get(file_id)
+            return entry["content"] if entry else None
+
+    # 批处理任务
+    def create_batch(self, input_file_id, endpoint, completion_window):
+        content = self.file_content(input_file_id)
+        if content is None:
+            return None
+        requests = [json.loads(line) for line in content.decode('utf-8').splitlines() if line.strip()]
+        batch_id = f"batch_{uuid.uuid4().hex[:16]}"
+        now = int(time.time())
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": endpoint,
+            "input_file_id": input_file_id,
+            "completion_window": completion_window,
+            "status": "validating",
+            "created_at": now,
+            "expires_at": now + 86400,
+            "output_file_id": None,
+            "error_file_id": None,
+            "errors": None,
+            "request_counts": {"total": len(requests), "completed": 0, "failed": 0}
+        }
+        with self._lock:
+            self.batches[batch_id] = batch
+            self.stats["batches"] += 1
+        threading.Thread(target=self._run_batch, args=(batch_id, requests), daemon=True).start()
+        return self.get_batch(batch_id)
+
+    def get_batch(self, batch_id):
+        with self._lock:
+            batch = self.batches.get(batch_id)
+            return json.loads(json.dumps(batch)) if batch else None
+
+    def _set_batch(self, batch_id, **fields):
+        with self._lock:
+            self.batches[batch_id].update(fields)
+
+    def _run_batch(self, batch_id, requests):
+        """在后台逐步处理请求，processing_seconds 内均匀推进进度"""
+        self._set_batch(batch_id, status="in_progress", in_progress_at=int(time.time()))
+        expire = self._roll(self.expire_rate)
+        limit = len(requests) // 2 if expire else len(requests)
+        outputs, errors = [], []
+        step = self.processing_seconds / max(1, limit)
+        for i, request in enumerate(requests[:limit]):
+            if step:
+                time.sleep(step)
+            line = {"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request.get("custom_id")}
+            if self._roll(self.request_error_rate):
+                self._count("errors_injected")
+                line.update(response={"status_code": 500, "request_id": "", "body": {"error": {"message": "stand-in error"}}}, error=None)
+                errors.append(line)
+            else:
+                line.update(response={"status_code": 200, "request_id": "", "body": self.judge(request["body"].get("messages", []))}, error=None)
+                outputs.append(line)
+            with self._lock:
+                counts = self.batches[batch_id]["request_counts"]
+                counts["completed"] = len(outputs)
+                counts["failed"] = len(errors)
+        self._count("batch_requests", limit)
+
+        fields = {"status": "expired" if expire else "completed"}
+        fields["expired_at" if expire else "completed_at"] = int(time.time())
+        if outputs:
+            fields["output_file_id"] = self.add_file(f"{batch_id}_output.jsonl", "batch_output", self._jsonl(outputs))["id"]
+        if errors:
+            fields["error_file_id"] = self.add_file(f"{batch_id}_error.jsonl", "batch_output", self._jsonl(errors))["id"]
+        self._set_batch(batch_id, **fields)
+
+    @staticmethod
+    def _jsonl(lines):
+        return "".join(json.dumps(line, ensure_ascii=False) + "\n" for line in lines).encode('utf-8')
+
+
+# HTTP 服务
+class _BatchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, data):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode('utf-8'), "application/json")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self):
+        self._send_json(404, {"error": {"message": f"未知路径 {self.path}", "type": "invalid_request_error"}})
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_GET(self):
+        stand_in = self.server.stand_in
+        path = urlparse(self.path).path
+        match = re.fullmatch(r'/v1/files/([\w-]+)/content', path)
+        if match:
+            content = stand_in.file_content(match.group(1))
+            return self._send(200, content, "application/octet-stream") if content is not None else self._not_found()
+        match = re.fullmatch(r'/v1/files/([\w-]+)', path)
+        if match:
+            entry = stand_in.file_object(match.group(1))
+            return self._send_json(200, entry) if entry else self._not_found()
+        match = re.fullmatch(r'/v1/batches/([\w-]+)', path)
+        if match:
+            batch = stand_in.get_batch(match.group(1))
+            return self._send_json(200, batch) if batch else self._not_found()
+        self._not_found()
+
+    def do_POST(self):
+        stand_in = self.server.stand_in
+        path = urlparse(self.path).path
+        body = self._read_body()
+        if path == "/v1/files":
+            # multipart/form-data：purpose 字段和 file 文件
+            message = BytesParser(policy=default_policy).parsebytes(
+                b"Content-Type: " + self.headers.get("Content-Type", "").encode('latin-1') + b"\r\n\r\n" + body
+            )
+            fields, filename, content = {}, "upload.jsonl", b""
+            for part in message.iter_parts():
+                name = part.get_param("name", header="content-disposition")
+                if part.get_filename():
+                    filename, content = part.get_filename(), part.get_payload(decode=True)
+                else:
+                    fields[name] = part.get_payload(decode=True).decode('utf-8')
+            return self._send_json(200, stand_in.add_file(filename, fields.get("purpose", "batch"), content))
+        data = json.loads(body or b"{}")
+        if path == "/v1/batches":
+            batch = stand_in.create_batch(data.get("input_file_id"), data.get("endpoint"), data.get("completion_window", "24h"))
+            if batch is None:
+                return self._send_json(400, {"error": {"message": "input_file_id 不存在", "type": "invalid_request_error"}})
+            return self._send_json(200, batch)
+        if path == "/v1/chat/completions":
+            stand_in._count("chat_requests")
+            return self._send_json(200, stand_in.judge(data.get("messages", [])))
+        self._not_found()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(stand_in, host="127.0.0.1", port=0):
+    """
+    在后台线程中启动替身服务，port 为 0 时自动选择空闲端口。
+    返回 (server, base_url)，base_url 可直接作为配置中的 base_url；结束时调用 server.shutdown()。
+    """
+    server = ThreadingHTTPServer((host, port), _BatchHandler)
+    server.daemon_threads = True
+    server.stand_in = stand_in
+    thread = threading.Thread(target=server.serve_forever, name="batch-stand-in", daemon=True)
+    thread.start()
+    bound_host, bound_port = server.server_address[:2]
+    return server, f"http://{bound_host}:{bound_port}/v1/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 兼容 Batch API 的离线替身服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--keywords", help="判为相关的关键词，用逗号分隔，默认为情感支持与对话相关的词")
+    parser.add_argument("--processing-seconds", type=float, default=1.0, help="每个批处理任务的处理时长（秒）")
+    parser.add_argument("--request-error-rate", type=float, default=0.0, help="批处理中单个请求失败的概率")
+    parser.add_argument("--expire-rate", type=float, default=0.0, help="整个批处理任务过期（只完成一半请求）的概率")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    keywords = [kw.strip() for kw in args.keywords.split(",") if kw.strip()] if args.keywords else None
+    stand_in = BatchStandIn(
+        keywords, processing_seconds=args.processing_seconds, request_error_rate=args.request_error_rate,
+        expire_rate=args.expire_rate, seed=args.seed
+    )
+    server, base_url = start_server(stand_in, args.host, args.port)
+    print(f"Batch API 替身服务已启动，base_url: {base_url}")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"请求统计: {stand_in.get_stats()}")
+    except KeyboardInterrupt:
+        print("用户中断，服务退出")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+爬虫离线压测：基于 arxiv_mock_server 的本地替身服务，不访问真实的 arXiv API。
+1. throughput：不同并发数下的端到端爬取吞吐（区间规划 -> 查询 -> 写入存储 -> 合并分片）
+2. storage：分片不断增大时每批写入的成本，对比追加写入存储（json / jsonl 分片）与旧的整文件重写
+3. failures：注入 HTTP 错误和空页后的重试次数、失败区间、后台重试恢复情况和最终完整性
+
+每个场景在独立的临时目录中运行，不会影响 arxiv_papers_new/ 下的真实数据。
+用法示例：
+    python benchmark_crawler.py --scenario all --json bench_result.json
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import arxiv_crawler as crawler
+import arxiv_mock_server as mock_server
+from arxiv_crawler import Config
+
+
+# 压测环境隔离
+@contextmanager
+def override_config(**values):
+    """临时修改 Config 的属性，退出时恢复"""
+    original = {name: getattr(Config, name) for name in values}
+    for name, value in values.items():
+        setattr(Config, name, value)
+    try:
+        yield
+    finally:
+        for name, value in original.items():
+            setattr(Config, name, value)
+
+@contextmanager
+def isolated_workspace():
+    """
+    切换到临时目录并重置爬虫的模块级状态。
+    Config 中的路径都是相对路径，切换工作目录后存储、索引、重试队列都写入临时目录。
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="arxiv_bench_") as workdir:
+        os.chdir(workdir)
+        _reset_crawler_state()
+        try:
+            Config.ensure_directories()
+            yield workdir
+        finally:
+            os.chdir(cwd)
+            _reset_crawler_state()
+
+def _reset_crawler_state():
+    crawler.paper_store = crawler.PaperStore()
+    crawler.failed_queue._entries = None
+    # 客户端在创建时读取限速间隔和重试次数，每个场景重新创建
+    crawler._shared_client = None
+
+@contextmanager
+def running_stand_in(papers, **options):
+    stand_in = mock_server.ArxivStandIn(papers, **options)
+    server, url_format = mock_server.start_server(stand_in)
+    try:
+        with override_config(ARXIV_API_URL=url_format):
+            yield stand_in
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def _stored_ids():
+    """统计合并后的分片中论文的基础 id"""
+    ids = set()
+    for path in Config.BASE_DIR.glob("arxiv_*_llm_papers*"):
+        if path.name.endswith(".meta.json") or path.suffix not in (".json", ".jsonl"):
+            continue
+        for paper in crawler.load_existing_papers(path):
+            ids.add(crawler.split_arxiv_id(paper['arxiv_id'])[0])
+    return ids
+
+def _synthetic_range(args):
+    start = datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc)
+    return start, start + timedelta(days=args.days)
+
+def _crawl_range(start, end, label, workers):
+    crawler.crawl_metrics.begin_run(label)
+    windows = crawler.plan_time_windows(start, end)
+    stats = crawler.crawl_windows(windows, label, workers=workers)
+    compact_start = time.monotonic()
+    crawler.paper_store.compact()
+    compact_seconds = time.monotonic() - compact_start
+    run = crawler.crawl_metrics.snapshot()["run"]
+    return stats, run, compact_seconds
+
+
+# 场景一：端到端吞吐
+def bench_throughput(args):
+    start, end = _synthetic_range(args)
+    papers = mock_server.generate_synthetic_papers(start, args.days, args.per_day, args.seed)
+    results = []
+    with running_stand_in(papers, latency=args.latency, jitter=args.jitter, seed=args.seed) as stand_in:
+        expected = stand_in.count_in_range(start, end, Config.KEYWORDS)
+        for workers in args.workers:
+            stand_in.reset_stats()
+            with isolated_workspace(), override_config(REQUEST_INTERVAL=args.request_interval, CRAWL_WORKERS=workers):
+                stats, run, compact_seconds = _crawl_range(start, end, f"throughput_w{workers}", workers)
+                stored = len(_stored_ids())
+            result = {
+                "workers": workers,
+                "windows": stats["windows"],
+                "papers_fetched": stats["papers"],
+                "papers_stored": stored,
+                "papers_expected": expected,
+                "elapsed_seconds": run["elapsed_seconds"],
+                "papers_per_second": run["papers_per_second"],
+                "api_pages": run["counters"]["api_pages"],
+                "window_seconds_p50": run["window_seconds_p50"],
+                "window_seconds_p95": run["window_seconds_p95"],
+                "compact_seconds": round(compact_seconds, 3),
+                "server": stand_in.get_stats()
+            }
+            results.append(result)
+            print(
+                f"[吞吐] 并发 {workers}: {stats['windows']} 个区间，获取 {stats['papers']} 篇，入库 {stored}/{expected} 篇，"
+                f"耗时 {run['elapsed_seconds']} 秒，{run['papers_per_second']} 篇/秒，API页数 {run['counters']['api_pages']}，"
+                f"合并耗时 {compact_seconds:.3f} 秒"
+            )
+    return results
+
+
+# 场景二：分片增长时的写入成本
+def _legacy_rewrite(batch):
+    """追加写入存储之前的做法：每批论文都读取整个分片、去重后整体重写"""
+    by_file = {}
+    for paper in batch:
+        file_path = crawler.get_file_path_for_date(datetime.fromisoformat(paper['published']))
+        by_file.setdefault(file_path, []).append(paper)
+    for file_path, papers in by_file.items():
+        existing = crawler.load_existing_papers(file_path)
+        existing_ids = {p['arxiv_id'] for p in existing}
+        existing.extend(p for p in papers if p['arxiv_id'] not in existing_ids)
+        crawler.save_papers_to_file(existing, file_path)
+
+def bench_storage(args):
+    # 所有论文落在同一个月内，保证写入同一个分片
+    start = datetime.fromisoformat(args.start).replace(tzinfo=timezone.utc).replace(day=1)
+    per_day = -(-args.storage_papers // 28)
+    papers = mock_server.generate_synthetic_papers(start, 28, per_day, args.seed)[:args.storage_papers]
+    batches = [papers[i:i + args.batch_size] for i in range(0, len(papers), args.batch_size)]
+    checkpoints = max(1, len(batches) // 5)
+
+    modes = {
+        "append_json": ("json", lambda batch: crawler.add_new_papers(batch)),
+        "append_jsonl": ("jsonl", lambda batch: crawler.add_new_papers(batch)),
+        "rewrite_json": ("json", _legacy_rewrite),
+    }
+    results = []
+    for mode, (shard_format, write_batch) in modes.items():
+        with isolated_workspace(), override_config(SHARD_FORMAT=shard_format, SHARD_GRANULARITY="monthly", SHARD_GRANULARITY_BY_YEAR={}):
+            crawler.crawl_metrics.begin_run(f"storage_{mode}")
+            curve = []
+            total_seconds = 0.0
+            for i, batch in enumerate(batches, 1):
+                batch_start = time.monotonic()
+                write_batch(batch)
+                seconds = time.monotonic() - batch_start
+                total_seconds += seconds
+                if i % checkpoints == 0 or i == len(batches):
+                    curve.append({"papers_in_shard": min(i * args.batch_size, len(papers)), "batch_ms": round(seconds * 1000, 2)})
+            compact_start = time.monotonic()
+            crawler.paper_store.compact()
+            compact_seconds = time.monotonic() - compact_start
+            counters = crawler.crawl_metrics.snapshot()["run"]["counters"]
+            stored = len(_stored_ids())
+        result = {
+            "mode": mode,
+            "papers": len(papers),
+            "batches": len(batches),
+            "papers_stored": stored,
+            "write_seconds": round(total_seconds, 3),
+            "compact_seconds": round(compact_seconds, 3),
+            "bytes_written": counters["bytes_written"],
+            "shard_rewrites": counters["shard_rewrites"],
+            "batch_ms_curve": curve
+        }
+        results.append(result)
+        curve_text = "，".join(f"{point['papers_in_shard']}篇:{point['batch_ms']}ms" for point in curve)
+        print(
+            f"[存储] {mode}: {len(batches)} 批共 {len(papers)} 篇，写入耗时 {total_seconds:.3f} 秒，合并耗时 {compact_seconds:.3f} 秒，"
+            f"写入 {counters['bytes_written']} 字节，整体重写 {counters['shard_rewrites']} 次；单批耗时随分片增长 {curve_text}"
+        )
+    return results
+
+
+# 场景三：故障注入
+def bench_failures(args):
+    start, end = _synthetic_range(args)
+    papers = mock_server.generate_synthetic_papers(start, args.days, args.per_day, args.seed)
+    results = []
+    for error_rate in args.error_rates:
+        options = dict(latency=args.latency, error_rate=error_rate, empty_page_rate=error_rate / 2, seed=args.seed)
+        with running_stand_in(papers, **options) as stand_in, isolated_workspace(), override_config(
+            REQUEST_INTERVAL=args.request_interval, BASE_DELAY=args.retry_cooldown, MAX_RETRIES=args.max_retries,
+            RETRY_BASE_DELAY=0, RETRY_MAX_ATTEMPTS=args.retry_rounds
+        ):
+            expected = stand_in.count_in_range(start, end, Config.KEYWORDS)
+            stats, run, _ = _crawl_range(start, end, f"failures_{error_rate}", args.workers[-1])
+            after_crawl = len(_stored_ids())
+
+            # 退避基数设为0，失败区间立即到期，按轮次模拟后台重试线程
+            worker = crawler.FailedIntervalRetryWorker()
+            rounds = 0
+            recovered = 0
+            while crawler.failed_queue.due() and rounds < args.retry_rounds:
+                recovered += worker.run_once()
+                rounds += 1
+            crawler.paper_store.compact()
+            after_retry = len(_stored_ids())
+            queue = crawler.failed_queue.counts()
+            server_stats = stand_in.get_stats()
+        result = {
+            "error_rate": error_rate,
+            "empty_page_rate": error_rate / 2,
+            "windows": stats["windows"],
+            "windows_failed": stats["failed"],
+            "api_pages": run["counters"]["api_pages"],
+            "api_retries": run["counters"]["api_retries"],
+            "api_errors": run["counters"]["api_errors"],
+            "elapsed_seconds": run["elapsed_seconds"],
+            "papers_expected": expected,
+            "papers_after_crawl": after_crawl,
+            "retry_rounds": rounds,
+            "intervals_recovered": recovered,
+            "papers_after_retry": after_retry,
+            "queue": queue,
+            "server": server_stats
+        }
+        results.append(result)
+        print(
+            f"[故障] 错误率 {error_rate}: 失败区间 {stats['failed']}/{stats['windows']}，重试 {run['counters']['api_retries']} 次，"
+            f"请求失败 {run['counters']['api_errors']} 次，爬取后入库 {after_crawl}/{expected} 篇，"
+            f"{rounds} 轮后台重试恢复 {recovered} 个区间后入库 {after_retry}/{expected} 篇，队列状态 {queue}"
+        )
+    return results
+
+
+SCENARIOS = {
+    "throughput": bench_throughput,
+    "storage": bench_storage,
+    "failures": bench_failures,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="arXiv 爬虫离线压测")
+    parser.add_argument("--scenario", choices=list(SCENARIOS) + ["all"], default="all")
+    parser.add_argument("--start", default="2025-03-01", help="合成论文的起始日期")
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--per-day", type=int, default=200, help="每天的合成论文数")
+    parser.add_argument("--latency", type=float, default=0.05, help="替身服务每个请求的延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--request-interval", type=float, default=0.0, help="压测时的全局请求间隔（秒）")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--storage-papers", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--error-rates", type=float, nargs="+", default=[0.0, 0.2, 0.5])
+    parser.add_argument("--max-retries", type=int, default=2, help="故障场景中单个请求的重试次数")
+    parser.add_argument("--retry-cooldown", type=float, default=0.01, help="故障场景中重试前的冷却时间（秒）")
+    parser.add_argument("--retry-rounds", type=int, default=3, help="故障场景中后台重试的最大轮数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="把压测结果写入该 JSON 文件")
+    parser.add_argument("--verbose", action="store_true", help="输出爬虫的 INFO 日志")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.CRITICAL)
+
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    report = {"started_at": datetime.now(timezone.utc).isoformat(), "args": vars(args)}
+    for name in names:
+        report[name] = SCENARIOS[name](args)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"压测结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,422 +1,21 @@
 import asyncio
 import gradio as gr
-import json
 import os
-from openai import AsyncOpenAI
-import aiofiles
-from pathlib import Path
-import glob
 import time
-
-# 默认配置
-DEFAULT_CONFIG = {
-    "api_key": "YOUR_API_KEY_HERE",
-    "base_url": "https://api.openai.com/v1/",
-    "model": "gpt-4-turbo",
-    "rounds": 3,
-    "max_concurrent": 50
-}
-
-# 预设提示词
-COARSE_SYSTEM_PROMPT = """
-Determine if this paper title is related to emotional support, psychological counseling, or multi-turn dialogue. Return True if there is any relevant content, otherwise return False.
-<True/False>
-"""
-
-FINE_SYSTEM_PROMPT = """
-Please carefully read the title and abstract of the paper and determine whether the paper is closely related to any of the following topics:
-- Emotional support
-- Psychological counseling
-- Multi-turn dialogue
-- Dialogue systems
-
-Please conduct an in-depth analysis based on the content of the abstract. Return "True" only if the core content of the paper is indeed related to the above topics.
-If the paper only mentions relevant concepts slightly or mainly focuses on other fields, return "False".
-
-<True/False>
-"""
-
-def load_config():
-    """加载配置文件"""
-    config_path = "config.json"
-    if os.path.exists(config_path):
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            if "rounds" not in config:
-                config["rounds"] = DEFAULT_CONFIG["rounds"]
-            if "max_concurrent" not in config:
-                config["max_concurrent"] = DEFAULT_CONFIG["max_concurrent"]
-            return config
-    else:
-        # 创建默认配置文件
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(DEFAULT_CONFIG, f, ensure_ascii=False, indent=2)
-        return DEFAULT_CONFIG
-
-def save_config(api_key, base_url, model, rounds, max_concurrent):
-    """保存配置文件"""
-    config = {
-        "api_key": api_key,
-        "base_url": base_url,
-        "model": model,
-        "rounds": int(rounds),
-        "max_concurrent": int(max_concurrent)
-    }
-    with open("config.json", 'w', encoding='utf-8') as f:
-        json.dump(config, f, ensure_ascii=False, indent=2)
-    return "配置已保存！"
-
-def get_json_files():
-    """获取主目录和 arxiv_papers_new 子目录下的所有JSON文件，并应用过滤规则"""
-    # 获取主目录的文件
-    main_dir_files = glob.glob("*.json")
-    
-    # 获取子目录的文件
-    sub_dir_path = "arxiv_papers_new"
-    sub_dir_files = []
-    if os.path.isdir(sub_dir_path):
-        sub_dir_files = glob.glob(os.path.join(sub_dir_path, "*.json"))
-
-    # 合并两个列表
-    all_files = main_dir_files + sub_dir_files
-
-    # 定义过滤规则
-    excluded_suffixes = ['_coarse_', '_fine_']
-    excluded_filenames = ['config.json']
-    subdir_excluded_filenames = ['last_crawl_time.json', 'failed_intervals.json']
-
-    # 应用过滤
-    filtered_list = []
-    for file_path in all_files:
-        base_name = os.path.basename(file_path)
-        
-        # 规则1: 过滤掉中间结果文件
-        if any(suffix in base_name for suffix in excluded_suffixes):
-            continue
-        
-        # 规则2: 过滤掉配置文件
-        if base_name in excluded_filenames:
-            continue
-            
-        # 规则3: 过滤掉子目录下的特定文件
-        # is_in_subdir = os.path.dirname(file_path) == sub_dir_path
-        is_in_subdir = sub_dir_path in file_path
-        if is_in_subdir and base_name in subdir_excluded_filenames:
-            continue
-        
-        filtered_list.append(file_path)
-        
-    return filtered_list
-
-def get_result_files():
-    """获取当前目录下的粗筛结果文件"""
-    return [f for f in glob.glob("*.json") if 'coarse_final' in f]
-
-
-def get_filename_with_suffix(original_filename, suffix):
-    """在文件名的.json之前添加后缀，输出文件保存到当前目录"""
-    base_filename = os.path.basename(original_filename)
-    
-    if base_filename.endswith('.json'):
-        base_name = base_filename[:-5]  # 去掉.json
-        return f"{base_name}_{suffix}.json"
-    else:
-        return f"{base_filename}_{suffix}"
-
-async def check_paper_relevance_with_retry(client, paper_data, system_prompt, max_retries=3):
-    """检查单个论文的相关性（粗筛）- 带重试机制"""
-    for attempt in range(max_retries):
-        try:
-            # 兼容性修改：安全地获取和处理标题，以兼容新旧两种JSON格式
-            title_text = paper_data.get('title', '').strip()
-            # 保留split逻辑以兼容旧格式，同时对新格式也安全
-            clean_title = title_text.split('author')[0].strip()
-            user_content = f"论文标题: {clean_title}"
-
-            response = await client.chat.completions.create(
-                model=client.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content}
-                ]
-            )
-            result = response.choices[0].message.content.strip()
-            return paper_data, "True" in result
-        except Exception as e:
-            if attempt < max_retries - 1:
-                print(f"API调用失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                print("等待60秒后重试...")
-                await asyncio.sleep(60)
-            else:
-                print(f"处理标题 '{paper_data.get('title', 'N/A')}' 时出错 (已重试{max_retries}次): {e}")
-                return paper_data, False
-
-async def check_paper_relevance_detailed_with_retry(client, paper_data, system_prompt, max_retries=3):
-    """基于标题和摘要检查单个论文的相关性（精排）- 带重试机制"""
-    for attempt in range(max_retries):
-        try:
-            # 兼容性修改：安全地获取和处理标题与摘要
-            title_text = paper_data.get('title', '').strip()
-            abstract_text = paper_data.get('abstract', '').strip()
-            # 保留split逻辑以兼容旧格式
-            clean_title = title_text.split('author')[0].strip()
-            content = f"论文标题: {clean_title}\n\n论文摘要: {abstract_text}"
-            
-            response = await client.chat.completions.create(
-                model=client.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": content}
-                ]
-            )
-            result = response.choices[0].message.content.strip()
-            return paper_data, "True" in result
-        except Exception as e:
-            if attempt < max_retries - 1:
-                print(f"API调用失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                print("等待60秒后重试...")
-                await asyncio.sleep(60)
-            else:
-                print(f"处理论文 '{paper_data.get('title', 'N/A')}' 时出错 (已重试{max_retries}次): {e}")
-                return paper_data, False
-
-async def process_papers_single_round(client, papers_data, system_prompt, round_num, max_concurrent, is_fine=False, progress_callback=None):
-    """单轮处理所有论文"""
-    semaphore = asyncio.Semaphore(max_concurrent)
-    
-    async def limited_check(paper_data):
-        async with semaphore:
-            if is_fine:
-                return await check_paper_relevance_detailed_with_retry(client, paper_data, system_prompt)
-            else:
-                return await check_paper_relevance_with_retry(client, paper_data, system_prompt)
-    
-    mode = "精排" if is_fine else "粗筛"
-    print(f"开始第 {round_num} 轮{mode}检查 {len(papers_data)} 篇论文的相关性...")
-    
-    tasks = [limited_check(paper) for paper in papers_data if paper.get('title')]
-    
-    results = []
-    completed = 0
-    
-    for completed_task in asyncio.as_completed(tasks):
-        result = await completed_task
-        results.append(result)
-        completed += 1
-        
-        if progress_callback and len(tasks) > 0:
-            progress = completed / len(tasks)
-            progress_callback(progress, f"第{round_num}轮{mode}: {completed}/{len(tasks)}")
-    
-    relevant_papers = [paper_data for paper_data, is_relevant in results if is_relevant]
-    
-    print(f"第 {round_num} 轮{mode}找到 {len(relevant_papers)} 篇相关论文")
-    
-    return relevant_papers
-
-async def coarse_screening(main_json_file, findings_json_file, system_prompt, config, progress_callback=None):
-    """粗筛处理"""
-    papers_data = []
-    
-    if not os.path.exists(main_json_file):
-        return f"错误：文件 {main_json_file} 不存在"
-    
-    try:
-        async with aiofiles.open(main_json_file, 'r', encoding='utf-8') as f:
-            content = await f.read()
-            main_data = json.loads(content)
-            if 'papers' in main_data:
-                papers_data.extend(main_data['papers'])
-                print(f"读取主会议论文: {len(main_data['papers'])} 篇")
-    except Exception as e:
-        return f"读取或解析主文件 {main_json_file} 失败: {e}"
-
-    if findings_json_file and os.path.exists(findings_json_file):
-        try:
-            async with aiofiles.open(findings_json_file, 'r', encoding='utf-8') as f:
-                content = await f.read()
-                findings_data = json.loads(content)
-                if 'papers' in findings_data:
-                    papers_data.extend(findings_data['papers'])
-                    print(f"读取Findings论文: {len(findings_data['papers'])} 篇")
-        except Exception as e:
-            return f"读取或解析Findings文件 {findings_json_file} 失败: {e}"
-
-    
-    print(f"总共需要处理: {len(papers_data)} 篇论文")
-    
-    client = AsyncOpenAI(
-        api_key=config["api_key"], 
-        base_url=config["base_url"],
-        timeout=60.0
-    )
-    client.model = config["model"]
-    
-    all_rounds_results = []
-    rounds = config.get("rounds", 3)
-    max_concurrent = config.get("max_concurrent", 50)
-    
-    for round_num in range(1, rounds + 1):
-        if progress_callback:
-            progress_callback(0, f"开始第{round_num}轮粗筛...")
-        
-        relevant_papers = await process_papers_single_round(
-            client, papers_data, system_prompt, round_num, max_concurrent, False, progress_callback
-        )
-        all_rounds_results.append(relevant_papers)
-        
-        round_data = {
-            "round": round_num,
-            "total_papers": len(papers_data),
-            "relevant_papers_count": len(relevant_papers),
-            "relevant_papers": relevant_papers
-        }
-        
-        output_file = get_filename_with_suffix(main_json_file, f'coarse_round_{round_num}')
-        async with aiofiles.open(output_file, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(round_data, ensure_ascii=False, indent=2))
-        
-        print(f"第 {round_num} 轮结果已保存到 {output_file}")
-    
-    all_relevant_papers = {}
-    for round_papers in all_rounds_results:
-        for paper in round_papers:
-            # 使用标题作为键来去重
-            if paper.get('title'):
-                all_relevant_papers[paper['title']] = paper
-    
-    final_relevant_papers = list(all_relevant_papers.values())
-    
-    final_data = {
-        "total_papers": len(papers_data),
-        "rounds_count": rounds,
-        "max_concurrent": max_concurrent,
-        "round_results": [
-            {
-                "round": i,
-                "count": len(round_papers)
-            }
-            for i, round_papers in enumerate(all_rounds_results, 1)
-        ],
-        "final_relevant_papers_count": len(final_relevant_papers),
-        "relevant_papers": sorted(final_relevant_papers, key=lambda x: x.get('title', ''))
-    }
-    
-    output_file = get_filename_with_suffix(main_json_file, 'coarse_final')
-    async with aiofiles.open(output_file, 'w', encoding='utf-8') as f:
-        await f.write(json.dumps(final_data, ensure_ascii=False, indent=2))
-    
-    round_stats = "\n".join([f"- 第{i}轮筛选：{len(round_papers)} 篇" for i, round_papers in enumerate(all_rounds_results, 1)])
-    
-    result_text = f"""
-粗筛完成！
-
-处理统计：
-- 总论文数：{len(papers_data)}
-- 处理轮数：{rounds} 轮
-- 最大并发数：{max_concurrent}
-{round_stats}
-- 最终结果：{len(final_relevant_papers)} 篇
-
-结果已保存到：{output_file}
-"""
-    
-    return result_text
-
-async def fine_screening(input_json_file, system_prompt, config, progress_callback=None):
-    """精排处理"""
-    if not os.path.exists(input_json_file):
-        return f"错误：文件 {input_json_file} 不存在"
-    
-    try:
-        async with aiofiles.open(input_json_file, 'r', encoding='utf-8') as f:
-            content = await f.read()
-            coarse_data = json.loads(content)
-            papers_data = coarse_data.get('relevant_papers', [])
-            print(f"读取粗排结果: {len(papers_data)} 篇论文")
-    except Exception as e:
-        return f"读取或解析文件 {input_json_file} 失败: {e}"
-
-    client = AsyncOpenAI(
-        api_key=config["api_key"], 
-        base_url=config["base_url"],
-        timeout=60.0
-    )
-    client.model = config["model"]
-    
-    all_rounds_results = []
-    rounds = config.get("rounds", 3)
-    max_concurrent = min(config.get("max_concurrent", 50), 30)
-    
-    for round_num in range(1, rounds + 1):
-        if progress_callback:
-            progress_callback(0, f"开始第{round_num}轮精排...")
-        
-        relevant_papers = await process_papers_single_round(
-            client, papers_data, system_prompt, round_num, max_concurrent, True, progress_callback
-        )
-        all_rounds_results.append(relevant_papers)
-        
-        round_data = {
-            "round": round_num,
-            "type": "fine_ranking",
-            "input_papers": len(papers_data),
-            "relevant_papers_count": len(relevant_papers),
-            "relevant_papers": relevant_papers
-        }
-        
-        output_file = get_filename_with_suffix(input_json_file, f'fine_round_{round_num}')
-        async with aiofiles.open(output_file, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(round_data, ensure_ascii=False, indent=2))
-        
-        print(f"第 {round_num} 轮精排结果已保存到 {output_file}")
-    
-    all_relevant_papers = {}
-    for round_papers in all_rounds_results:
-        for paper in round_papers:
-            if paper.get('title'):
-                all_relevant_papers[paper['title']] = paper
-    
-    final_relevant_papers = list(all_relevant_papers.values())
-    
-    final_data = {
-        "type": "fine_ranking_final",
-        "input_papers": len(papers_data),
-        "rounds_count": rounds,
-        "max_concurrent": max_concurrent,
-        "round_results": [
-            {
-                "round": i,
-                "count": len(round_papers)
-            }
-            for i, round_papers in enumerate(all_rounds_results, 1)
-        ],
-        "final_relevant_papers_count": len(final_relevant_papers),
-        "selection_rate": f"{len(final_relevant_papers)/len(papers_data)*100:.1f}%" if len(papers_data) > 0 else "0.0%",
-        "relevant_papers": sorted(final_relevant_papers, key=lambda x: x.get('title', ''))
-    }
-    
-    output_file = get_filename_with_suffix(input_json_file, 'fine_final')
-    async with aiofiles.open(output_file, 'w', encoding='utf-8') as f:
-        await f.write(json.dumps(final_data, ensure_ascii=False, indent=2))
-    
-    round_stats = "\n".join([f"- 第{i}轮精排：{len(round_papers)} 篇" for i, round_papers in enumerate(all_rounds_results, 1)])
-    
-    result_text = f"""
-精排完成！
-
-处理统计：
-- 输入论文数：{len(papers_data)}
-- 处理轮数：{rounds} 轮
-- 最大并发数：{max_concurrent}
-{round_stats}
-- 最终结果：{len(final_relevant_papers)} 篇
-- 精排率：{final_data['selection_rate']}
-
-结果已保存到：{output_file}
-"""
-    
-    return result_text
+from screening_core import (
+    COARSE_SYSTEM_PROMPT,
+    FINE_SYSTEM_PROMPT,
+    load_config,
+    save_config,
+    get_json_files,
+    get_result_files,
+    get_prefilter_seed_terms,
+    get_paper_index,
+    export_search_candidates,
+    coarse_screening,
+    fine_screening,
+    pipeline_screening
+)
 
 def get_file_path(dropdown_value, upload_file):
     """获取文件路径，优先使用上传的文件"""
@@ -427,7 +26,7 @@ def get_file_path(dropdown_value, upload_file):
     else:
         return None
 
-def run_coarse_screening_with_progress(main_dropdown, findings_dropdown, main_upload, findings_upload, system_prompt, progress=gr.Progress()):
+def run_coarse_screening_with_progress(main_dropdown, findings_dropdown, main_upload, findings_upload, system_prompt, incremental=False, progress=gr.Progress()):
     def progress_callback(prog, desc):
         progress(prog, desc=desc)
     
@@ -438,9 +37,9 @@ def run_coarse_screening_with_progress(main_dropdown, findings_dropdown, main_up
         return "错误：请选择主会议论文文件"
     
     config = load_config()
-    return asyncio.run(coarse_screening(main_file, findings_file, system_prompt, config, progress_callback))
+    return asyncio.run(coarse_screening(main_file, findings_file, system_prompt, config, progress_callback, incremental))
 
-def run_fine_screening_with_progress(input_dropdown, input_upload, system_prompt, progress=gr.Progress()):
+def run_fine_screening_with_progress(input_dropdown, input_upload, system_prompt, incremental=False, progress=gr.Progress()):
     def progress_callback(prog, desc):
         progress(prog, desc=desc)
     
@@ -450,7 +49,46 @@ def run_fine_screening_with_progress(input_dropdown, input_upload, system_prompt
         return "错误：请选择输入文件"
     
     config = load_config()
-    return asyncio.run(fine_screening(input_file, system_prompt, config, progress_callback))
+    return asyncio.run(fine_screening(input_file, system_prompt, config, progress_callback, incremental))
+
+def run_pipeline_screening_with_progress(main_dropdown, findings_dropdown, main_upload, findings_upload, coarse_prompt, fine_prompt, progress=gr.Progress()):
+    def progress_callback(prog, desc):
+        progress(prog, desc=desc)
+    
+    main_file = get_file_path(main_dropdown, main_upload)
+    findings_file = get_file_path(findings_dropdown, findings_upload)
+    
+    if not main_file:
+        return "错误：请选择主会议论文文件"
+    
+    config = load_config()
+    return asyncio.run(pipeline_screening(main_file, findings_file, coarse_prompt, fine_prompt, config, progress_callback))
+
+def run_search(query, limit):
+    """检索标签页：先同步索引（只重建变化的文件），再返回结果表格和状态"""
+    index = get_paper_index()
+    start_time = time.monotonic()
+    updated, removed = index.refresh()
+    refresh_ms = (time.monotonic() - start_time) * 1000
+    start_time = time.monotonic()
+    hits = index.search(query or "", int(limit))
+    search_ms = (time.monotonic() - start_time) * 1000
+    rows = [[hit["score"], hit["title"], hit["authors"], hit["date"], hit["file"]] for hit in hits]
+    status = f"索引共 {len(index)} 篇论文，检索耗时 {search_ms:.1f} 毫秒，返回 {len(hits)} 条"
+    if updated or removed:
+        status += f"（本次更新 {updated} 个文件、移除 {removed} 个文件的索引，耗时 {refresh_ms:.0f} 毫秒）"
+    return rows, status
+
+def run_search_export(query, limit):
+    if not (query or "").strip():
+        return "错误：请输入检索词"
+    index = get_paper_index()
+    index.refresh()
+    hits = index.search(query, int(limit))
+    if not hits:
+        return "没有检索结果，未生成文件"
+    output_file = export_search_candidates(query, hits)
+    return f"已将 {len(hits)} 条检索结果保存到 {output_file}，刷新文件列表后可在粗筛标签页中选择"
 
 # 创建Gradio界面
 def create_interface():
@@ -499,12 +137,92 @@ def create_interface():
                             value=config.get("max_concurrent", 50),
                             info="⚠️ 注意：API提供商可能有并发限制，建议从较小值开始测试"
                         )
+                        coarse_batch_size_input = gr.Slider(
+                            label="粗筛批量大小",
+                            minimum=1,
+                            maximum=50,
+                            step=1,
+                            value=config.get("coarse_batch_size", 1),
+                            info="每个粗筛请求包含的标题数，1 表示逐篇请求；批量请求可大幅减少请求数和重复发送的系统提示词"
+                        )
+                        vote_rule_input = gr.Dropdown(
+                            label="多轮投票规则",
+                            choices=["union", "majority", "k_of_n"],
+                            value=config.get("vote_rule", "union"),
+                            info="union：任一轮判为相关即相关；majority：超过半数轮次；k_of_n：至少 k 轮"
+                        )
+                        vote_k_input = gr.Slider(
+                            label="k 值（k_of_n 规则）",
+                            minimum=1,
+                            maximum=10,
+                            step=1,
+                            value=config.get("vote_k", 1)
+                        )
+                        with gr.Row():
+                            rpm_limit_input = gr.Number(
+                                label="每分钟请求数上限（RPM）",
+                                value=config.get("rpm_limit", 0),
+                                precision=0,
+                                minimum=0,
+                                info="服务商的 RPM 配额，0 表示不限制"
+                            )
+                            tpm_limit_input = gr.Number(
+                                label="每分钟 token 数上限（TPM）",
+                                value=config.get("tpm_limit", 0),
+                                precision=0,
+                                minimum=0,
+                                info="服务商的 TPM 配额，0 表示不限制"
+                            )
+                        model_price = config.get("model_prices", {}).get(config["model"]) or [0, 0]
+                        with gr.Row():
+                            input_price_input = gr.Number(
+                                label="输入价格（美元/百万 token）",
+                                value=model_price[0],
+                                minimum=0,
+                                info="当前模型的价格，用于估算每次筛选的费用；都为 0 表示不估算"
+                            )
+                            output_price_input = gr.Number(
+                                label="输出价格（美元/百万 token）",
+                                value=model_price[1],
+                                minimum=0
+                            )
+                        batch_mode_input = gr.Checkbox(
+                            label="使用 Batch API（离线批处理）",
+                            value=config.get("batch_mode", False),
+                            info="粗筛/精排每一轮的请求打包提交给服务商的批处理接口，价格更低、不受 RPM/TPM 限制，但可能需要数小时才能完成；流水线模式不使用"
+                        )
+                        dedup_enabled_input = gr.Checkbox(
+                            label="筛选前跨文件去重",
+                            value=config.get("dedup_enabled", False),
+                            info="按 arXiv id、DOI、规范化标题和摘要近似重复（MinHash）把同一篇论文的多个副本归为一组，每组只调用一次 LLM，结论沿用到所有副本"
+                        )
+                        prefilter_enabled_input = gr.Checkbox(
+                            label="启用本地预筛",
+                            value=config.get("prefilter_enabled", False),
+                            info="粗筛前在本地用 TF-IDF 比较标题+摘要与种子词、过往精排结果，低于阈值的论文不调用 LLM"
+                        )
+                        prefilter_threshold_input = gr.Slider(
+                            label="预筛阈值",
+                            minimum=0,
+                            maximum=0.3,
+                            step=0.005,
+                            value=config.get("prefilter_threshold", 0.03),
+                            info="余弦相似度低于该值的论文被跳过；粗筛结果中会给出按过往精排结果估计的召回率和召回 95% 所需的阈值"
+                        )
+                        prefilter_seed_terms_input = gr.Textbox(
+                            label="预筛种子词",
+                            value=", ".join(get_prefilter_seed_terms(config)),
+                            lines=2,
+                            info="用逗号分隔的主题词，应与粗筛提示词的主题一致"
+                        )
                         
                         gr.Markdown("""
                         **并发说明**：
-                        - 并发数过高可能导致API限流
-                        - 调用失败时系统会自动暂停1分钟后重试
-                        - 精排阶段会自动降低并发数以提高稳定性
+                        - 最大并发数是上限：遇到限流（429）或超时时并发自动减半，之后请求成功会逐步恢复
+                        - 服务端返回 Retry-After 时按其要求暂停；重试前等待期间不占用并发名额
+                        - 当前并发上限会显示在进度条中
+                        - 填写 RPM/TPM 配额后，请求按估算的 token 数排队发送，持续吞吐保持在配额的 90% 左右
+                        - 每次筛选的结果中会给出 API 请求数、token 用量、请求耗时（p50/p95/p99）和按价格估算的费用
                         """)
                 
                 save_config_btn = gr.Button("💾 保存配置", variant="primary")
@@ -512,7 +230,9 @@ def create_interface():
                 
                 save_config_btn.click(
                     save_config,
-                    inputs=[api_key_input, base_url_input, model_input, rounds_input, max_concurrent_input],
+                    inputs=[api_key_input, base_url_input, model_input, rounds_input, max_concurrent_input, coarse_batch_size_input, vote_rule_input, vote_k_input, rpm_limit_input, tpm_limit_input,
+                            prefilter_enabled_input, prefilter_threshold_input, prefilter_seed_terms_input, input_price_input, output_price_input, batch_mode_input,
+                            dedup_enabled_input],
                     outputs=config_status
                 )
             
@@ -532,7 +252,7 @@ def create_interface():
                         )
                         main_file_upload = gr.File(
                             label="或从系统选择",
-                            file_types=[".json"]
+                            file_types=[".json", ".jsonl"]
                         )
                         
                         gr.Markdown("**Findings论文文件（可选）**")
@@ -544,7 +264,7 @@ def create_interface():
                         )
                         findings_file_upload = gr.File(
                             label="或从系统选择",
-                            file_types=[".json"]
+                            file_types=[".json", ".jsonl"]
                         )
                         
                         refresh_files_btn = gr.Button("🔄 刷新文件列表")
@@ -557,7 +277,14 @@ def create_interface():
                             info="⚠️ 请保持输出格式 <True/False> 不变"
                         )
                 
-                run_coarse_btn = gr.Button("🚀 开始粗筛", variant="primary", size="lg")
+                coarse_incremental = gr.Checkbox(
+                    label="增量模式：只评估新增或内容变化的论文",
+                    value=False,
+                    info="复用上次 _coarse_final.json 中未变化论文的结论，适合分片新增了少量论文或论文更新版本后重新筛选"
+                )
+                with gr.Row():
+                    run_coarse_btn = gr.Button("🚀 开始粗筛", variant="primary", size="lg")
+                    run_pipeline_btn = gr.Button("⚡ 粗筛+精排流水线", size="lg")
                 coarse_output = gr.Textbox(
                     label="粗筛结果",
                     lines=12,
@@ -566,7 +293,7 @@ def create_interface():
                 
                 run_coarse_btn.click(
                     run_coarse_screening_with_progress,
-                    inputs=[main_file_dropdown, findings_file_dropdown, main_file_upload, findings_file_upload, coarse_prompt],
+                    inputs=[main_file_dropdown, findings_file_dropdown, main_file_upload, findings_file_upload, coarse_prompt, coarse_incremental],
                     outputs=coarse_output
                 )
             
@@ -586,7 +313,7 @@ def create_interface():
                         )
                         input_file_upload = gr.File(
                             label="或从系统选择",
-                            file_types=[".json"]
+                            file_types=[".json", ".jsonl"]
                         )
                         refresh_input_files_btn = gr.Button("🔄 刷新结果文件")
                         
@@ -598,6 +325,11 @@ def create_interface():
                             info="⚠️ 请保持输出格式 <True/False> 不变"
                         )
                 
+                fine_incremental = gr.Checkbox(
+                    label="增量模式：只评估新增或内容变化的论文",
+                    value=False,
+                    info="复用上次 _fine_final.json 中未变化论文的结论"
+                )
                 run_fine_btn = gr.Button("🎯 开始精排", variant="primary", size="lg")
                 fine_output = gr.Textbox(
                     label="精排结果",
@@ -607,9 +339,39 @@ def create_interface():
                 
                 run_fine_btn.click(
                     run_fine_screening_with_progress,
-                    inputs=[input_file_dropdown, input_file_upload, fine_prompt],
+                    inputs=[input_file_dropdown, input_file_upload, fine_prompt, fine_incremental],
                     outputs=fine_output
                 )
+                
+                # 流水线按钮在粗筛标签页，精排提示词取自本标签页
+                run_pipeline_btn.click(
+                    run_pipeline_screening_with_progress,
+                    inputs=[main_file_dropdown, findings_file_dropdown, main_file_upload, findings_file_upload, coarse_prompt, fine_prompt],
+                    outputs=coarse_output
+                )
+            
+            # 检索标签页
+            with gr.TabItem("🔎 检索"):
+                gr.Markdown("### 论文检索")
+                gr.Markdown("在所有论文文件的标题、摘要和作者中检索（BM25 排序），索引保存在 `search_index/`，文件变化后自动增量更新")
+                
+                with gr.Row():
+                    search_query = gr.Textbox(label="检索词", placeholder="例如：emotional support dialogue", scale=4)
+                    search_limit = gr.Slider(label="返回条数", minimum=10, maximum=500, step=10, value=50, scale=1)
+                with gr.Row():
+                    run_search_btn = gr.Button("🔎 检索", variant="primary")
+                    export_search_btn = gr.Button("📄 保存为粗筛输入文件")
+                search_status = gr.Textbox(label="状态", interactive=False)
+                search_results = gr.Dataframe(
+                    headers=["分数", "标题", "作者", "日期", "文件"],
+                    datatype=["number", "str", "str", "str", "str"],
+                    interactive=False,
+                    wrap=True
+                )
+                
+                run_search_btn.click(run_search, inputs=[search_query, search_limit], outputs=[search_results, search_status])
+                search_query.submit(run_search, inputs=[search_query, search_limit], outputs=[search_results, search_status])
+                export_search_btn.click(run_search_export, inputs=[search_query, search_limit], outputs=search_status)
             
             # 帮助标签页
             with gr.TabItem("❓ 帮助"):
@@ -619,21 +381,37 @@ def create_interface():
                 #### 1. 配置设置
                 - 在"配置"标签页中设置您的API密钥、Base URL和模型名称
                 - **处理轮数**：默认3轮，多轮处理可以提高筛选的准确性和召回率
-                - **最大并发数**：控制同时发送的API请求数量，建议从50开始测试
+                - **最大并发数**：同时发送的API请求数量上限，建议从50开始测试；被限流时会自动降低，恢复后再逐步升回
+                - **本地预筛**：启用后粗筛前先在本地给每篇论文打分，低于阈值的论文直接判为不相关；当前目录下已有的 `*_fine_final.json` 会作为范例参与打分并用于估计召回率
+                - **粗筛批量大小**：大于1时把多个标题编号后放进同一个请求，模型逐条回答；回答缺失或格式错误的条目会单独重试
                 - 配置会自动保存到 `config.json` 文件中
                 
                 #### 2. 粗筛流程
-                - 从下拉列表选择论文JSON文件（可来自主目录或`arxiv_papers_new`子目录）
+                - 从下拉列表选择论文JSON/JSONL文件（可来自主目录或`arxiv_papers_new`子目录），JSONL文件会逐行流式读取
                 - 可选择添加Findings论文文件
-                - 系统会进行多轮筛选并取并集作为最终结果
+                - 系统会进行多轮筛选，按投票规则汇总（默认取并集）；结论已经确定的论文不会在后续轮次重复评估
                 - 结果保存为 `原文件名_coarse_final.json`
+                - 勾选增量模式后，只评估相对上次结果新增或标题/摘要变化的论文（arXiv 论文按去掉版本号的 id 识别）
+                - 点击"粗筛+精排流水线"时，粗筛判定为相关的论文会立即进入精排（使用精排标签页中的提示词），两个阶段共享并发数，同时写出粗筛和精排的全部结果文件
+                
+                #### 判定缓存
+                - 每次调用的判定按 模型 + 提示词 + 轮次 + 论文内容 缓存到 `cache/verdict_cache.jsonl`，重跑或换文件时相同的组合不再调用API
+                - 修改模型、提示词或论文内容后会重新调用；可在 `config.json` 中设置 `verdict_cache_enabled`、`verdict_cache_max_entries`、`verdict_cache_max_age_days`
+                
+                #### 断点续跑
+                - 每个判定完成后立即写入 `*_final.journal.jsonl`；运行中断（崩溃、重启）后用相同的文件、模型、提示词和轮数重新运行，已完成的判定会直接复用
+                - 运行正常结束后日志自动删除；如需从头重跑，删除对应的 `.journal.jsonl` 文件即可
                 
                 #### 3. 精排流程
                 - 选择粗筛阶段的输出文件
                 - 基于标题和摘要进行更精确的筛选
-                - 同样进行多轮筛选并取并集
+                - 同样进行多轮筛选，按投票规则汇总
                 - 结果保存为 `原文件名_fine_final.json`
                 
+                #### 检索
+                - "检索"标签页在所有论文文件中按相关度查找论文，用于确认某个主题是否已被收录
+                - 点击"保存为粗筛输入文件"会把检索结果写成 `search_检索词_papers.json`，可作为候选集直接进行粗筛
+                
                 #### 4. 文件命名规则
                 - 粗筛结果：`原文件名_coarse_final.json`
                 - 精排结果：`原文件名_fine_final.json`
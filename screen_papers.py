@@ -0,0 +1,225 @@
+"""
+命令行批量筛选：按通配符选出多个论文文件，在同一个进程中完成粗筛和精排，不依赖 Gradio，启动快，适合在无界面的服务器上由 cron 调用。
+所有文件共享同一个 API 客户端（同一个自适应并发控制器和 RPM/TPM 限流器），多个文件同时处理以充分利用并发预算。
+筛选过程的日志输出到 stderr，结束后在 stdout 输出 JSON 格式的汇总（也可用 --summary 写入文件）。
+
+用法示例：
+    python screen_papers.py "arxiv_papers_new/arxiv_2025_08_*_llm_papers.json*" --incremental --summary screening_summary.json
+    python screen_papers.py acl_2024_main_papers.json acl_2024_findings_papers.json --stage coarse
+    python screen_papers.py "*_coarse_final.json" --stage fine
+    python screen_papers.py "arxiv_papers_new/arxiv_2024_*" --batch
+
+cron 示例（每天爬虫增量更新之后筛选本月分片）：
+    30 3 * * * cd /path/to/repo && python arxiv_crawler.py && python screen_papers.py "arxiv_papers_new/arxiv_$(date +\\%Y_\\%m)_*" --incremental --summary screening_summary.json
+"""
+import os
+import sys
+import json
+import glob
+import time
+import asyncio
+import argparse
+import contextlib
+
+from screening_core import (
+    COARSE_SYSTEM_PROMPT,
+    FINE_SYSTEM_PROMPT,
+    load_config,
+    is_screening_input,
+    get_filename_with_suffix,
+    create_client,
+    coarse_screening,
+    fine_screening,
+    pipeline_screening
+)
+
+# 写入汇总的各阶段结果字段
+SUMMARY_FIELDS = [
+    "total_papers",
+    "input_papers",
+    "screened_papers_this_run",
+    "reused_relevant_papers_count",
+    "verdict_cache_hits",
+    "resumed_verdicts",
+    "dedup",
+    "rounds_executed",
+    "final_relevant_papers_count",
+    "usage"
+]
+
+
+def expand_inputs(patterns, stage):
+    """展开通配符并去重；精排阶段的输入为粗筛结果文件，其余阶段排除中间结果和状态文件"""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for file_path in matches:
+            if not os.path.isfile(file_path) or not file_path.endswith(('.json', '.jsonl')):
+                continue
+            if stage == "fine":
+                if 'coarse_final' not in os.path.basename(file_path):
+                    continue
+            elif not is_screening_input(file_path):
+                continue
+            if file_path not in files:
+                files.append(file_path)
+
+    # 结果文件按输入文件名写到当前目录，不同目录下的同名文件会互相覆盖
+    selected, seen = [], {}
+    for file_path in files:
+        base_name = os.path.basename(file_path)
+        if base_name in seen:
+            print(f"跳过 {file_path}：与 {seen[base_name]} 同名，结果文件会冲突", file=sys.stderr)
+            continue
+        seen[base_name] = file_path
+        selected.append(file_path)
+    return selected
+
+
+def read_prompt(path, default):
+    if not path:
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def read_stage_result(output_file, run_started):
+    """读取本次运行写出的最终结果文件，文件不存在或不是本次写出的返回 None"""
+    if not os.path.exists(output_file) or os.path.getmtime(output_file) < run_started:
+        return None
+    with open(output_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    summary = {"output": output_file}
+    summary.update({field: data[field] for field in SUMMARY_FIELDS if field in data})
+    return summary
+
+
+async def screen_file(file_path, args, config, client, prompts, file_slots):
+    """处理一个输入文件，返回该文件的汇总"""
+    coarse_prompt, fine_prompt = prompts
+    async with file_slots:
+        run_started = time.time()
+        summary = {"input": file_path, "status": "ok"}
+        messages = []
+        try:
+            if args.mode == "pipeline":
+                messages.append(await pipeline_screening(file_path, None, coarse_prompt, fine_prompt, config, client=client))
+                coarse_output = get_filename_with_suffix(file_path, 'coarse_final')
+            else:
+                coarse_output = file_path
+                if args.stage in ("coarse", "both"):
+                    messages.append(await coarse_screening(
+                        file_path, None, coarse_prompt, config, incremental=args.incremental, client=client
+                    ))
+                    coarse_output = get_filename_with_suffix(file_path, 'coarse_final')
+                if args.stage in ("fine", "both") and os.path.exists(coarse_output):
+                    messages.append(await fine_screening(
+                        coarse_output, fine_prompt, config, incremental=args.incremental, client=client
+                    ))
+        except Exception as e:
+            summary.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+            return summary
+
+        if args.stage in ("coarse", "both"):
+            summary["coarse"] = read_stage_result(get_filename_with_suffix(file_path, 'coarse_final'), run_started)
+        if args.stage in ("fine", "both"):
+            summary["fine"] = read_stage_result(get_filename_with_suffix(coarse_output, 'fine_final'), run_started)
+        if any(summary.get(stage, True) is None for stage in ("coarse", "fine")):
+            # 筛选函数出错时返回以错误信息开头的文本而不写结果文件
+            summary["status"] = "error"
+            summary["error"] = next((m.strip().splitlines()[0] for m in messages if m and "完成" not in m), "未生成结果文件")
+        summary["seconds"] = round(time.time() - run_started, 1)
+        print(f"[{summary['status']}] {file_path}（{summary['seconds']} 秒）", file=sys.stderr)
+        return summary
+
+
+def stage_usage(result, field):
+    """一个文件粗筛和精排用量中 field 的合计"""
+    return sum(((result.get(stage) or {}).get("usage") or {}).get(field) or 0 for stage in ("coarse", "fine"))
+
+
+async def run(files, args, config, prompts):
+    client = create_client(config)
+    file_slots = asyncio.Semaphore(max(1, args.jobs))
+    started = time.time()
+    results = await asyncio.gather(*(screen_file(f, args, config, client, prompts, file_slots) for f in files))
+    totals = {
+        "files": len(results),
+        "succeeded": sum(1 for r in results if r["status"] == "ok"),
+        "failed": sum(1 for r in results if r["status"] != "ok"),
+        "coarse_relevant": sum((r.get("coarse") or {}).get("final_relevant_papers_count", 0) for r in results),
+        "fine_relevant": sum((r.get("fine") or {}).get("final_relevant_papers_count", 0) for r in results),
+        "total_tokens": sum(stage_usage(r, "total_tokens") for r in results),
+        "estimated_cost": round(sum(stage_usage(r, "estimated_cost") for r in results), 4),
+        "seconds": round(time.time() - started, 1),
+        "throttled_requests": client.limiter.throttled,
+        "final_concurrency_limit": client.limiter.current_limit,
+        "rate_limit_wait_seconds": round(client.rate_limiter.waited_seconds, 1) if client.rate_limiter else 0
+    }
+    return {
+        "model": config["model"],
+        "stage": args.stage,
+        "mode": args.mode,
+        "incremental": args.incremental,
+        "totals": totals,
+        "files": results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="命令行批量筛选论文（粗筛 + 精排），不依赖 Gradio")
+    parser.add_argument("inputs", nargs="+", help="输入文件或通配符（建议加引号，由程序展开）")
+    parser.add_argument("--config", default="config.json", help="配置文件路径，默认 config.json")
+    parser.add_argument("--stage", choices=["coarse", "fine", "both"], default="both",
+                        help="coarse 只粗筛；fine 只精排（输入为 *_coarse_final.json）；both 粗筛后接着精排（默认）")
+    parser.add_argument("--mode", choices=["staged", "pipeline"], default="staged",
+                        help="staged 按阶段逐轮处理（支持批量和增量模式）；pipeline 使用粗筛->精排流水线")
+    parser.add_argument("--incremental", action="store_true", help="只评估相对上次结果新增或内容变化的论文")
+    parser.add_argument("--batch", action="store_true", help="使用服务商的 Batch API 提交每一轮的请求（staged 模式），适合大批量离线筛选")
+    parser.add_argument("--jobs", type=int, default=4, help="同时处理的文件数，所有文件共享并发预算（默认 4）")
+    parser.add_argument("--rounds", type=int, help="覆盖配置中的处理轮数")
+    parser.add_argument("--max-concurrent", type=int, help="覆盖配置中的最大并发数")
+    parser.add_argument("--model", help="覆盖配置中的模型名称")
+    parser.add_argument("--coarse-prompt-file", help="粗筛提示词文件，默认使用内置提示词")
+    parser.add_argument("--fine-prompt-file", help="精排提示词文件，默认使用内置提示词")
+    parser.add_argument("--summary", help="把 JSON 汇总同时写入该文件")
+    args = parser.parse_args()
+
+    if args.mode == "pipeline" and (args.stage != "both" or args.incremental or args.batch):
+        parser.error("pipeline 模式总是同时执行粗筛和精排，且不支持增量模式和 Batch API 模式")
+    if not os.path.exists(args.config):
+        parser.error(f"配置文件 {args.config} 不存在，请参考 config.json.example 创建")
+
+    config = load_config(args.config)
+    if args.rounds is not None:
+        config["rounds"] = args.rounds
+    if args.max_concurrent is not None:
+        config["max_concurrent"] = args.max_concurrent
+    if args.model:
+        config["model"] = args.model
+    if args.batch:
+        config["batch_mode"] = True
+    prompts = (read_prompt(args.coarse_prompt_file, COARSE_SYSTEM_PROMPT), read_prompt(args.fine_prompt_file, FINE_SYSTEM_PROMPT))
+
+    files = expand_inputs(args.inputs, args.stage)
+    if not files:
+        print("没有匹配的输入文件", file=sys.stderr)
+        sys.exit(2)
+    print(f"共 {len(files)} 个输入文件，同时处理 {args.jobs} 个", file=sys.stderr)
+
+    # 筛选过程的 print 日志转到 stderr，stdout 只输出汇总
+    with contextlib.redirect_stdout(sys.stderr):
+        summary = asyncio.run(run(files, args, config, prompts))
+
+    output = json.dumps(summary, ensure_ascii=False, indent=2)
+    if args.summary:
+        tmp_path = args.summary + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(output)
+        os.replace(tmp_path, args.summary)
+    print(output)
+    sys.exit(0 if summary["totals"]["failed"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
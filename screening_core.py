@@ -0,0 +1,2709 @@
+"""
+论文筛选核心逻辑：配置、论文读取、LLM 调用（并发控制、限流、重试）、多轮投票、判定缓存、断点日志、
+本地预筛、检索索引以及粗筛 / 精排 / 流水线三种筛选流程。
+不依赖 Gradio，供界面 filtering_app_after_crawling_arxiv.py 和命令行 screen_papers.py 共用。
+"""
+import asyncio
+import json
+import os
+from openai import AsyncOpenAI, APITimeoutError
+import aiofiles
+import jsonlines
+from pathlib import Path
+import glob
+import time
+import re
+import hashlib
+import threading
+import atexit
+import itertools
+import zlib
+import unicodedata
+import gzip
+from collections import Counter
+import numpy as np
+from email.utils import parsedate_to_datetime
+
+# 默认配置
+DEFAULT_CONFIG = {
+    "api_key": "YOUR_API_KEY_HERE",
+    "base_url": "https://api.openai.com/v1/",
+    "model": "gpt-4-turbo",
+    "rounds": 3,
+    "max_concurrent": 50,
+    # 服务商的每分钟请求数/每分钟 token 数配额，0 表示不限制；同一 base_url + 模型的所有运行共享额度
+    "rpm_limit": 0,
+    "tpm_limit": 0,
+    # 模型价格：{模型名: [每百万输入 token 价格, 每百万输出 token 价格]}，用于估算每次运行的费用，未配置的模型不估算
+    "model_prices": {},
+    # Batch API 模式：粗筛/精排每一轮的请求写入批处理文件提交给服务商，轮询到任务结束后取回结果，
+    # 适合不需要实时结果的大批量筛选；batch_price_factor 为批处理价格相对实时请求的倍数
+    "batch_mode": False,
+    "batch_poll_interval": 30,
+    "batch_completion_window": "24h",
+    "batch_price_factor": 0.5,
+    # 粗筛批量模式：每个请求包含的标题数，1 表示逐篇请求
+    "coarse_batch_size": 1,
+    # 多轮投票的聚合规则：union（任一轮为True）/ majority（过半）/ k_of_n（至少 vote_k 轮）
+    "vote_rule": "union",
+    "vote_k": 1,
+    # 本地预筛：粗筛前用哈希 TF-IDF 把标题+摘要与种子词、过往精排结果比较，低于阈值的论文不调用 LLM
+    "prefilter_enabled": False,
+    "prefilter_seed_terms": "emotional support, psychological counseling, mental health, empathy, therapy, multi-turn dialogue, dialogue system, conversational agent, chatbot",
+    "prefilter_threshold": 0.03,
+    "prefilter_use_exemplars": True,
+    # 跨文件去重：筛选前按 arXiv 基础 id、DOI、规范化标题和摘要的 MinHash 近似重复把同一篇论文的多个副本归为一组，
+    # 每组只评估一次，结论沿用到组内所有副本；dedup_similarity_threshold 为判为近似重复的摘要 Jaccard 相似度
+    "dedup_enabled": False,
+    "dedup_similarity_threshold": 0.8,
+    # LLM 判定缓存：跨轮次、跨运行、跨文件复用相同模型+提示词+内容的判定结果；
+    # 存放在单独的 cache 目录，不会被当作论文文件出现在输入列表中
+    "verdict_cache_enabled": True,
+    "verdict_cache_path": "cache/verdict_cache.jsonl",
+    "verdict_cache_max_entries": 200000,
+    "verdict_cache_max_age_days": 90
+}
+
+# 预设提示词
+COARSE_SYSTEM_PROMPT = """
+Determine if this paper title is related to emotional support, psychological counseling, or multi-turn dialogue. Return True if there is any relevant content, otherwise return False.
+<True/False>
+"""
+
+FINE_SYSTEM_PROMPT = """
+Please carefully read the title and abstract of the paper and determine whether the paper is closely related to any of the following topics:
+- Emotional support
+- Psychological counseling
+- Multi-turn dialogue
+- Dialogue systems
+
+Please conduct an in-depth analysis based on the content of the abstract. Return "True" only if the core content of the paper is indeed related to the above topics.
+If the paper only mentions relevant concepts slightly or mainly focuses on other fields, return "False".
+
+<True/False>
+"""
+
+# 粗筛批量模式追加在系统提示词之后的说明，{count} 为本批标题数
+COARSE_BATCH_INSTRUCTION = """
+You will receive {count} numbered paper titles. Judge each title independently using the criteria above.
+Answer with exactly one line per title in the format "<number>: True" or "<number>: False", in the same order, and output nothing else.
+"""
+
+def load_config(config_path="config.json"):
+    """加载配置文件"""
+    if os.path.exists(config_path):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+            # 旧的配置文件缺少新增的配置项时使用默认值
+            for key, value in DEFAULT_CONFIG.items():
+                config.setdefault(key, value)
+            return config
+    else:
+        # 创建默认配置文件
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(DEFAULT_CONFIG, f, ensure_ascii=False, indent=2)
+        return DEFAULT_CONFIG
+
+def save_config(api_key, base_url, model, rounds, max_concurrent, coarse_batch_size=1, vote_rule="union", vote_k=1, rpm_limit=0, tpm_limit=0,
+                prefilter_enabled=False, prefilter_threshold=0.03, prefilter_seed_terms="", input_price=0, output_price=0, batch_mode=False,
+                dedup_enabled=False):
+    """保存配置文件，界面上没有的配置项保留原值；价格记入当前模型，两项都为 0 时删除该模型的价格"""
+    config = load_config()
+    model_prices = dict(config.get("model_prices", {}))
+    if input_price or output_price:
+        model_prices[model] = [float(input_price or 0), float(output_price or 0)]
+    else:
+        model_prices.pop(model, None)
+    config.update({
+        "api_key": api_key,
+        "base_url": base_url,
+        "model": model,
+        "rounds": int(rounds),
+        "max_concurrent": int(max_concurrent),
+        "coarse_batch_size": int(coarse_batch_size),
+        "vote_rule": vote_rule,
+        "vote_k": int(vote_k),
+        "rpm_limit": int(rpm_limit or 0),
+        "tpm_limit": int(tpm_limit or 0),
+        "prefilter_enabled": bool(prefilter_enabled),
+        "prefilter_threshold": float(prefilter_threshold),
+        "prefilter_seed_terms": prefilter_seed_terms,
+        "model_prices": model_prices,
+        "batch_mode": bool(batch_mode),
+        "dedup_enabled": bool(dedup_enabled)
+    })
+    with open("config.json", 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    return "配置已保存！"
+
+def get_json_files():
+    """获取主目录和 arxiv_papers_new 子目录下的所有JSON/JSONL文件，并应用过滤规则"""
+    # 获取主目录的文件
+    main_dir_files = glob.glob("*.json") + glob.glob("*.jsonl")
+    
+    # 获取子目录的文件
+    sub_dir_path = "arxiv_papers_new"
+    sub_dir_files = []
+    if os.path.isdir(sub_dir_path):
+        sub_dir_files = glob.glob(os.path.join(sub_dir_path, "*.json")) + glob.glob(os.path.join(sub_dir_path, "*.jsonl"))
+
+    # 合并两个列表
+    all_files = main_dir_files + sub_dir_files
+
+    return [file_path for file_path in all_files if is_screening_input(file_path)]
+
+def is_screening_input(file_path):
+    """文件是否可以作为筛选输入：排除中间结果、配置文件、判定缓存和爬虫的状态文件"""
+    # 定义过滤规则
+    excluded_suffixes = ['_coarse_', '_fine_', '.meta.json', NORMALIZED_CORPUS_SUFFIX]
+    # 旧版本的判定缓存默认写在当前目录
+    excluded_filenames = ['config.json', 'verdict_cache.jsonl']
+    subdir_excluded_filenames = ['last_crawl_time.json', 'failed_intervals.json']
+    sub_dir_path = "arxiv_papers_new"
+    base_name = os.path.basename(file_path)
+    
+    # 规则1: 过滤掉中间结果文件
+    if any(suffix in base_name for suffix in excluded_suffixes):
+        return False
+    
+    # 规则2: 过滤掉配置文件和判定缓存
+    if base_name in excluded_filenames:
+        return False
+        
+    # 规则3: 过滤掉子目录下的特定文件
+    is_in_subdir = sub_dir_path in file_path
+    if is_in_subdir and base_name in subdir_excluded_filenames:
+        return False
+    
+    return True
+
+def get_result_files():
+    """获取当前目录下的粗筛结果文件"""
+    return [f for f in glob.glob("*.json") if 'coarse_final' in f]
+
+
+def get_filename_with_suffix(original_filename, suffix):
+    """在文件名的.json/.jsonl之前添加后缀，输出文件（统一为JSON）保存到当前目录"""
+    base_filename = os.path.basename(original_filename)
+    
+    if base_filename.endswith('.json'):
+        base_name = base_filename[:-5]  # 去掉.json
+        return f"{base_name}_{suffix}.json"
+    elif base_filename.endswith('.jsonl'):
+        base_name = base_filename[:-6]  # 去掉.jsonl
+        return f"{base_name}_{suffix}.json"
+    else:
+        return f"{base_filename}_{suffix}"
+
+def iter_jsonl_papers(file_path):
+    """逐行流式读取JSONL分片，跳过中断写入留下的损坏行"""
+    with jsonlines.open(file_path) as reader:
+        for record in reader.iter(type=dict, skip_invalid=True, skip_empty=True):
+            yield record
+
+def count_jsonl_papers(file_path):
+    """统计JSONL分片的论文数，优先读取爬虫写入的 .meta.json 旁路元数据"""
+    meta_path = file_path[:-6] + ".meta.json"
+    if os.path.exists(meta_path):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)["total_papers"]
+        except (json.JSONDecodeError, KeyError):
+            pass
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return sum(1 for line in f if line.strip())
+
+JSON_STREAM_CHUNK_SIZE = 1 << 16
+_json_decoder = json.JSONDecoder()
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_JSON_NUMBER_TAIL = re.compile(r'[0-9.eE+\-]*')
+
+class _JsonStreamReader:
+    """按块读取文本文件的缓冲区，记录当前解析位置，已解析部分及时丢弃"""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        # 已丢弃部分的长度，用于在错误信息中给出文件中的位置
+        self.offset = 0
+        self.eof = False
+
+    def fill(self, min_size=0):
+        """丢弃已解析部分并继续读取，至少读入 min_size 个字符（直到文件结束），文件已读完时返回 False"""
+        if self.eof:
+            return False
+        chunk = self.f.read(max(min_size, self.chunk_size))
+        if not chunk:
+            self.eof = True
+            return False
+        self.offset += self.pos
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """跳过空白并返回下一个字符，文件结束时返回空字符串"""
+        while True:
+            self.pos = _JSON_WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"JSON 格式错误：位置 {self.offset + self.pos} 处应为 {' 或 '.join(chars)}，实际为 {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """解析下一个完整的 JSON 值；缓冲区中的值不完整时加倍读入量后重新解析"""
+        self.peek()
+        while True:
+            try:
+                value, end = _json_decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill(len(self.buf) - self.pos):
+                    raise
+                continue
+            # 缓冲区剩余部分可能是被截断的数字的后半段，读入更多内容后再确认
+            if not self.eof and _JSON_NUMBER_TAIL.fullmatch(self.buf, end):
+                self.fill(len(self.buf) - self.pos)
+                continue
+            self.pos = end
+            return value
+
+def iter_json_array_records(file_path, key='papers', chunk_size=JSON_STREAM_CHUNK_SIZE):
+    """
+    事件式流式解析 JSON 文件，逐条产出顶层对象中 key 字段数组的元素，其他顶层字段解析后即丢弃。
+    内存中只保留一个读取块和当前元素，不随文件大小增长；顶层不是对象或没有该字段时不产出任何记录。
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        reader = _JsonStreamReader(f, chunk_size)
+        if reader.peek() != '{':
+            return
+        reader.pos += 1
+        if reader.peek() == '}':
+            return
+        while True:
+            name = reader.value()
+            reader.expect(':')
+            if name == key and reader.peek() == '[':
+                reader.pos += 1
+                if reader.peek() == ']':
+                    return
+                while True:
+                    yield reader.value()
+                    if reader.expect(',]') == ']':
+                        return
+            reader.value()
+            if reader.expect(',}') == '}':
+                return
+
+def iter_json_papers(file_path, key='papers'):
+    """流式读取JSON文件中的论文，跳过不是对象的元素"""
+    for record in iter_json_array_records(file_path, key):
+        if isinstance(record, dict):
+            yield record
+
+def count_json_papers(file_path, key='papers'):
+    """流式统计JSON文件中的论文数，同时校验文件格式"""
+    return sum(1 for _ in iter_json_papers(file_path, key))
+
+# ACL 论文集文件的 title 字段里是整段 BibTeX（作者、编者、URL、摘要等），需要解析为独立字段
+BIBTEX_RECORD_PATTERN = re.compile(r'",\s*\n?\s*\w+\s*=')
+BIBTEX_FIELD_PATTERN = re.compile(r',?\s*\n\s*(\w+)\s*=\s*')
+NORMALIZED_CORPUS_SUFFIX = ".normalized.jsonl"
+
+def is_bibtex_record(paper):
+    return bool(BIBTEX_RECORD_PATTERN.search(paper.get('title', '')))
+
+def clean_bibtex_value(value):
+    """去掉 BibTeX 字段值的引号、花括号和常见转义，合并空白"""
+    value = value.strip().rstrip(',').strip()
+    if value.startswith('"'):
+        value = value[1:]
+    if value.endswith('"'):
+        value = value[:-1]
+    value = re.sub(r'\\([&%_#$])', r'\1', value).replace('{', '').replace('}', '')
+    return re.sub(r'\s+', ' ', value).strip()
+
+def parse_bibtex_fields(blob):
+    """解析 title 字段中的 BibTeX 片段，返回 {字段名: 值}，开头的标题记为 title"""
+    # 片段末尾可能粘连着下一条 @proceedings 记录
+    entry = blob.split('\n}', 1)[0]
+    parts = BIBTEX_FIELD_PATTERN.split(entry)
+    fields = {'title': parts[0]}
+    for name, value in zip(parts[1::2], parts[2::2]):
+        fields.setdefault(name.lower(), value)
+    return {name: clean_bibtex_value(value) for name, value in fields.items()}
+
+def normalize_paper(paper):
+    """把 BibTeX 记录转换为 title/abstract/authors/url/doi 字段，其他记录原样返回"""
+    if not is_bibtex_record(paper):
+        return paper
+    fields = parse_bibtex_fields(paper['title'])
+    authors = [name.strip() for name in re.split(r'\s+and\s+', fields.get('author', '')) if name.strip()]
+    normalized = {
+        "title": fields['title'],
+        "abstract": paper.get('abstract', '').strip() or fields.get('abstract', ''),
+        "authors": authors,
+        "url": paper.get('url') or fields.get('url', ''),
+        "doi": fields.get('doi', '')
+    }
+    for name, value in paper.items():
+        normalized.setdefault(name, value)
+    return normalized
+
+def get_display_title(paper):
+    """论文标题，未规范化的 BibTeX 记录只取第一个字段之前的部分"""
+    title = paper.get('title', '')
+    if BIBTEX_RECORD_PATTERN.search(title):
+        return clean_bibtex_value(BIBTEX_RECORD_PATTERN.split(title, 1)[0])
+    return title.strip()
+
+def get_paper_authors(paper):
+    authors = paper.get('authors')
+    if isinstance(authors, list):
+        return ", ".join(authors)
+    match = re.search(r'author\s*=\s*"([^"]*)"', paper.get('title', ''))
+    if match:
+        return ", ".join(name.strip() for name in re.split(r'\s+and\s+', match.group(1)) if name.strip())
+    return authors or ""
+
+def get_normalized_corpus_path(file_path):
+    return file_path[:-len('.json')] + NORMALIZED_CORPUS_SUFFIX
+
+def build_normalized_corpus(file_path, key='papers'):
+    """
+    一次性把 JSON 文件中的 BibTeX 记录规范化，写成与爬虫分片相同的 JSONL 语料和 .meta.json 旁路元数据，
+    粗筛、精排和检索都读取规范化后的记录。源文件未变化时直接复用已有语料。
+    返回语料路径；文件中不是 BibTeX 记录或语料无法写入时返回 None，调用方直接读取源文件。
+    """
+    corpus_path = get_normalized_corpus_path(file_path)
+    meta_path = corpus_path[:-len('.jsonl')] + ".meta.json"
+    stat = os.stat(file_path)
+    source = {"source": os.path.basename(file_path), "source_mtime": stat.st_mtime, "source_size": stat.st_size}
+    if os.path.exists(corpus_path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if all(meta.get(name) == value for name, value in source.items()):
+                return corpus_path
+        except (OSError, ValueError):
+            pass
+
+    papers = iter_json_papers(file_path, key)
+    first = next(papers, None)
+    if first is None or not is_bibtex_record(first):
+        return None
+    count = 0
+    try:
+        tmp_path = corpus_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for paper in itertools.chain([first], papers):
+                f.write(json.dumps(normalize_paper(paper), ensure_ascii=False) + "\n")
+                count += 1
+        os.replace(tmp_path, corpus_path)
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(source, total_papers=count), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, meta_path)
+    except OSError as e:
+        print(f"写入规范化语料 {corpus_path} 失败，将直接读取源文件: {e}")
+        return None
+    print(f"已将 {file_path} 中的 {count} 条 BibTeX 记录规范化为 {corpus_path}（{os.path.getsize(file_path) / 1e6:.1f}MB -> {os.path.getsize(corpus_path) / 1e6:.1f}MB）")
+    return corpus_path
+
+class PaperSource:
+    """
+    可重复迭代的论文来源，每一轮筛选都重新迭代一次。
+    每次迭代都从磁盘流式读取（JSONL 逐行，JSON 逐条解析论文数组），论文边解析边交给筛选任务，不在内存中保留整个语料。
+    BibTeX 格式的输入文件先规范化为 JSONL 语料再读取，已有结果文件中未规范化的记录在读取时转换。
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._count = 0
+
+    async def add_file(self, file_path, key='papers'):
+        """加入一个输入文件，返回其中的论文数"""
+        if not file_path.endswith('.jsonl') and key == 'papers':
+            file_path = await asyncio.to_thread(build_normalized_corpus, file_path) or file_path
+        if file_path.endswith('.jsonl'):
+            count = count_jsonl_papers(file_path)
+        else:
+            # 统计一遍同时校验格式，格式错误在读取阶段报出而不是筛选中途
+            count = await asyncio.to_thread(count_json_papers, file_path, key)
+        self._parts.append((file_path, key))
+        self._count += count
+        return count
+
+    def __iter__(self):
+        for file_path, key in self._parts:
+            if file_path.endswith('.jsonl'):
+                papers = iter_jsonl_papers(file_path)
+            else:
+                papers = iter_json_papers(file_path, key)
+            yield from map(normalize_paper, papers)
+
+    def __len__(self):
+        return self._count
+
+def get_paper_key(paper):
+    """论文的唯一键：arXiv 论文使用去掉版本号的基础 id（新版本视为同一篇论文），其他论文使用标题"""
+    arxiv_id = paper.get('arxiv_id')
+    if arxiv_id:
+        return "arxiv:" + re.sub(r'v\d+$', '', arxiv_id)
+    return "title:" + paper.get('title', '').strip()
+
+def get_content_hash(paper):
+    """模型实际看到的内容（标题+摘要）的哈希，内容不变的论文无需重新评估"""
+    content = paper.get('title', '').strip() + "\n" + paper.get('abstract', '').strip()
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+
+class SubsetSource:
+    """只迭代来源中键属于 keys 的论文，同一个键只迭代第一次出现的论文，保持 PaperSource 的可重复迭代特性"""
+
+    def __init__(self, source, keys):
+        self.source = source
+        self.keys = keys
+
+    def __iter__(self):
+        seen = set()
+        for paper in self.source:
+            key = get_paper_key(paper)
+            if key in self.keys and key not in seen:
+                seen.add(key)
+                yield paper
+
+    def __len__(self):
+        return len(self.keys)
+
+def get_vote_threshold(config, rounds):
+    """按聚合规则返回 rounds 轮中判定为相关所需的 True 票数"""
+    rule = config.get("vote_rule", "union")
+    if rule == "union":
+        return 1
+    if rule == "majority":
+        return rounds // 2 + 1
+    if rule == "k_of_n":
+        return min(max(1, int(config.get("vote_k", 1))), rounds)
+    raise ValueError(f"不支持的投票规则: {rule}")
+
+class _RecordingSource:
+    """迭代时记录交给模型评估的论文键，长度与原来源一致"""
+
+    def __init__(self, source, keys):
+        self.source = source
+        self.keys = keys
+
+    def __iter__(self):
+        for paper in self.source:
+            if paper.get('title'):
+                self.keys.add(get_paper_key(paper))
+            yield paper
+
+    def __len__(self):
+        return len(self.source)
+
+class VoteScheduler:
+    """
+    多轮投票的早停调度。threshold 为 rounds 轮中判定为相关所需的 True 票数：
+    票数已达到阈值的论文确定为相关，剩余轮数全投 True 也达不到阈值的论文确定为不相关，
+    只有结论仍未确定的论文进入下一轮。
+    """
+
+    def __init__(self, rounds, threshold):
+        self.rounds = rounds
+        self.threshold = threshold
+        self.votes = {}
+        self.relevant = {}
+        self.undecided = None
+        self.round_stats = []
+
+    def round_source(self, papers):
+        """本轮需要评估的论文：第一轮为全部论文，之后只包含未确定的论文"""
+        self._asked = set()
+        if self.undecided is None:
+            return _RecordingSource(papers, self._asked)
+        return _RecordingSource(SubsetSource(papers, self.undecided), self._asked)
+
+    def finished(self):
+        return self.undecided is not None and not self.undecided
+
+    def decide(self, votes, round_num):
+        """第 round_num 轮结束、已有 votes 票 True 时的结论：True 确定相关，False 确定不相关，None 仍未确定"""
+        if votes >= self.threshold:
+            return True
+        if votes + self.rounds - round_num < self.threshold:
+            return False
+        return None
+
+    def record_round(self, round_num, relevant_papers, asked=None):
+        """记录一轮的判定并返回本轮统计；asked 为本轮评估的论文键，默认取 round_source 迭代时记录的键"""
+        asked = self._asked if asked is None else asked
+        relevant_keys = set()
+        for paper in relevant_papers:
+            key = get_paper_key(paper)
+            relevant_keys.add(key)
+            self.relevant.setdefault(key, paper)
+        undecided = set()
+        decided_relevant = decided_irrelevant = 0
+        for key in asked:
+            if key in relevant_keys:
+                self.votes[key] = self.votes.get(key, 0) + 1
+            decision = self.decide(self.votes.get(key, 0), round_num)
+            if decision is True:
+                decided_relevant += 1
+            elif decision is False:
+                decided_irrelevant += 1
+            else:
+                undecided.add(key)
+        # 还未确定的论文里暂存的相关论文只是候选，最终结果只取达到阈值的论文
+        self.undecided = undecided
+        stats = {
+            "round": round_num,
+            "asked": len(asked),
+            "count": len(relevant_keys),
+            "decided_relevant": decided_relevant,
+            "decided_irrelevant": decided_irrelevant,
+            "undecided": len(undecided)
+        }
+        self.round_stats.append(stats)
+        return stats
+
+    def final_relevant(self):
+        return [paper for key, paper in self.relevant.items() if self.votes.get(key, 0) >= self.threshold]
+
+    @staticmethod
+    def format_stats(stats, label):
+        return (
+            f"- 第{stats['round']}轮{label}：评估 {stats['asked']} 篇，判为相关 {stats['count']} 篇，"
+            f"确定相关 {stats['decided_relevant']} 篇，确定不相关 {stats['decided_irrelevant']} 篇，仍未确定 {stats['undecided']} 篇"
+        )
+
+class VerdictCache:
+    """
+    持久化的 LLM 判定缓存，跨轮次、跨运行、跨文件复用。
+    键由模型名、系统提示词哈希、阶段（粗筛/精排）、轮次和模型实际收到的用户消息哈希组成，任一项变化都会重新调用 API；
+    轮次参与计算，多轮筛选的每一轮仍是独立的一次采样。
+    新判定先缓存在内存中，攒满 APPEND_BATCH 条或距上次追加超过 APPEND_INTERVAL 秒时一次性追加到 JSONL 文件，
+    避免每个请求都在事件循环中打开文件；每轮结束和进程退出时 save_pending() 写出剩余判定。
+    代价是进程被强制杀死（SIGKILL、OOM）时最多丢失最近 APPEND_INTERVAL 秒内、不超过 APPEND_BATCH 条判定，
+    丢失的判定下次运行会重新调用 API，不影响结果正确性。
+    flush() 时淘汰过期条目，超出条目上限时按最近使用时间淘汰，再整体重写文件（包括还未追加的判定）。
+    """
+
+    APPEND_BATCH = 64
+    APPEND_INTERVAL = 2.0
+
+    def __init__(self, path, max_entries, max_age_days):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._entries = None
+        self._pending = []
+        self._last_append = time.time()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model, system_prompt, stage, round_num, user_content):
+        prompt_hash = hashlib.sha1(system_prompt.strip().encode('utf-8')).hexdigest()[:16]
+        content_hash = hashlib.sha1(user_content.encode('utf-8')).hexdigest()[:16]
+        return f"{model}|{prompt_hash}|{stage}|{round_num}|{content_hash}"
+
+    def _is_expired(self, entry, now):
+        return self.max_age_days and now - entry["created"] > self.max_age_days * 86400
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+        self._entries = {}
+        if self.path.exists():
+            now = time.time()
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 写入中断留下的半行
+                        continue
+                    if not self._is_expired(entry, now):
+                        self._entries[entry["key"]] = entry
+        return self._entries
+
+    def get(self, key):
+        """命中时返回缓存的判定（True/False），否则返回 None"""
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry["used"] = time.time()
+            self.hits += 1
+            return entry["verdict"]
+
+    def put(self, key, verdict):
+        now = time.time()
+        entry = {"key": key, "verdict": verdict, "created": now, "used": now}
+        with self._lock:
+            self._load()[key] = entry
+            self._pending.append(entry)
+            if len(self._pending) >= self.APPEND_BATCH or now - self._last_append >= self.APPEND_INTERVAL:
+                self._append_pending()
+
+    def _append_pending(self):
+        self._last_append = time.time()
+        if not self._pending:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in self._pending))
+        self._pending = []
+
+    def save_pending(self):
+        """把内存中还未追加的判定写入文件（每轮结束和进程退出时调用）"""
+        with self._lock:
+            self._append_pending()
+
+    def flush(self):
+        """淘汰过期和超出上限的条目，并把最近使用时间一起写回文件"""
+        with self._lock:
+            if self._entries is None:
+                return
+            now = time.time()
+            entries = [entry for entry in self._entries.values() if not self._is_expired(entry, now)]
+            if self.max_entries and len(entries) > self.max_entries:
+                entries = sorted(entries, key=lambda e: e["used"], reverse=True)[:self.max_entries]
+            evicted = len(self._entries) - len(entries)
+            self._entries = {entry["key"]: entry for entry in entries}
+            self._pending = []
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+            if evicted:
+                print(f"判定缓存淘汰 {evicted} 条，剩余 {len(entries)} 条")
+
+_verdict_cache = None
+_verdict_cache_lock = threading.Lock()
+
+def get_verdict_cache(config):
+    """按配置返回进程内共享的判定缓存，未启用时返回 None"""
+    global _verdict_cache
+    if not config.get("verdict_cache_enabled", True):
+        return None
+    path = Path(config.get("verdict_cache_path", DEFAULT_CONFIG["verdict_cache_path"]))
+    with _verdict_cache_lock:
+        if _verdict_cache is None or _verdict_cache.path != path:
+            if _verdict_cache is not None:
+                _verdict_cache.save_pending()
+            _verdict_cache = VerdictCache(path, 0, 0)
+            atexit.register(_verdict_cache.save_pending)
+        _verdict_cache.max_entries = config.get("verdict_cache_max_entries", DEFAULT_CONFIG["verdict_cache_max_entries"])
+        _verdict_cache.max_age_days = config.get("verdict_cache_max_age_days", DEFAULT_CONFIG["verdict_cache_max_age_days"])
+        return _verdict_cache
+
+class ScreeningJournal:
+    """
+    断点续跑日志：每个判定完成后立即追加一行并 flush，进程崩溃、OOM 或 Gradio 重启后，
+    同样参数的下一次运行从日志恢复，已判定的论文（内容未变化）不再调用 API。
+    首行记录运行参数（阶段、模型、提示词、输入文件、轮数、投票规则），与本次运行不一致时旧日志作废。
+    最终结果写出后删除日志。
+    """
+
+    def __init__(self, path, header):
+        self.path = path
+        self.header = header
+        self.entries = {}
+        self.resumed = 0
+        self._lock = threading.Lock()
+        if not self._load():
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(header, ensure_ascii=False) + "\n")
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def path_for(final_output_file):
+        return final_output_file[:-len('.json')] + ".journal.jsonl"
+
+    @staticmethod
+    def prompt_hash(system_prompt):
+        return hashlib.sha1(system_prompt.strip().encode('utf-8')).hexdigest()[:16]
+
+    def _load(self):
+        """读取已有日志，参数一致时返回 True"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'r', encoding='utf-8') as f:
+            try:
+                header = json.loads(f.readline())
+            except json.JSONDecodeError:
+                return False
+            if header != self.header:
+                print(f"断点日志 {self.path} 的运行参数与本次不同，重新开始")
+                return False
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 崩溃时写了一半的最后一行
+                    continue
+                self.entries[(entry["stage"], entry["round"], entry["key"])] = (entry["hash"], entry["verdict"])
+        print(f"发现断点日志 {self.path}，已有 {len(self.entries)} 条判定，将从断点继续")
+        return True
+
+    def get(self, stage, round_num, paper):
+        """论文在该阶段该轮已有判定且内容未变化时返回判定，否则返回 None"""
+        entry = self.entries.get((stage, round_num, get_paper_key(paper)))
+        if entry is None or entry[0] != get_content_hash(paper):
+            return None
+        self.resumed += 1
+        return entry[1]
+
+    def record(self, stage, round_num, paper, verdict):
+        key = get_paper_key(paper)
+        content_hash = get_content_hash(paper)
+        line = json.dumps({"stage": stage, "round": round_num, "key": key, "hash": content_hash, "verdict": verdict}, ensure_ascii=False)
+        with self._lock:
+            self.entries[(stage, round_num, key)] = (content_hash, verdict)
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self, completed):
+        """completed 为 True 表示最终结果已写出，删除日志"""
+        self._file.close()
+        if completed and os.path.exists(self.path):
+            os.remove(self.path)
+
+async def plan_incremental_screening(papers_data, final_output_file, incremental):
+    """
+    计算本次输入中每篇论文的内容哈希；增量模式下与上次结果文件中的 screened_papers 对比，
+    只返回新增或内容发生变化的论文，未变化论文的上次结论直接复用。
+    返回 (待评估论文, 复用的相关论文, 本次输入的 {键: 内容哈希})
+    """
+    screened_hashes = {get_paper_key(p): get_content_hash(p) for p in papers_data if p.get('title')}
+    if not incremental or not os.path.exists(final_output_file):
+        return papers_data, [], screened_hashes
+
+    try:
+        async with aiofiles.open(final_output_file, 'r', encoding='utf-8') as f:
+            previous = json.loads(await f.read())
+    except Exception as e:
+        print(f"读取上次结果 {final_output_file} 失败，将重新评估全部论文: {e}")
+        return papers_data, [], screened_hashes
+
+    previous_hashes = previous.get('screened_papers', {})
+    changed_keys = {key for key, content_hash in screened_hashes.items() if previous_hashes.get(key) != content_hash}
+    reused_relevant = [
+        paper for paper in previous.get('relevant_papers', [])
+        if get_paper_key(paper) in screened_hashes and get_paper_key(paper) not in changed_keys
+    ]
+    print(f"增量模式：{len(screened_hashes) - len(changed_keys)} 篇论文内容未变化，复用上次结果；{len(changed_keys)} 篇需要重新评估")
+    return SubsetSource(papers_data, changed_keys), reused_relevant, screened_hashes
+
+# 本地预筛的哈希特征维度
+PREFILTER_DIM = 2 ** 20
+PREFILTER_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or our that the their this to we with via using based".split()
+)
+
+def normalize_words(text):
+    """小写分词，去掉停用词，复数去掉结尾的 s"""
+    words = []
+    for word in re.findall(r'[a-z0-9]+', text.lower()):
+        if word in PREFILTER_STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+def prefilter_tokens(text):
+    """预筛特征：词和相邻词对"""
+    words = normalize_words(text)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def build_prefilter_text(paper):
+    return f"{get_display_title(paper)} {paper.get('abstract', '')}"
+
+class HashedTfidf:
+    """
+    哈希 TF-IDF：特征为词和相邻词对，经 crc32 哈希到 PREFILTER_DIM 维，IDF 取自待筛选的论文集合。
+    文档矩阵以 (行号, 特征, 权重) 三个 numpy 数组保存，相似度计算全部向量化。
+    """
+
+    def __init__(self, texts):
+        self.matrix = self._count(texts)
+        rows, indices, counts, n_docs = self.matrix
+        df = np.bincount(indices, minlength=PREFILTER_DIM)
+        self.idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+        self.matrix = self._weight(self.matrix)
+        rows, indices, weights, n_docs = self.matrix
+        self.center = (np.bincount(indices, weights=weights, minlength=PREFILTER_DIM) / max(n_docs, 1)).astype(np.float32)
+
+    @staticmethod
+    def _count(texts):
+        rows, indices, counts = [], [], []
+        n_docs = 0
+        for row, text in enumerate(texts):
+            n_docs += 1
+            features = np.fromiter((zlib.crc32(token.encode('utf-8')) for token in prefilter_tokens(text)), dtype=np.int64)
+            if not features.size:
+                continue
+            unique, unique_counts = np.unique(features & (PREFILTER_DIM - 1), return_counts=True)
+            rows.append(np.full(unique.size, row, dtype=np.int32))
+            indices.append(unique.astype(np.int32))
+            counts.append(unique_counts.astype(np.float32))
+        if not rows:
+            empty = np.zeros(0, dtype=np.int32)
+            return empty, empty, np.zeros(0, dtype=np.float32), n_docs
+        return np.concatenate(rows), np.concatenate(indices), np.concatenate(counts), n_docs
+
+    def _weight(self, matrix):
+        """次线性 TF 乘 IDF 后按行做 L2 归一化"""
+        rows, indices, counts, n_docs = matrix
+        weights = (1 + np.log(counts)) * self.idf[indices]
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n_docs))
+        weights = weights / np.maximum(norms[rows], 1e-12)
+        return rows, indices, weights, n_docs
+
+    def transform(self, texts):
+        return self._weight(self._count(texts))
+
+    def query_vector(self, texts):
+        """多段文本的归一化质心，作为稠密查询向量；没有文本时返回 None"""
+        rows, indices, weights, n_docs = self.transform(texts)
+        if not weights.size:
+            return None
+        query = np.bincount(indices, weights=weights, minlength=PREFILTER_DIM)
+        return (query / np.linalg.norm(query)).astype(np.float32)
+
+    def topic_query(self, seed_texts, exemplar_texts):
+        """
+        种子词质心加上范例论文的 Rocchio 修正：范例质心减去全体论文的平均向量后只保留正值，
+        去掉 "llm"、"model" 这类所有论文都有的词，两部分各自归一化后等权相加。
+        """
+        parts = []
+        seed = self.query_vector(seed_texts)
+        if seed is not None:
+            parts.append(seed)
+        exemplar = self.query_vector(exemplar_texts)
+        if exemplar is not None:
+            exemplar = np.maximum(exemplar - self.center, 0)
+            norm = np.linalg.norm(exemplar)
+            if norm > 0:
+                parts.append(exemplar / norm)
+        if not parts:
+            return None
+        query = np.sum(parts, axis=0)
+        return (query / np.linalg.norm(query)).astype(np.float32)
+
+    @staticmethod
+    def scores(matrix, query):
+        """矩阵每一行与查询向量的余弦相似度"""
+        rows, indices, weights, n_docs = matrix
+        if query is None:
+            return np.zeros(n_docs, dtype=np.float32)
+        return np.bincount(rows, weights=weights * query[indices], minlength=n_docs)
+
+def load_prefilter_exemplars():
+    """读取当前目录（含子目录）下过往精排最终结果中的相关论文，返回 {文件路径: [论文]}"""
+    exemplars = {}
+    for path in glob.glob('**/*_fine_final.json', recursive=True):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                papers = [p for p in json.load(f).get('relevant_papers', []) if p.get('title')]
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"读取精排结果 {path} 失败，跳过: {e}")
+            continue
+        if papers:
+            exemplars[path] = papers
+    return exemplars
+
+def get_prefilter_seed_terms(config):
+    terms = config.get("prefilter_seed_terms", "")
+    if isinstance(terms, str):
+        terms = terms.replace('，', ',').split(',')
+    return [term.strip() for term in terms if term.strip()]
+
+def run_prefilter(papers_data, config):
+    """
+    对待筛选论文打分：分数为与主题查询向量（种子词 + 过往精排相关论文，见 HashedTfidf.topic_query）的余弦相似度。
+    预期召回率用过往精排结果估计：逐个结果文件留出，用种子词和其余文件的相关论文给它打分，统计达到阈值的比例。
+    返回 (保留的论文键集合, 报告)
+    """
+    threshold = float(config.get("prefilter_threshold", 0.03))
+    keys, texts = [], []
+    for paper in papers_data:
+        if paper.get('title'):
+            keys.append(get_paper_key(paper))
+            texts.append(build_prefilter_text(paper))
+    model = HashedTfidf(texts)
+    seed_terms = get_prefilter_seed_terms(config)
+    exemplars = load_prefilter_exemplars() if config.get("prefilter_use_exemplars", True) else {}
+    query = model.topic_query(seed_terms, [build_prefilter_text(p) for papers in exemplars.values() for p in papers])
+    scores = model.scores(model.matrix, query)
+    kept_keys = {key for key, score in zip(keys, scores) if score >= threshold}
+
+    held_out_scores = []
+    for path, papers in exemplars.items():
+        others = [build_prefilter_text(p) for other, other_papers in exemplars.items() if other != path for p in other_papers]
+        matrix = model.transform([build_prefilter_text(p) for p in papers])
+        held_out_scores.append(model.scores(matrix, model.topic_query(seed_terms, others)))
+    report = {
+        "threshold": threshold,
+        "input_papers": len(keys),
+        "kept_papers": len(kept_keys),
+        "skipped_papers": len(keys) - len(kept_keys),
+        "exemplar_files": len(exemplars),
+        "recall_samples": 0,
+        "expected_recall": None,
+        "threshold_for_95_recall": None
+    }
+    if held_out_scores:
+        held_out_scores = np.concatenate(held_out_scores)
+        report["recall_samples"] = int(held_out_scores.size)
+        report["expected_recall"] = round(float(np.mean(held_out_scores >= threshold)), 4)
+        report["threshold_for_95_recall"] = round(float(np.quantile(held_out_scores, 0.05)), 4)
+    return kept_keys, report
+
+def apply_prefilter(papers_to_screen, config, screened_hashes=None, corpus=None):
+    """
+    config 启用本地预筛时过滤待粗筛的论文，返回 (待粗筛论文, 预筛报告或 None)。
+    corpus 为完整输入（增量模式下待粗筛论文只是其中一部分），IDF 和打分都基于完整输入，保证与全量运行的分数一致。
+    被预筛跳过的论文从 screened_hashes 中移除，下次增量运行时会重新预筛（调整阈值后即可生效）。
+    """
+    if not config.get("prefilter_enabled"):
+        return papers_to_screen, None
+    start_time = time.monotonic()
+    kept_keys, report = run_prefilter(papers_to_screen if corpus is None else corpus, config)
+    candidate_keys = {get_paper_key(paper) for paper in papers_to_screen if paper.get('title')}
+    kept_keys &= candidate_keys
+    report.update({
+        "input_papers": len(candidate_keys),
+        "kept_papers": len(kept_keys),
+        "skipped_papers": len(candidate_keys) - len(kept_keys),
+        "seconds": round(time.monotonic() - start_time, 2)
+    })
+    if screened_hashes is not None:
+        for key in candidate_keys - kept_keys:
+            screened_hashes.pop(key, None)
+    print(f"本地预筛：{report['input_papers']} 篇中保留 {report['kept_papers']} 篇，跳过 {report['skipped_papers']} 篇，耗时 {report['seconds']} 秒")
+    print(format_prefilter_report(report))
+    return SubsetSource(papers_to_screen, kept_keys), report
+
+def format_prefilter_report(report):
+    if report["expected_recall"] is None:
+        recall = "没有过往精排结果，无法估计召回率"
+    else:
+        recall = (f"按过往精排结果估计召回率 {report['expected_recall'] * 100:.1f}%（{report['recall_samples']} 篇），"
+                  f"召回 95% 需要阈值不高于 {report['threshold_for_95_recall']}")
+    return f"- 本地预筛：阈值 {report['threshold']}，保留 {report['kept_papers']}/{report['input_papers']} 篇，{recall}"
+
+# 跨文件去重
+DEDUP_MIN_TITLE_LENGTH = 16
+DEDUP_MIN_ABSTRACT_WORDS = 20
+ARXIV_DOI_PATTERN = re.compile(r'^10\.48550/arxiv\.(.+)$')
+ARXIV_URL_PATTERN = re.compile(r'arxiv\.org/(?:abs|pdf)/([^?#]+?)(?:\.pdf)?/?$')
+
+def fold_title(title):
+    """折叠大小写、重音和标点后的标题，去掉所有空白和符号"""
+    title = unicodedata.normalize('NFKD', title)
+    title = "".join(ch for ch in title if not unicodedata.combining(ch))
+    return re.sub(r'[\W_]+', '', title.casefold())
+
+def get_dedup_keys(paper):
+    """论文的规范化键 [(来源, 键)]：arXiv 基础 id（含 arXiv DOI 和链接中的 id）、DOI、折叠后的标题"""
+    keys = []
+    doi = re.sub(r'^(https?://)?(dx\.)?doi\.org/', '', str(paper.get('doi') or '').strip().lower())
+    arxiv_id = paper.get('arxiv_id')
+    if not arxiv_id:
+        match = ARXIV_DOI_PATTERN.match(doi) or ARXIV_URL_PATTERN.search(str(paper.get('url') or ''))
+        arxiv_id = match.group(1) if match else None
+    if arxiv_id:
+        keys.append(("arxiv_id", "arxiv:" + re.sub(r'v\d+$', '', arxiv_id.lower())))
+    if doi and not ARXIV_DOI_PATTERN.match(doi):
+        keys.append(("doi", "doi:" + doi))
+    title = fold_title(get_display_title(paper))
+    # 过短的标题（如 "Preface"）不能说明是同一篇论文
+    if len(title) >= DEDUP_MIN_TITLE_LENGTH:
+        keys.append(("title", "title:" + title))
+    return keys
+
+class MinHashLSH:
+    """
+    摘要的 MinHash 签名与 LSH 分桶。特征为相邻三个词（由各词的 crc32 组合而成），
+    用 num_perm 个随机的 multiply-shift 哈希（64 位乘加后取高 32 位）各取最小值得到签名。
+    签名分成 bands 段，每段的每个取值只记住第一篇论文，之后任一段与之相同的论文成为候选，
+    再用签名中相同位置的比例（Jaccard 相似度的估计）确认。默认 16 段 x 4 行，Jaccard 0.8 的论文对几乎都会成为候选。
+    """
+
+    def __init__(self, threshold, num_perm=64, bands=16, seed=1):
+        rng = np.random.default_rng(seed)
+        self.a = (rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+        self.threshold = threshold
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.buckets = {}
+        self.signatures = {}
+
+    def signature(self, text):
+        """文本的签名，词数太少时返回 None"""
+        words = re.findall(r'[a-z0-9]+', text.lower())
+        if len(words) < DEDUP_MIN_ABSTRACT_WORDS:
+            return None
+        # 每个词只哈希一次，相邻三个词的哈希在 numpy 中组合为词组特征
+        hashes = np.fromiter(map(zlib.crc32, map(str.encode, words)), dtype=np.uint64, count=len(words))
+        shingles = (hashes[:-2] * np.uint64(0x9E3779B1)) ^ (hashes[1:-1] * np.uint64(0x85EBCA77)) ^ hashes[2:]
+        return ((self.a[:, None] * shingles[None, :] + self.b[:, None]) >> np.uint64(32)).min(axis=1).astype(np.uint32)
+
+    def add(self, item, text):
+        """加入一篇论文，返回之前加入的论文中与它近似重复的条目"""
+        signature = self.signature(text)
+        if signature is None:
+            return []
+        matches = []
+        for band in range(self.bands):
+            bucket_key = (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            owner = self.buckets.setdefault(bucket_key, item)
+            if owner != item and owner not in matches and np.mean(self.signatures[owner] == signature) >= self.threshold:
+                matches.append(owner)
+        self.signatures[item] = signature
+        return matches
+
+class Deduplicator:
+    """
+    把待筛选论文中同一篇论文的多个副本归为一组（并查集）：论文键相同、任一规范化键相同（见 get_dedup_keys）
+    或摘要近似重复（见 MinHashLSH）的论文属于同一组，组内最先出现的论文作为代表。
+    source 为去重前的论文来源，结论沿用到副本时从中读取副本的完整记录。
+    """
+
+    REASONS = ("same_key", "arxiv_id", "doi", "title", "abstract")
+
+    def __init__(self, source, threshold):
+        self.source = source
+        self.threshold = threshold
+        self.lsh = MinHashLSH(threshold)
+        self.parent = {}
+        self.order = {}
+        self.owners = {}
+        self.records = 0
+        self.merged = dict.fromkeys(self.REASONS, 0)
+        self._groups = None
+        for paper in source:
+            if paper.get('title'):
+                self.add(paper)
+
+    def find(self, key):
+        root = key
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[key] != root:
+            self.parent[key], key = root, self.parent[key]
+        return root
+
+    def union(self, a, b, reason):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        # 先出现的论文作为代表
+        if self.order[root_b] < self.order[root_a]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.merged[reason] += 1
+
+    def add(self, paper):
+        self.records += 1
+        key = get_paper_key(paper)
+        if key in self.parent:
+            self.merged["same_key"] += 1
+            return
+        self.parent[key] = key
+        self.order[key] = len(self.order)
+        for reason, dedup_key in get_dedup_keys(paper):
+            self.union(key, self.owners.setdefault(dedup_key, key), reason)
+        for other in self.lsh.add(key, paper.get('abstract', '')):
+            self.union(key, other, "abstract")
+
+    def groups(self):
+        """{代表论文键: [组内所有论文键]}，按出现顺序排列"""
+        if self._groups is None:
+            self._groups = {}
+            for key in self.order:
+                self._groups.setdefault(self.find(key), []).append(key)
+        return self._groups
+
+    def duplicate_groups(self):
+        """有副本的组：{代表论文键: [副本论文键]}"""
+        return {key: members[1:] for key, members in self.groups().items() if len(members) > 1}
+
+    def fan_out(self, relevant_papers):
+        """把代表论文的结论沿用到组内副本，返回相关论文加上它们的副本"""
+        groups = self.groups()
+        relevant_keys = {get_paper_key(paper) for paper in relevant_papers}
+        copy_keys = {key for rep in relevant_keys for key in groups.get(rep, [])[1:]} - relevant_keys
+        if not copy_keys:
+            return list(relevant_papers)
+        return list(relevant_papers) + list(SubsetSource(self.source, copy_keys))
+
+    def report(self):
+        groups = self.groups()
+        return {
+            "similarity_threshold": self.threshold,
+            "input_papers": self.records,
+            "unique_papers": len(groups),
+            "duplicate_papers": self.records - len(groups),
+            "duplicate_groups": sum(1 for members in groups.values() if len(members) > 1),
+            "merged_by": dict(self.merged)
+        }
+
+def apply_dedup(papers_to_screen, config):
+    """
+    config 启用去重时把待筛选论文按副本分组，返回 (只含每组代表的待筛选论文, Deduplicator 或 None)。
+    增量模式下只在本次待评估的论文之间去重，未变化的论文沿用上次的结果。
+    """
+    if not config.get("dedup_enabled"):
+        return papers_to_screen, None
+    start_time = time.monotonic()
+    dedup = Deduplicator(papers_to_screen, float(config.get("dedup_similarity_threshold", 0.8)))
+    report = dedup.report()
+    print(f"跨文件去重：{report['input_papers']} 篇中 {report['unique_papers']} 篇不重复，"
+          f"合并 {report['duplicate_papers']} 篇副本，耗时 {time.monotonic() - start_time:.2f} 秒")
+    return SubsetSource(papers_to_screen, set(dedup.groups())), dedup
+
+def fan_out_duplicates(dedup, relevant_papers):
+    return dedup.fan_out(relevant_papers) if dedup else relevant_papers
+
+def get_merge_key(dedup, paper):
+    """阶段结束时合并相关论文的键：去重时为论文键（保留沿用结论的副本），否则为标题"""
+    return get_paper_key(paper) if dedup else paper['title']
+
+def format_dedup_report(report):
+    merged = report["merged_by"]
+    return (f"- 跨文件去重：{report['input_papers']} 篇中 {report['unique_papers']} 篇不重复，合并 {report['duplicate_papers']} 篇副本"
+            f"（相同论文键 {merged['same_key']}，arXiv id {merged['arxiv_id']}，DOI {merged['doi']}，标题 {merged['title']}，"
+            f"摘要近似 {merged['abstract']}），副本沿用代表论文的结论")
+
+# 论文检索索引
+SEARCH_EXPORT_PREFIX = "search_"
+
+def read_papers_file(file_path):
+    """同步流式读取一个输入文件中规范化后的论文（JSONL 逐行，JSON 逐条解析 papers 字段）"""
+    if file_path.endswith('.jsonl'):
+        papers = iter_jsonl_papers(file_path)
+    else:
+        papers = iter_json_papers(file_path)
+    yield from map(normalize_paper, papers)
+
+class PaperSearchIndex:
+    """
+    标题、摘要、作者上的 BM25 倒排索引。每个输入文件一个分段，
+    按文件的 (修改时间, 大小) 判断是否需要重建，分段保存为 index_dir/<路径哈希>.json.gz，
+    文件新增或变化时只重建对应分段。查询时倒排表为 numpy 数组，打分全部向量化。
+    """
+    K1 = 1.5
+    B = 0.75
+    # 标题中的词按该次数计入词频
+    TITLE_WEIGHT = 2
+
+    def __init__(self, index_dir="search_index"):
+        self.index_dir = index_dir
+        self.segments = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _segment_path(self, file_path):
+        return os.path.join(self.index_dir, hashlib.sha1(file_path.encode('utf-8')).hexdigest()[:16] + ".json.gz")
+
+    @staticmethod
+    def file_signature(file_path):
+        stat = os.stat(file_path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    @staticmethod
+    def _prepare(segment):
+        """把分段中的倒排表转换为 numpy 数组"""
+        segment["lengths"] = np.asarray(segment["lengths"], dtype=np.float32)
+        segment["postings"] = {
+            term: (np.asarray(ids, dtype=np.int32), np.asarray(tfs, dtype=np.float32))
+            for term, (ids, tfs) in segment["postings"].items()
+        }
+        return segment
+
+    def _load_segments(self):
+        if not os.path.isdir(self.index_dir):
+            return
+        for name in os.listdir(self.index_dir):
+            if not name.endswith(".json.gz"):
+                continue
+            try:
+                with gzip.open(os.path.join(self.index_dir, name), 'rt', encoding='utf-8') as f:
+                    segment = json.load(f)
+                self.segments[segment["path"]] = self._prepare(segment)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"读取索引分段 {name} 失败，将重建: {e}")
+
+    def _build_segment(self, file_path, signature):
+        docs, lengths = [], []
+        postings = {}
+        for position, paper in enumerate(read_papers_file(file_path)):
+            if not isinstance(paper, dict) or not paper.get('title'):
+                continue
+            title = get_display_title(paper)
+            authors = get_paper_authors(paper)
+            words = normalize_words(title) * self.TITLE_WEIGHT + normalize_words(paper.get('abstract', '')) + normalize_words(authors)
+            doc_id = len(docs)
+            docs.append([title, authors, str(paper.get('published') or paper.get('year') or '')[:10], position])
+            lengths.append(len(words))
+            for term, tf in Counter(words).items():
+                ids, tfs = postings.setdefault(term, ([], []))
+                ids.append(doc_id)
+                tfs.append(tf)
+        segment = {"path": file_path, "signature": signature, "docs": docs, "lengths": lengths, "postings": postings}
+        os.makedirs(self.index_dir, exist_ok=True)
+        segment_path = self._segment_path(file_path)
+        tmp_path = segment_path + ".tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(segment, f, ensure_ascii=False)
+        os.replace(tmp_path, segment_path)
+        return self._prepare(segment)
+
+    def refresh(self, files=None):
+        """与当前输入文件同步，返回 (重建的分段数, 删除的分段数)"""
+        if files is None:
+            files = [f for f in get_json_files() if not os.path.basename(f).startswith(SEARCH_EXPORT_PREFIX)]
+        with self._lock:
+            if not self._loaded:
+                self._load_segments()
+                self._loaded = True
+            updated = removed = 0
+            for file_path in files:
+                try:
+                    signature = self.file_signature(file_path)
+                except OSError:
+                    continue
+                segment = self.segments.get(file_path)
+                if segment is not None and segment["signature"] == signature:
+                    continue
+                try:
+                    self.segments[file_path] = self._build_segment(file_path, signature)
+                    updated += 1
+                except (OSError, ValueError) as e:
+                    print(f"索引文件 {file_path} 失败: {e}")
+            for file_path in set(self.segments) - set(files):
+                del self.segments[file_path]
+                try:
+                    os.remove(self._segment_path(file_path))
+                except OSError:
+                    pass
+                removed += 1
+            return updated, removed
+
+    def __len__(self):
+        return sum(len(segment["docs"]) for segment in self.segments.values())
+
+    def search(self, query, limit=20):
+        """BM25 排序的检索结果，返回 [{score, title, authors, date, file, position}]"""
+        terms = list(dict.fromkeys(normalize_words(query)))
+        segments = list(self.segments.values())
+        total_docs = sum(len(segment["docs"]) for segment in segments)
+        if not terms or not total_docs:
+            return []
+        avg_length = sum(float(segment["lengths"].sum()) for segment in segments) / total_docs
+        idf = {}
+        for term in terms:
+            df = sum(len(segment["postings"][term][0]) for segment in segments if term in segment["postings"])
+            idf[term] = np.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+        candidates = []
+        for segment in segments:
+            scores = None
+            for term in terms:
+                if term not in segment["postings"]:
+                    continue
+                ids, tfs = segment["postings"][term]
+                norm = self.K1 * (1 - self.B + self.B * segment["lengths"][ids] / avg_length)
+                if scores is None:
+                    scores = np.zeros(len(segment["docs"]), dtype=np.float32)
+                scores[ids] += idf[term] * tfs * (self.K1 + 1) / (tfs + norm)
+            if scores is None:
+                continue
+            top = np.flatnonzero(scores)
+            if top.size > limit:
+                top = top[np.argpartition(-scores[top], limit)[:limit]]
+            for doc_id in top:
+                title, authors, date, position = segment["docs"][doc_id]
+                candidates.append({
+                    "score": round(float(scores[doc_id]), 3),
+                    "title": title,
+                    "authors": authors,
+                    "date": date,
+                    "file": segment["path"],
+                    "position": position
+                })
+        candidates.sort(key=lambda hit: -hit["score"])
+        return candidates[:limit]
+
+    @staticmethod
+    def load_papers(hits):
+        """按检索结果读回原始论文记录（保持检索排序），用作筛选的候选输入"""
+        wanted = {}
+        for rank, hit in enumerate(hits):
+            wanted.setdefault(hit["file"], {})[hit["position"]] = rank
+        papers = [None] * len(hits)
+        for file_path, positions in wanted.items():
+            for position, paper in enumerate(read_papers_file(file_path)):
+                if position in positions:
+                    papers[positions[position]] = paper
+        return [paper for paper in papers if paper is not None]
+
+_paper_index = None
+
+def get_paper_index():
+    global _paper_index
+    if _paper_index is None:
+        _paper_index = PaperSearchIndex()
+    return _paper_index
+
+def export_search_candidates(query, hits):
+    """把检索结果对应的原始论文写成可直接用于粗筛的 JSON 文件，返回文件路径"""
+    slug = re.sub(r'[^a-z0-9]+', '_', query.lower()).strip('_')[:40] or "query"
+    output_file = f"{SEARCH_EXPORT_PREFIX}{slug}_papers.json"
+    papers = PaperSearchIndex.load_papers(hits)
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump({"query": query, "count": len(papers), "papers": papers}, f, ensure_ascii=False, indent=2)
+    return output_file
+
+def build_coarse_user_content(paper_data):
+    """粗筛发送给模型的用户消息"""
+    return f"论文标题: {get_display_title(paper_data)}"
+
+def build_fine_user_content(paper_data):
+    """精排发送给模型的用户消息"""
+    abstract_text = paper_data.get('abstract', '').strip()
+    return f"论文标题: {get_display_title(paper_data)}\n\n论文摘要: {abstract_text}"
+
+# 重试等待：没有 Retry-After 时按 5、10、20... 秒指数退避，最长 60 秒
+RETRY_BASE_DELAY = 5
+RETRY_MAX_DELAY = 60
+
+class AdaptiveConcurrency:
+    """
+    AIMD 自适应并发控制：请求成功时并发上限加性增长（每完成约一个上限数量的请求加 1），
+    遇到 429 或超时时乘性减半；服务端给出 Retry-After 时所有请求暂停到该时刻。
+    上限不超过 max_limit（配置中的 max_concurrent），不低于 min_limit。
+    """
+
+    def __init__(self, max_limit, min_limit=1, decrease_factor=0.5):
+        self.max_limit = max(1, int(max_limit))
+        self.min_limit = max(1, min(int(min_limit), self.max_limit))
+        self.decrease_factor = decrease_factor
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.resume_at = 0.0
+        self.last_decrease = 0.0
+        self.throttled = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def current_limit(self):
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self):
+        """等待一个并发名额，返回获得名额的时刻"""
+        loop = asyncio.get_running_loop()
+        while True:
+            wait = self.resume_at - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            async with self._condition:
+                if self.resume_at > loop.time():
+                    continue
+                if self.in_flight < self.current_limit:
+                    self.in_flight += 1
+                    return loop.time()
+                await self._condition.wait()
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify(max(1, self.current_limit - self.in_flight))
+
+    def on_success(self):
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_throttle(self, started_at, retry_after=None):
+        """started_at 为被限流请求获得名额的时刻；上次减半之后才发出的请求被限流时才再次减半，避免同一波 429 把上限连续砍到底"""
+        loop = asyncio.get_running_loop()
+        self.throttled += 1
+        if started_at >= self.last_decrease:
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            self.last_decrease = loop.time()
+            print(f"请求被限流，并发上限降为 {self.current_limit}")
+        if retry_after:
+            self.resume_at = max(self.resume_at, loop.time() + retry_after)
+
+# 速率限制只用配额的 90%，给估算误差和其他客户端留余量
+RATE_LIMIT_HEADROOM = 0.9
+
+def estimate_tokens(messages, expected_output_tokens=8):
+    """
+    发送前估算请求消耗的 token 数：中日韩字符约 1 token/字，其余约 4 字符/token，
+    每条消息另加 4 个格式 token，再加上预期的回答长度。
+    """
+    total = expected_output_tokens
+    for message in messages:
+        content = message["content"]
+        cjk = len(re.findall(r'[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]', content))
+        total += cjk + (len(content) - cjk + 3) // 4 + 4
+    return total
+
+class TokenBucket:
+    """按 rate_per_minute 连续补充的令牌桶，容量为一分钟的额度；取令牌时先预留（余额可为负），返回需要等待的秒数"""
+
+    def __init__(self, rate_per_minute):
+        self.configure(rate_per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def configure(self, rate_per_minute):
+        self.capacity = rate_per_minute * RATE_LIMIT_HEADROOM
+        self.rate = self.capacity / 60
+        if hasattr(self, 'level'):
+            self.level = min(self.level, self.capacity)
+
+    def reserve(self, amount, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # 单个请求超过一分钟额度时按整桶计，否则永远等不到
+        self.level -= min(amount, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def adjust(self, amount):
+        self.level = min(self.capacity, self.level - amount)
+
+class RateLimiter:
+    """
+    每分钟请求数（RPM）和每分钟 token 数（TPM）两个令牌桶。
+    按请求到达顺序预留额度并计算等待时间，等待在锁外进行；
+    状态用线程锁保护，Gradio 中不同线程、不同事件循环的运行可以共享同一个限流器。
+    """
+
+    def __init__(self, rpm_limit, tpm_limit):
+        self._lock = threading.Lock()
+        self.request_bucket = TokenBucket(rpm_limit) if rpm_limit > 0 else None
+        self.token_bucket = TokenBucket(tpm_limit) if tpm_limit > 0 else None
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.waited_seconds = 0.0
+
+    def configure(self, rpm_limit, tpm_limit):
+        """配置修改后调整已有限流器的额度，保留当前余额"""
+        with self._lock:
+            for attr, limit in (("request_bucket", rpm_limit), ("token_bucket", tpm_limit)):
+                bucket = getattr(self, attr)
+                if limit <= 0:
+                    setattr(self, attr, None)
+                elif bucket is None:
+                    setattr(self, attr, TokenBucket(limit))
+                else:
+                    bucket.configure(limit)
+            self.rpm_limit = rpm_limit
+            self.tpm_limit = tpm_limit
+
+    async def acquire(self, estimated_tokens):
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.request_bucket:
+                wait = max(wait, self.request_bucket.reserve(1, now))
+            if self.token_bucket:
+                wait = max(wait, self.token_bucket.reserve(estimated_tokens, now))
+            self.waited_seconds += wait
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens, response):
+        """用响应中实际的 token 用量修正预留额度"""
+        usage = getattr(response, 'usage', None)
+        actual = getattr(usage, 'total_tokens', None)
+        if self.token_bucket and isinstance(actual, int):
+            with self._lock:
+                self.token_bucket.adjust(actual - estimated_tokens)
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_rate_limiter(config):
+    """按 base_url + 模型返回共享的 RPM/TPM 限流器，两项额度都为 0 时返回 None"""
+    rpm_limit = int(config.get("rpm_limit") or 0)
+    tpm_limit = int(config.get("tpm_limit") or 0)
+    if rpm_limit <= 0 and tpm_limit <= 0:
+        return None
+    key = (config["base_url"].rstrip('/'), config["model"])
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None:
+            limiter = _rate_limiters[key] = RateLimiter(rpm_limit, tpm_limit)
+        elif (limiter.rpm_limit, limiter.tpm_limit) != (rpm_limit, tpm_limit):
+            limiter.configure(rpm_limit, tpm_limit)
+    return limiter
+
+def get_retry_after(error):
+    """从 API 错误的响应头中读取 Retry-After（秒），没有时返回 None"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def is_throttle_error(error):
+    """429 和超时视为限流信号"""
+    return getattr(error, 'status_code', None) == 429 or isinstance(error, (APITimeoutError, asyncio.TimeoutError))
+
+def create_client(config):
+    """创建 API 客户端并附带模型名和自适应并发控制器；关闭 SDK 自带的重试，由 request_completion 统一处理限流"""
+    client = AsyncOpenAI(
+        api_key=config["api_key"], 
+        base_url=config["base_url"],
+        timeout=60.0,
+        max_retries=0
+    )
+    client.model = config["model"]
+    client.limiter = AdaptiveConcurrency(config.get("max_concurrent", 50))
+    client.rate_limiter = get_rate_limiter(config)
+    return client
+
+def get_model_price(config, model):
+    """配置中该模型的价格 [每百万输入 token, 每百万输出 token]，未配置时返回 None"""
+    price = config.get("model_prices", {}).get(model)
+    if not price or len(price) != 2:
+        return None
+    return [float(price[0]), float(price[1])]
+
+class UsageScope:
+    """UsageTracker 中一个阶段一轮的记录，传给请求函数"""
+
+    def __init__(self, tracker, stage, round_num):
+        self.tracker = tracker
+        self.stage = stage
+        self.round_num = round_num
+        self.requests = []
+        self.papers = 0
+
+    def add_papers(self, count):
+        """记录交给 API 评估的论文数，用于计算每篇论文的 token 数"""
+        with self.tracker._lock:
+            self.papers += count
+
+    def record(self, prompt_tokens, completion_tokens, latency, retries, error, estimated, batch=False):
+        """latency 为 None 表示 Batch API 请求（没有单个请求的耗时）"""
+        with self.tracker._lock:
+            self.requests.append((prompt_tokens, completion_tokens, latency, retries, error, estimated, batch))
+
+class UsageTracker:
+    """
+    一次筛选运行的 API 用量统计。每个请求记录 prompt/completion token 数、耗时、重试次数和失败时的错误类型，
+    按阶段和轮次分组，汇总出 p50/p95/p99 耗时、每篇论文的 token 数，并按 model_prices 中的价格估算费用，
+    Batch API 请求的费用再乘以 batch_price_factor。
+    服务商没有返回 usage 时用估算的 token 数代替，计入 estimated_usage_requests。
+    """
+
+    def __init__(self, model, price=None, batch_price_factor=1.0):
+        self.model = model
+        self.price = price
+        self.batch_price_factor = batch_price_factor
+        self.scopes = {}
+        self._lock = threading.Lock()
+
+    def scope(self, stage, round_num):
+        with self._lock:
+            if (stage, round_num) not in self.scopes:
+                self.scopes[(stage, round_num)] = UsageScope(self, stage, round_num)
+            return self.scopes[(stage, round_num)]
+
+    def _summarize(self, scopes):
+        requests = [request for scope in scopes for request in scope.requests]
+        papers = sum(scope.papers for scope in scopes)
+        latencies = np.array([request[2] for request in requests if request[4] is None and request[2] is not None])
+        prompt_tokens = sum(request[0] for request in requests)
+        completion_tokens = sum(request[1] for request in requests)
+        total_tokens = prompt_tokens + completion_tokens
+        summary = {
+            "requests": len(requests),
+            "failed_requests": sum(1 for request in requests if request[4] is not None),
+            "retries": sum(request[3] for request in requests),
+            "errors": dict(Counter(request[4] for request in requests if request[4] is not None)),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": total_tokens,
+            "estimated_usage_requests": sum(1 for request in requests if request[5]),
+            "batch_requests": sum(1 for request in requests if request[6]),
+            "papers": papers,
+            "tokens_per_paper": round(total_tokens / papers, 1) if papers else 0,
+            "latency_seconds": {
+                name: round(float(np.percentile(latencies, q)), 3) if len(latencies) else 0
+                for name, q in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))
+            },
+            "estimated_cost": None
+        }
+        if self.price:
+            cost = sum(
+                (request[0] * self.price[0] + request[1] * self.price[1]) * (self.batch_price_factor if request[6] else 1)
+                for request in requests
+            )
+            summary["estimated_cost"] = round(cost / 1e6, 4)
+        return summary
+
+    def summary(self, stage=None):
+        """汇总 stage 阶段（None 为全部阶段）的用量，rounds 中为逐轮统计"""
+        with self._lock:
+            scopes = [scope for key, scope in sorted(self.scopes.items()) if stage is None or scope.stage == stage]
+            summary = {"model": self.model, "price_per_million_tokens": self.price}
+            summary.update(self._summarize(scopes))
+            summary["rounds"] = [dict(self._summarize([scope]), stage=scope.stage, round=scope.round_num) for scope in scopes]
+        return summary
+
+def format_cost(cost):
+    return "未配置模型价格（model_prices）" if cost is None else f"${cost:.4f}"
+
+def format_usage_report(summary):
+    """结果文本中的用量统计"""
+    latency = summary["latency_seconds"]
+    errors = "，".join(f"{name} {count} 次" for name, count in summary["errors"].items())
+    lines = [
+        f"- API 请求：{summary['requests']} 次（失败 {summary['failed_requests']} 次，重试 {summary['retries']} 次{'；' + errors if errors else ''}）",
+        f"- Token：输入 {summary['prompt_tokens']}，输出 {summary['completion_tokens']}，合计 {summary['total_tokens']}（每篇论文 {summary['tokens_per_paper']}）",
+        f"- 估算费用：{format_cost(summary['estimated_cost'])}"
+    ]
+    if summary["requests"] > summary["batch_requests"]:
+        lines.insert(2, f"- 请求耗时：p50 {latency['p50']:.2f} 秒，p95 {latency['p95']:.2f} 秒，p99 {latency['p99']:.2f} 秒")
+    if summary["batch_requests"]:
+        lines.append(f"- 其中 {summary['batch_requests']} 个请求通过 Batch API 发送，不计入请求耗时")
+    if summary["estimated_usage_requests"]:
+        lines.append(f"- 其中 {summary['estimated_usage_requests']} 个请求服务商未返回 usage，token 数为估算值")
+    label = {"coarse": "粗筛", "fine": "精排"}
+    for stats in summary["rounds"]:
+        cost = f"，费用 {format_cost(stats['estimated_cost'])}" if stats["estimated_cost"] is not None else ""
+        lines.append(
+            f"- 第{stats['round']}轮{label[stats['stage']]}用量：{stats['requests']} 次请求，{stats['total_tokens']} token，"
+            f"p95 {stats['latency_seconds']['p95']:.2f} 秒{cost}"
+        )
+    return "\n".join(lines)
+
+async def request_completion(client, messages, max_retries=3, expected_output_tokens=8, usage=None):
+    """
+    通过客户端的并发控制器发送请求，失败时重试，重试用尽后抛出最后一次的异常。
+    配置了 RPM/TPM 额度时每次发送前先按估算的 token 数从令牌桶取额度（重试同样计入）。
+    退避等待期间不占用并发名额；有 Retry-After 时按其等待，否则指数退避。
+    传入 usage（UsageScope）时记录该请求的 token 数、最后一次尝试的耗时、重试次数和失败时的错误类型。
+    """
+    limiter = client.limiter
+    rate_limiter = client.rate_limiter
+    estimated_tokens = estimate_tokens(messages, expected_output_tokens)
+    for attempt in range(max_retries):
+        if rate_limiter:
+            await rate_limiter.acquire(estimated_tokens)
+        started_at = await limiter.acquire()
+        try:
+            response = await client.chat.completions.create(model=client.model, messages=messages)
+            limiter.on_success()
+            if rate_limiter:
+                rate_limiter.record_usage(estimated_tokens, response)
+            if usage is not None:
+                reported = getattr(response, 'usage', None)
+                if reported is not None and reported.prompt_tokens is not None:
+                    usage.record(reported.prompt_tokens, reported.completion_tokens or 0, time.monotonic() - started_at, attempt, None, False)
+                else:
+                    prompt_tokens = estimated_tokens - expected_output_tokens
+                    usage.record(prompt_tokens, expected_output_tokens, time.monotonic() - started_at, attempt, None, True)
+            return response
+        except Exception as e:
+            error = e
+        finally:
+            await limiter.release()
+        retry_after = get_retry_after(error)
+        if is_throttle_error(error):
+            limiter.on_throttle(started_at, retry_after)
+        if attempt == max_retries - 1:
+            if usage is not None:
+                usage.record(0, 0, time.monotonic() - started_at, attempt, type(error).__name__, False)
+            raise error
+        delay = retry_after if retry_after is not None else min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+        print(f"API调用失败 (尝试 {attempt + 1}/{max_retries}): {error}")
+        print(f"等待{delay:.0f}秒后重试...")
+        await asyncio.sleep(delay)
+
+async def check_paper_relevance_with_retry(client, paper_data, system_prompt, max_retries=3, usage=None):
+    """检查单个论文的相关性（粗筛）- 带重试机制；重试用尽时判定为 None，按不相关处理且不写入缓存"""
+    try:
+        response = await request_completion(client, [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": build_coarse_user_content(paper_data)}
+        ], max_retries, usage=usage)
+        result = response.choices[0].message.content.strip()
+        return paper_data, "True" in result
+    except Exception as e:
+        print(f"处理标题 '{paper_data.get('title', 'N/A')}' 时出错 (已重试{max_retries}次): {e}")
+        return paper_data, None
+
+def build_coarse_batch_user_content(papers):
+    """粗筛批量模式的用户消息：带编号的标题列表"""
+    lines = [f"{i}. {build_coarse_user_content(paper)[len('论文标题: '):]}" for i, paper in enumerate(papers, 1)]
+    return "论文标题列表:\n" + "\n".join(lines)
+
+def parse_batch_verdicts(text, count):
+    """
+    解析批量回答，返回 {编号: True/False}。
+    只接受 1..count 范围内的编号；同一编号出现互相矛盾的回答时视为格式错误，不返回该编号。
+    """
+    verdicts = {}
+    conflicting = set()
+    for line in text.splitlines():
+        match = re.match(r'^\s*[\[(#*]*\s*(\d+)\s*[\])*]*\s*[:：.、)\-]?\s*[*`]*\s*(true|false)\b', line, re.IGNORECASE)
+        if not match:
+            continue
+        index = int(match.group(1))
+        verdict = match.group(2).lower() == "true"
+        if not 1 <= index <= count:
+            continue
+        if index in verdicts and verdicts[index] != verdict:
+            conflicting.add(index)
+        verdicts[index] = verdict
+    for index in conflicting:
+        del verdicts[index]
+    return verdicts
+
+async def check_papers_batch_with_retry(client, papers, system_prompt, max_retries=3, usage=None):
+    """
+    一个请求中批量检查多个标题的相关性（粗筛），返回 [(论文, 判定)]。
+    回答缺失或格式错误的条目各自调用 check_paper_relevance_with_retry 并发重试（各自经过共享的并发控制器），其余条目直接使用批量结果。
+    """
+    batch_prompt = system_prompt.rstrip() + "\n" + COARSE_BATCH_INSTRUCTION.format(count=len(papers))
+    user_content = build_coarse_batch_user_content(papers)
+    verdicts = {}
+    try:
+        response = await request_completion(client, [
+            {"role": "system", "content": batch_prompt},
+            {"role": "user", "content": user_content}
+        ], max_retries, expected_output_tokens=6 * len(papers), usage=usage)
+        verdicts = parse_batch_verdicts(response.choices[0].message.content, len(papers))
+    except Exception as e:
+        print(f"批量处理 {len(papers)} 个标题时出错 (已重试{max_retries}次): {e}，改为逐条处理")
+
+    missing = len(papers) - len(verdicts)
+    if missing:
+        print(f"批量回答中有 {missing}/{len(papers)} 个条目缺失或格式错误，逐条重试")
+    fallback = await asyncio.gather(*(
+        check_paper_relevance_with_retry(client, paper, system_prompt, usage=usage)
+        for i, paper in enumerate(papers, 1) if i not in verdicts
+    ))
+    fallback = iter(fallback)
+    return [(paper, verdicts[i]) if i in verdicts else next(fallback) for i, paper in enumerate(papers, 1)]
+
+async def check_paper_relevance_detailed_with_retry(client, paper_data, system_prompt, max_retries=3, usage=None):
+    """基于标题和摘要检查单个论文的相关性（精排）- 带重试机制；重试用尽时判定为 None"""
+    try:
+        response = await request_completion(client, [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": build_fine_user_content(paper_data)}
+        ], max_retries, usage=usage)
+        result = response.choices[0].message.content.strip()
+        return paper_data, "True" in result
+    except Exception as e:
+        print(f"处理论文 '{paper_data.get('title', 'N/A')}' 时出错 (已重试{max_retries}次): {e}")
+        return paper_data, None
+
+async def process_papers_single_round(client, papers_data, system_prompt, round_num, max_concurrent, is_fine=False, progress_callback=None, cache=None, batch_size=1, journal=None, usage=None):
+    """
+    单轮处理所有论文。
+    papers_data 可以是列表或 PaperSource 等可迭代对象，论文边读取边提交，
+    在途请求数由客户端的自适应并发控制器（client.limiter，上限为 max_concurrent）决定，
+    待处理任务最多 2 * max_concurrent 个，让退避中的任务让出名额时仍有任务可以补上，内存中只保留相关论文。
+    传入 cache 时先查判定缓存，命中的论文不调用 API，新的判定写回缓存。
+    粗筛时 batch_size 大于 1 则每 batch_size 个标题合并为一个请求，每个批次占用一个并发名额。
+    传入 journal 时断点日志中已有的判定直接复用，新的判定完成后立即写入日志。
+    传入 usage（UsageTracker）时把本轮请求的用量记入该阶段该轮。
+    """
+    semaphore = asyncio.Semaphore(max_concurrent * 2)
+    stage = "fine" if is_fine else "coarse"
+    build_user_content = build_fine_user_content if is_fine else build_coarse_user_content
+    batch_size = 1 if is_fine else max(1, int(batch_size))
+    usage_scope = usage.scope(stage, round_num) if usage is not None else None
+    
+    async def limited_check(items):
+        """items 为 [(论文, 缓存键)]，返回 [(论文, 判定)]"""
+        try:
+            if usage_scope is not None:
+                usage_scope.add_papers(len(items))
+            if len(items) > 1:
+                results = await check_papers_batch_with_retry(client, [paper for paper, _ in items], system_prompt, usage=usage_scope)
+            elif is_fine:
+                results = [await check_paper_relevance_detailed_with_retry(client, items[0][0], system_prompt, usage=usage_scope)]
+            else:
+                results = [await check_paper_relevance_with_retry(client, items[0][0], system_prompt, usage=usage_scope)]
+            for (_, cache_key), (paper, is_relevant) in zip(items, results):
+                if is_relevant is None:
+                    continue
+                if cache_key:
+                    cache.put(cache_key, is_relevant)
+                if journal is not None:
+                    journal.record(stage, round_num, paper, is_relevant)
+            return results
+        finally:
+            semaphore.release()
+    
+    mode = "精排" if is_fine else "粗筛"
+    total = len(papers_data)
+    print(f"开始第 {round_num} 轮{mode}检查 {total} 篇论文的相关性...")
+    
+    relevant_papers = []
+    completed = 0
+    cache_hits = 0
+    resumed = 0
+    
+    def handle_result(paper_data, is_relevant):
+        nonlocal completed
+        completed += 1
+        if is_relevant:
+            relevant_papers.append(paper_data)
+        if progress_callback and total > 0:
+            progress = completed / total
+            progress_callback(progress, f"第{round_num}轮{mode}: {completed}/{total}（当前并发上限 {client.limiter.current_limit}）")
+    
+    pending = set()
+    requests_sent = 0
+    
+    async def submit(items):
+        nonlocal requests_sent
+        await semaphore.acquire()
+        requests_sent += 1
+        pending.add(asyncio.create_task(limited_check(items)))
+        
+        done = {task for task in pending if task.done()}
+        for task in done:
+            for result in task.result():
+                handle_result(*result)
+        pending.difference_update(done)
+    
+    batch = []
+    for paper in papers_data:
+        if not paper.get('title'):
+            # 没有标题的记录直接跳过，但仍计入进度
+            handle_result(paper, False)
+            continue
+        if journal is not None:
+            resumed_verdict = journal.get(stage, round_num, paper)
+            if resumed_verdict is not None:
+                resumed += 1
+                handle_result(paper, resumed_verdict)
+                continue
+        cache_key = None
+        if cache is not None:
+            cache_key = VerdictCache.make_key(client.model, system_prompt, stage, round_num, build_user_content(paper))
+            cached = cache.get(cache_key)
+            if cached is not None:
+                cache_hits += 1
+                handle_result(paper, cached)
+                continue
+        batch.append((paper, cache_key))
+        if len(batch) >= batch_size:
+            await submit(batch)
+            batch = []
+    if batch:
+        await submit(batch)
+    
+    for completed_task in asyncio.as_completed(pending):
+        for result in await completed_task:
+            handle_result(*result)
+    
+    if batch_size > 1:
+        print(f"第 {round_num} 轮{mode}批量模式共发送 {requests_sent} 个批量请求（每批最多 {batch_size} 篇）")
+    if resumed:
+        print(f"第 {round_num} 轮{mode}从断点日志恢复 {resumed} 篇")
+    if cache is not None:
+        # 每轮结束把缓冲中的判定写入缓存文件
+        cache.save_pending()
+        print(f"第 {round_num} 轮{mode}判定缓存命中 {cache_hits} 篇")
+    print(f"第 {round_num} 轮{mode}找到 {len(relevant_papers)} 篇相关论文")
+    if client.limiter.throttled:
+        print(f"累计被限流 {client.limiter.throttled} 次，当前并发上限 {client.limiter.current_limit}")
+    if client.rate_limiter and client.rate_limiter.waited_seconds:
+        print(f"为遵守 RPM/TPM 额度累计排队等待 {client.rate_limiter.waited_seconds:.0f} 秒（所有请求合计）")
+    
+    return relevant_papers
+
+# Batch API：单个批处理任务的请求数上限和任务结束状态
+BATCH_MAX_REQUESTS = 50000
+BATCH_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+def get_batch_state_path(final_output_file, round_num):
+    """Batch API 模式下一轮的任务记录文件"""
+    return final_output_file[:-len('.json')] + f".batch_round_{round_num}.json"
+
+def make_batch_request(custom_id, model, messages):
+    return {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": {"model": model, "messages": messages}}
+
+async def submit_batch_job(client, input_path, completion_window):
+    """上传批处理输入文件并创建任务，返回任务 id"""
+    uploaded = await client.files.create(file=Path(input_path), purpose="batch")
+    batch = await client.batches.create(input_file_id=uploaded.id, endpoint="/v1/chat/completions", completion_window=completion_window)
+    return batch.id
+
+async def wait_batch_job(client, batch_id, poll_interval, progress_callback=None, label=""):
+    """轮询批处理任务直到结束，返回最后一次查询到的任务；查询失败时等待下一次轮询"""
+    while True:
+        try:
+            batch = await client.batches.retrieve(batch_id)
+        except Exception as e:
+            print(f"查询 Batch 任务 {batch_id} 失败，{poll_interval} 秒后重试: {e}")
+            await asyncio.sleep(poll_interval)
+            continue
+        counts = batch.request_counts
+        if progress_callback and counts and counts.total:
+            progress_callback(
+                (counts.completed + counts.failed) / counts.total,
+                f"{label}：Batch 任务 {batch.status}，已完成 {counts.completed}/{counts.total}，失败 {counts.failed}"
+            )
+        if batch.status in BATCH_TERMINAL_STATUSES:
+            return batch
+        await asyncio.sleep(poll_interval)
+
+async def read_batch_results(client, batch, usage=None):
+    """读取任务的结果文件和错误文件，返回 {custom_id: 判定}，出错的请求不在结果中"""
+    verdicts = {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        content = await client.files.content(file_id)
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            response = entry.get("response") or {}
+            body = response.get("body") or {}
+            choices = body.get("choices") or [{}]
+            answer = (choices[0].get("message") or {}).get("content")
+            if entry.get("error") or response.get("status_code") != 200 or answer is None:
+                # 200 但没有 choices 或 content 为空的行同样按失败处理，交给实时接口补判
+                if usage is not None:
+                    error = (entry.get("error") or {}).get("code") or (
+                        f"HTTP {response.get('status_code')}" if response.get("status_code") != 200 else "空响应")
+                    usage.record(0, 0, None, 0, f"Batch {error}", False, batch=True)
+                continue
+            reported = body.get("usage") or {}
+            if usage is not None:
+                usage.record(reported.get("prompt_tokens", 0), reported.get("completion_tokens", 0), None, 0, None, not reported, batch=True)
+            verdicts[entry["custom_id"]] = "True" in answer
+    return verdicts
+
+async def process_papers_batch_job(client, papers_data, system_prompt, round_num, max_concurrent, is_fine, config, state_file,
+                                   progress_callback=None, cache=None, journal=None, usage=None):
+    """
+    Batch API 模式下处理一轮，返回本轮的相关论文。
+    断点日志和判定缓存中没有结论的论文逐篇写入批处理输入文件（每行一个 chat completions 请求，custom_id 为论文序号和内容哈希），
+    上传并创建任务后轮询到结束，再按 custom_id 把结论对应回论文；论文在第二次迭代来源时取回，不在内存中保留整轮论文。
+    已提交的任务记录在 state_file 中，进程中断后以同样参数再次运行时继续轮询同一任务而不是重新提交。
+    任务失败、过期或个别请求出错时，没有结论的论文改为实时请求。
+    """
+    stage = "fine" if is_fine else "coarse"
+    mode = "精排" if is_fine else "粗筛"
+    build_user_content = build_fine_user_content if is_fine else build_coarse_user_content
+    usage_scope = usage.scope(stage, round_num) if usage is not None else None
+    header = {"stage": stage, "round": round_num, "model": client.model, "prompt": ScreeningJournal.prompt_hash(system_prompt)}
+
+    state = None
+    if os.path.exists(state_file):
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get("header") != header:
+            print(f"Batch 任务记录 {state_file} 的参数与本次不同，重新提交")
+            state = None
+
+    # 第一次迭代来源：断点日志和判定缓存中已有结论的论文直接使用，其余论文写入批处理输入文件
+    submitted = set()
+    if state is not None:
+        for input_path in state["input_files"]:
+            with open(input_path, 'r', encoding='utf-8') as f:
+                submitted.update(json.loads(line)["custom_id"] for line in f if line.strip())
+    input_files = []
+    f = None
+    relevant_papers = []
+    resumed = cache_hits = 0
+    for index, paper in enumerate(papers_data):
+        if not paper.get('title'):
+            continue
+        custom_id = f"{index}-{get_content_hash(paper)}"
+        verdict = None
+        if journal is not None:
+            verdict = journal.get(stage, round_num, paper)
+            resumed += verdict is not None
+        if verdict is None and cache is not None:
+            cache_key = VerdictCache.make_key(client.model, system_prompt, stage, round_num, build_user_content(paper))
+            verdict = cache.get(cache_key)
+            cache_hits += verdict is not None
+        if verdict is not None:
+            # 继续轮询时已写入断点日志的论文不再从批处理结果中取
+            submitted.discard(custom_id)
+            if verdict:
+                relevant_papers.append(paper)
+            continue
+        if state is not None:
+            continue
+        # 超过单个任务的请求数上限时拆成多个文件
+        if len(submitted) % BATCH_MAX_REQUESTS == 0:
+            if f:
+                f.close()
+            input_files.append(state_file[:-len('.json')] + f"_{len(input_files) + 1}.input.jsonl")
+            f = open(input_files[-1], 'w', encoding='utf-8')
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": build_user_content(paper)}
+        ]
+        f.write(json.dumps(make_batch_request(custom_id, client.model, messages), ensure_ascii=False) + "\n")
+        submitted.add(custom_id)
+    if f:
+        f.close()
+
+    if state is None:
+        state = {"header": header, "input_files": input_files, "requests": len(submitted), "batch_ids": []}
+        completion_window = config.get("batch_completion_window", "24h")
+        for input_path in input_files:
+            state["batch_ids"].append(await submit_batch_job(client, input_path, completion_window))
+        tmp_path = state_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, state_file)
+        if submitted:
+            print(f"第 {round_num} 轮{mode}提交 {len(state['batch_ids'])} 个 Batch 任务，共 {len(submitted)} 个请求")
+        else:
+            print(f"第 {round_num} 轮{mode}的论文都已有结论，无需提交 Batch 任务")
+    else:
+        print(f"发现未完成的 Batch 任务 {', '.join(state['batch_ids'])}，继续等待结果")
+
+    verdicts = {}
+    poll_interval = config.get("batch_poll_interval", 30)
+    for batch_id in state["batch_ids"]:
+        batch = await wait_batch_job(client, batch_id, poll_interval, progress_callback, f"第{round_num}轮{mode}")
+        if batch.status != "completed":
+            print(f"Batch 任务 {batch_id} 结束状态为 {batch.status}，没有结果的论文将改为实时请求")
+        verdicts.update(await read_batch_results(client, batch, usage_scope))
+
+    # 第二次迭代来源：按 custom_id 把批处理结论对应回论文
+    missing = []
+    for index, paper in enumerate(papers_data):
+        if not paper.get('title'):
+            continue
+        custom_id = f"{index}-{get_content_hash(paper)}"
+        if custom_id not in submitted:
+            continue
+        is_relevant = verdicts.get(custom_id)
+        if is_relevant is None:
+            missing.append(paper)
+            continue
+        if cache is not None:
+            cache.put(VerdictCache.make_key(client.model, system_prompt, stage, round_num, build_user_content(paper)), is_relevant)
+        if journal is not None:
+            journal.record(stage, round_num, paper, is_relevant)
+        if is_relevant:
+            relevant_papers.append(paper)
+
+    if usage_scope is not None:
+        # 改为实时请求的论文由 process_papers_single_round 计数
+        usage_scope.add_papers(len(submitted) - len(missing))
+    print(f"第 {round_num} 轮{mode} Batch 任务返回 {len(verdicts)}/{len(submitted)} 个结论")
+    if resumed:
+        print(f"第 {round_num} 轮{mode}从断点日志恢复 {resumed} 篇")
+    if cache is not None:
+        print(f"第 {round_num} 轮{mode}判定缓存命中 {cache_hits} 篇")
+    if missing:
+        print(f"{len(missing)} 篇论文没有 Batch 结果，改为实时请求")
+        relevant_papers.extend(await process_papers_single_round(
+            client, missing, system_prompt, round_num, max_concurrent, is_fine, progress_callback, cache, 1, journal, usage
+        ))
+    if cache is not None:
+        # 删除任务状态文件之前先把 Batch 结果写入缓存文件
+        cache.save_pending()
+
+    os.remove(state_file)
+    for input_path in state["input_files"]:
+        if os.path.exists(input_path):
+            os.remove(input_path)
+    print(f"第 {round_num} 轮{mode}找到 {len(relevant_papers)} 篇相关论文")
+    return relevant_papers
+
+async def load_coarse_input(main_json_file, findings_json_file):
+    """读取粗筛输入（主文件和可选的Findings文件），返回 (PaperSource, 错误信息)"""
+    papers_data = PaperSource()
+    
+    if not os.path.exists(main_json_file):
+        return None, f"错误：文件 {main_json_file} 不存在"
+    
+    try:
+        count = await papers_data.add_file(main_json_file)
+        print(f"读取主会议论文: {count} 篇")
+    except Exception as e:
+        return None, f"读取或解析主文件 {main_json_file} 失败: {e}"
+
+    if findings_json_file and os.path.exists(findings_json_file):
+        try:
+            count = await papers_data.add_file(findings_json_file)
+            print(f"读取Findings论文: {count} 篇")
+        except Exception as e:
+            return None, f"读取或解析Findings文件 {findings_json_file} 失败: {e}"
+    return papers_data, None
+
+async def coarse_screening(main_json_file, findings_json_file, system_prompt, config, progress_callback=None, incremental=False, client=None):
+    """
+    粗筛处理；incremental 为 True 时只评估相对上次结果新增或内容变化的论文。
+    传入 client 时复用该客户端（及其并发控制器），多个文件可以共享同一个并发预算。
+    """
+    papers_data, error = await load_coarse_input(main_json_file, findings_json_file)
+    if error:
+        return error
+    
+    final_output_file = get_filename_with_suffix(main_json_file, 'coarse_final')
+    papers_to_screen, reused_relevant, screened_hashes = await plan_incremental_screening(
+        papers_data, final_output_file, incremental
+    )
+    papers_to_screen, prefilter_report = apply_prefilter(papers_to_screen, config, screened_hashes, papers_data)
+    papers_to_screen, dedup = apply_dedup(papers_to_screen, config)
+    print(f"总共需要处理: {len(papers_to_screen)} 篇论文")
+    
+    client = client or create_client(config)
+    batch_mode = config.get("batch_mode", False)
+    usage = UsageTracker(client.model, get_model_price(config, client.model), config.get("batch_price_factor", 0.5))
+    
+    rounds = config.get("rounds", 3)
+    max_concurrent = config.get("max_concurrent", 50)
+    batch_size = max(1, int(config.get("coarse_batch_size", 1)))
+    vote_rule = config.get("vote_rule", "union")
+    scheduler = VoteScheduler(rounds, get_vote_threshold(config, rounds))
+    cache = get_verdict_cache(config)
+    cache_hits_before = cache.hits if cache else 0
+    journal = ScreeningJournal(ScreeningJournal.path_for(final_output_file), {
+        "stage": "coarse",
+        "model": client.model,
+        "prompt": ScreeningJournal.prompt_hash(system_prompt),
+        "inputs": [main_json_file, findings_json_file or ""],
+        "rounds": rounds,
+        "vote_rule": vote_rule,
+        "vote_threshold": scheduler.threshold
+    })
+    
+    for round_num in range(1, rounds + 1):
+        if scheduler.finished():
+            print(f"所有论文的结论均已确定，跳过第 {round_num} 轮及之后的粗筛")
+            break
+        if progress_callback:
+            progress_callback(0, f"开始第{round_num}轮粗筛...")
+        
+        if batch_mode:
+            relevant_papers = await process_papers_batch_job(
+                client, scheduler.round_source(papers_to_screen), system_prompt, round_num, max_concurrent, False, config,
+                get_batch_state_path(final_output_file, round_num), progress_callback, cache, journal, usage
+            )
+        else:
+            relevant_papers = await process_papers_single_round(
+                client, scheduler.round_source(papers_to_screen), system_prompt, round_num, max_concurrent, False, progress_callback, cache, batch_size, journal, usage
+            )
+        round_stats = scheduler.record_round(round_num, relevant_papers)
+        if not round_stats["asked"]:
+            # 本轮没有评估任何论文（如增量模式下没有变化的论文），保留上次运行的逐轮结果
+            print(f"第 {round_num} 轮没有需要评估的论文，保留已有的逐轮结果文件")
+            continue
+        
+        round_data = {
+            "round": round_num,
+            "total_papers": len(papers_data),
+            "asked_papers": round_stats["asked"],
+            "relevant_papers_count": len(relevant_papers),
+            "relevant_papers": relevant_papers
+        }
+        
+        output_file = get_filename_with_suffix(main_json_file, f'coarse_round_{round_num}')
+        async with aiofiles.open(output_file, 'w', encoding='utf-8') as f:
+            await f.write(json.dumps(round_data, ensure_ascii=False, indent=2))
+        
+        print(f"第 {round_num} 轮结果已保存到 {output_file}")
+    
+    cache_hits = 0
+    if cache:
+        cache_hits = cache.hits - cache_hits_before
+        cache.flush()
+    
+    all_relevant_papers = {}
+    for paper in reused_relevant + fan_out_duplicates(dedup, scheduler.final_relevant()):
+        # 不去重时使用标题作为键来去重；去重时副本已在筛选前归组，只合并论文键相同的记录
+        if paper.get('title'):
+            all_relevant_papers[get_merge_key(dedup, paper)] = paper
+    
+    final_relevant_papers = list(all_relevant_papers.values())
+    
+    final_data = {
+        "total_papers": len(papers_data),
+        "rounds_count": rounds,
+        "max_concurrent": max_concurrent,
+        "coarse_batch_size": batch_size,
+        "batch_mode": batch_mode,
+        "vote_rule": vote_rule,
+        "vote_threshold": scheduler.threshold,
+        "rounds_executed": len(scheduler.round_stats),
+        "round_results": scheduler.round_stats,
+        "screened_papers_this_run": len(papers_to_screen),
+        "reused_relevant_papers_count": len(reused_relevant),
+        "verdict_cache_hits": cache_hits,
+        "resumed_verdicts": journal.resumed,
+        "prefilter": prefilter_report,
+        "dedup": dedup.report() if dedup else None,
+        "duplicate_groups": dedup.duplicate_groups() if dedup else {},
+        "usage": usage.summary("coarse"),
+        "final_relevant_papers_count": len(final_relevant_papers),
+        "relevant_papers": sorted(final_relevant_papers, key=lambda x: x.get('title', '')),
+        "screened_papers": screened_hashes
+    }
+    
+    output_file = final_output_file
+    async with aiofiles.open(output_file, 'w', encoding='utf-8') as f:
+        await f.write(json.dumps(final_data, ensure_ascii=False, indent=2))
+    journal.close(completed=True)
+    
+    round_stats = "\n".join(VoteScheduler.format_stats(stats, "筛选") for stats in scheduler.round_stats)
+    prefilter_text = format_prefilter_report(prefilter_report) + "\n" if prefilter_report else ""
+    dedup_text = format_dedup_report(final_data["dedup"]) + "\n" if dedup else ""
+    
+    result_text = f"""
+粗筛完成！
+
+处理统计：
+- 总论文数：{len(papers_data)}
+{prefilter_text}{dedup_text}- 本次评估：{len(papers_to_screen)} 篇（复用上次相关结果 {len(reused_relevant)} 篇）
+- 判定缓存命中：{cache_hits} 次
+- 从断点日志恢复：{journal.resumed} 次
+- 处理轮数：{rounds} 轮（实际执行 {len(scheduler.round_stats)} 轮，投票规则 {vote_rule}，需要 {scheduler.threshold} 票）
+- 最大并发数：{max_concurrent}
+- 每个请求的标题数：{1 if batch_mode else batch_size}{'（Batch API 模式）' if batch_mode else ''}
+{round_stats}
+- 最终结果：{len(final_relevant_papers)} 篇
+
+API 用量：
+{format_usage_report(final_data['usage'])}
+
+结果已保存到：{output_file}
+"""
+    
+    return result_text
+
+async def fine_screening(input_json_file, system_prompt, config, progress_callback=None, incremental=False, client=None):
+    """精排处理；incremental 为 True 时只评估相对上次结果新增或内容变化的论文，client 同 coarse_screening"""
+    if not os.path.exists(input_json_file):
+        return f"错误：文件 {input_json_file} 不存在"
+    
+    try:
+        papers_data = PaperSource()
+        count = await papers_data.add_file(input_json_file, key='relevant_papers')
+        print(f"读取粗排结果: {count} 篇论文")
+    except Exception as e:
+        return f"读取或解析文件 {input_json_file} 失败: {e}"
+
+    final_output_file = get_filename_with_suffix(input_json_file, 'fine_final')
+    papers_to_screen, reused_relevant, screened_hashes = await plan_incremental_screening(
+        papers_data, final_output_file, incremental
+    )
+    papers_to_screen, dedup = apply_dedup(papers_to_screen, config)
+
+    client = client or create_client(config)
+    batch_mode = config.get("batch_mode", False)
+    usage = UsageTracker(client.model, get_model_price(config, client.model), config.get("batch_price_factor", 0.5))
+    
+    rounds = config.get("rounds", 3)
+    max_concurrent = config.get("max_concurrent", 50)
+    vote_rule = config.get("vote_rule", "union")
+    scheduler = VoteScheduler(rounds, get_vote_threshold(config, rounds))
+    cache = get_verdict_cache(config)
+    cache_hits_before = cache.hits if cache else 0
+    journal = ScreeningJournal(ScreeningJournal.path_for(final_output_file), {
+        "stage": "fine",
+        "model": client.model,
+        "prompt": ScreeningJournal.prompt_hash(system_prompt),
+        "inputs": [input_json_file],
+        "rounds": rounds,
+        "vote_rule": vote_rule,
+        "vote_threshold": scheduler.threshold
+    })
+    
+    for round_num in range(1, rounds + 1):
+        if scheduler.finished():
+            print(f"所有论文的结论均已确定，跳过第 {round_num} 轮及之后的精排")
+            break
+        if progress_callback:
+            progress_callback(0, f"开始第{round_num}轮精排...")
+        
+        if batch_mode:
+            relevant_papers = await process_papers_batch_job(
+                client, scheduler.round_source(papers_to_screen), system_prompt, round_num, max_concurrent, True, config,
+                get_batch_state_path(final_output_file, round_num), progress_callback, cache, journal, usage
+            )
+        else:
+            relevant_papers = await process_papers_single_round(
+                client, scheduler.round_source(papers_to_screen), system_prompt, round_num, max_concurrent, True, progress_callback, cache, journal=journal, usage=usage
+            )
+        round_stats = scheduler.record_round(round_num, relevant_papers)
+        if not round_stats["asked"]:
+            print(f"第 {round_num} 轮没有需要评估的论文，保留已有的逐轮精排结果文件")
+            continue
+        
+        round_data = {
+            "round": round_num,
+            "type": "fine_ranking",
+            "input_papers": len(papers_data),
+            "asked_papers": round_stats["asked"],
+            "relevant_papers_count": len(relevant_papers),
+            "relevant_papers": relevant_papers
+        }
+        
+        output_file = get_filename_with_suffix(input_json_file, f'fine_round_{round_num}')
+        async with aiofiles.open(output_file, 'w', encoding='utf-8') as f:
+            await f.write(json.dumps(round_data, ensure_ascii=False, indent=2))
+        
+        print(f"第 {round_num} 轮精排结果已保存到 {output_file}")
+    
+    cache_hits = 0
+    if cache:
+        cache_hits = cache.hits - cache_hits_before
+        cache.flush()
+    
+    all_relevant_papers = {}
+    for paper in reused_relevant + fan_out_duplicates(dedup, scheduler.final_relevant()):
+        if paper.get('title'):
+            all_relevant_papers[get_merge_key(dedup, paper)] = paper
+    
+    final_relevant_papers = list(all_relevant_papers.values())
+    
+    final_data = {
+        "type": "fine_ranking_final",
+        "input_papers": len(papers_data),
+        "rounds_count": rounds,
+        "max_concurrent": max_concurrent,
+        "batch_mode": batch_mode,
+        "vote_rule": vote_rule,
+        "vote_threshold": scheduler.threshold,
+        "rounds_executed": len(scheduler.round_stats),
+        "round_results": scheduler.round_stats,
+        "screened_papers_this_run": len(papers_to_screen),
+        "reused_relevant_papers_count": len(reused_relevant),
+        "verdict_cache_hits": cache_hits,
+        "resumed_verdicts": journal.resumed,
+        "dedup": dedup.report() if dedup else None,
+        "duplicate_groups": dedup.duplicate_groups() if dedup else {},
+        "usage": usage.summary("fine"),
+        "final_relevant_papers_count": len(final_relevant_papers),
+        "selection_rate": f"{len(final_relevant_papers)/len(papers_data)*100:.1f}%" if len(papers_data) > 0 else "0.0%",
+        "relevant_papers": sorted(final_relevant_papers, key=lambda x: x.get('title', '')),
+        "screened_papers": screened_hashes
+    }
+    
+    output_file = final_output_file
+    async with aiofiles.open(output_file, 'w', encoding='utf-8') as f:
+        await f.write(json.dumps(final_data, ensure_ascii=False, indent=2))
+    journal.close(completed=True)
+    
+    round_stats = "\n".join(VoteScheduler.format_stats(stats, "精排") for stats in scheduler.round_stats)
+    dedup_text = format_dedup_report(final_data["dedup"]) + "\n" if dedup else ""
+    
+    result_text = f"""
+精排完成！
+
+处理统计：
+- 输入论文数：{len(papers_data)}
+{dedup_text}- 本次评估：{len(papers_to_screen)} 篇（复用上次相关结果 {len(reused_relevant)} 篇）
+- 判定缓存命中：{cache_hits} 次
+- 从断点日志恢复：{journal.resumed} 次
+- 处理轮数：{rounds} 轮（实际执行 {len(scheduler.round_stats)} 轮，投票规则 {vote_rule}，需要 {scheduler.threshold} 票）
+- 最大并发数：{max_concurrent}{'（Batch API 模式）' if batch_mode else ''}
+{round_stats}
+- 最终结果：{len(final_relevant_papers)} 篇
+- 精排率：{final_data['selection_rate']}
+
+API 用量：
+{format_usage_report(final_data['usage'])}
+
+结果已保存到：{output_file}
+"""
+    
+    return result_text
+
+async def ask_paper(client, paper, system_prompt, is_fine, round_num, cache, journal=None, usage=None):
+    """流水线模式下评估一篇论文的一轮：先查断点日志和判定缓存，都没有时通过客户端共享的并发控制器调用 API"""
+    build_user_content = build_fine_user_content if is_fine else build_coarse_user_content
+    stage = "fine" if is_fine else "coarse"
+    if journal is not None:
+        resumed_verdict = journal.get(stage, round_num, paper)
+        if resumed_verdict is not None:
+            return resumed_verdict
+    cache_key = None
+    if cache is not None:
+        cache_key = VerdictCache.make_key(client.model, system_prompt, "fine" if is_fine else "coarse", round_num, build_user_content(paper))
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    usage_scope = usage.scope(stage, round_num) if usage is not None else None
+    if usage_scope is not None:
+        usage_scope.add_papers(1)
+    if is_fine:
+        _, is_relevant = await check_paper_relevance_detailed_with_retry(client, paper, system_prompt, usage=usage_scope)
+    else:
+        _, is_relevant = await check_paper_relevance_with_retry(client, paper, system_prompt, usage=usage_scope)
+    if is_relevant is not None:
+        if cache_key:
+            cache.put(cache_key, is_relevant)
+        if journal is not None:
+            journal.record(stage, round_num, paper, is_relevant)
+    return is_relevant
+
+async def vote_paper(client, paper, system_prompt, is_fine, scheduler, cache, journal=None, usage=None):
+    """对一篇论文逐轮投票直到按聚合规则得出结论，返回 [(轮次, 判定)]"""
+    history = []
+    votes = 0
+    for round_num in range(1, scheduler.rounds + 1):
+        is_relevant = bool(await ask_paper(client, paper, system_prompt, is_fine, round_num, cache, journal, usage))
+        history.append((round_num, is_relevant))
+        votes += is_relevant
+        if scheduler.decide(votes, round_num) is not None:
+            break
+    return history
+
+class PipelineStage:
+    """流水线中一个阶段的逐轮记录，结束后按轮次回放给 VoteScheduler 得到与分阶段模式相同的统计"""
+
+    def __init__(self, rounds, threshold):
+        self.scheduler = VoteScheduler(rounds, threshold)
+        self.round_papers = {round_num: [] for round_num in range(1, rounds + 1)}
+        self.round_asked = {round_num: set() for round_num in range(1, rounds + 1)}
+        self.screened_hashes = {}
+
+    def record(self, paper, history):
+        key = get_paper_key(paper)
+        self.screened_hashes[key] = get_content_hash(paper)
+        for round_num, is_relevant in history:
+            self.round_asked[round_num].add(key)
+            if is_relevant:
+                self.round_papers[round_num].append(paper)
+
+    def finish(self):
+        for round_num in sorted(self.round_asked):
+            if self.round_asked[round_num]:
+                self.scheduler.record_round(round_num, self.round_papers[round_num], self.round_asked[round_num])
+        relevant = {}
+        for paper in self.scheduler.final_relevant():
+            relevant[paper['title']] = paper
+        return sorted(relevant.values(), key=lambda x: x.get('title', ''))
+
+async def write_json_file(path, data):
+    async with aiofiles.open(path, 'w', encoding='utf-8') as f:
+        await f.write(json.dumps(data, ensure_ascii=False, indent=2))
+
+async def pipeline_screening(main_json_file, findings_json_file, coarse_prompt, fine_prompt, config, progress_callback=None, client=None):
+    """
+    粗筛 -> 精排流水线：论文经异步队列流动，粗筛确定为相关后立即进入精排，两个阶段共享同一个并发预算，
+    总耗时取决于较慢的阶段而不是两个阶段之和。每篇论文在各阶段内按投票规则逐轮评估直到结论确定，
+    结束后照常写出粗筛和精排的逐轮文件与最终文件。流水线模式逐篇实时请求，不使用粗筛批量模式、Batch API 模式和增量模式。
+    """
+    papers_data, error = await load_coarse_input(main_json_file, findings_json_file)
+    if error:
+        return error
+    papers_to_screen, prefilter_report = apply_prefilter(papers_data, config)
+    papers_to_screen, dedup = apply_dedup(papers_to_screen, config)
+    
+    client = client or create_client(config)
+    usage = UsageTracker(client.model, get_model_price(config, client.model))
+    
+    rounds = config.get("rounds", 3)
+    max_concurrent = config.get("max_concurrent", 50)
+    vote_rule = config.get("vote_rule", "union")
+    threshold = get_vote_threshold(config, rounds)
+    cache = get_verdict_cache(config)
+    cache_hits_before = cache.hits if cache else 0
+    coarse_stage = PipelineStage(rounds, threshold)
+    fine_stage = PipelineStage(rounds, threshold)
+    coarse_output_file = get_filename_with_suffix(main_json_file, 'coarse_final')
+    # 与分阶段运行的日志分开存放，互不覆盖
+    journal = ScreeningJournal(ScreeningJournal.path_for(get_filename_with_suffix(main_json_file, 'coarse_pipeline')), {
+        "stage": "pipeline",
+        "model": client.model,
+        "prompt": ScreeningJournal.prompt_hash(coarse_prompt),
+        "fine_prompt": ScreeningJournal.prompt_hash(fine_prompt),
+        "inputs": [main_json_file, findings_json_file or ""],
+        "rounds": rounds,
+        "vote_rule": vote_rule,
+        "vote_threshold": threshold
+    })
+    
+    paper_queue = asyncio.Queue(maxsize=max_concurrent * 2)
+    fine_queue = asyncio.Queue(maxsize=max_concurrent * 2)
+    total = len(papers_to_screen)
+    counts = {"coarse_done": 0, "fine_queued": 0, "fine_done": 0}
+    start_time = time.monotonic()
+    print(f"流水线开始处理 {total} 篇论文，共享并发数 {max_concurrent}")
+    
+    def report():
+        if progress_callback and total > 0:
+            progress_callback(
+                counts["coarse_done"] / total,
+                f"流水线：粗筛 {counts['coarse_done']}/{total}，精排 {counts['fine_done']}/{counts['fine_queued']}（当前并发上限 {client.limiter.current_limit}）"
+            )
+    
+    async def coarse_worker():
+        while True:
+            paper = await paper_queue.get()
+            if paper is None:
+                return
+            if paper.get('title'):
+                history = await vote_paper(client, paper, coarse_prompt, False, coarse_stage.scheduler, cache, journal, usage)
+                coarse_stage.record(paper, history)
+                if sum(is_relevant for _, is_relevant in history) >= threshold:
+                    counts["fine_queued"] += 1
+                    await fine_queue.put(paper)
+            counts["coarse_done"] += 1
+            report()
+    
+    async def fine_worker():
+        while True:
+            paper = await fine_queue.get()
+            if paper is None:
+                return
+            history = await vote_paper(client, paper, fine_prompt, True, fine_stage.scheduler, cache, journal, usage)
+            fine_stage.record(paper, history)
+            counts["fine_done"] += 1
+            report()
+    
+    coarse_tasks = [asyncio.create_task(coarse_worker()) for _ in range(max_concurrent)]
+    fine_tasks = [asyncio.create_task(fine_worker()) for _ in range(max_concurrent)]
+    for paper in papers_to_screen:
+        await paper_queue.put(paper)
+    for _ in coarse_tasks:
+        await paper_queue.put(None)
+    await asyncio.gather(*coarse_tasks)
+    for _ in fine_tasks:
+        await fine_queue.put(None)
+    await asyncio.gather(*fine_tasks)
+    elapsed = time.monotonic() - start_time
+    
+    cache_hits = 0
+    if cache:
+        cache_hits = cache.hits - cache_hits_before
+        cache.flush()
+    
+    # 粗筛输出
+    coarse_relevant = sorted(fan_out_duplicates(dedup, coarse_stage.finish()), key=lambda x: x.get('title', ''))
+    for round_num, papers in coarse_stage.round_papers.items():
+        if not coarse_stage.round_asked[round_num]:
+            continue
+        await write_json_file(get_filename_with_suffix(main_json_file, f'coarse_round_{round_num}'), {
+            "round": round_num,
+            "total_papers": len(papers_data),
+            "asked_papers": len(coarse_stage.round_asked[round_num]),
+            "relevant_papers_count": len(papers),
+            "relevant_papers": papers
+        })
+    await write_json_file(coarse_output_file, {
+        "total_papers": len(papers_data),
+        "pipeline": True,
+        "rounds_count": rounds,
+        "max_concurrent": max_concurrent,
+        "vote_rule": vote_rule,
+        "vote_threshold": threshold,
+        "rounds_executed": len(coarse_stage.scheduler.round_stats),
+        "round_results": coarse_stage.scheduler.round_stats,
+        "screened_papers_this_run": len(papers_to_screen),
+        "reused_relevant_papers_count": 0,
+        "prefilter": prefilter_report,
+        "dedup": dedup.report() if dedup else None,
+        "duplicate_groups": dedup.duplicate_groups() if dedup else {},
+        "usage": usage.summary("coarse"),
+        "final_relevant_papers_count": len(coarse_relevant),
+        "relevant_papers": coarse_relevant,
+        "screened_papers": coarse_stage.screened_hashes
+    })
+    
+    # 精排输出，文件名与对粗筛结果单独执行精排时一致
+    fine_relevant = sorted(fan_out_duplicates(dedup, fine_stage.finish()), key=lambda x: x.get('title', ''))
+    for round_num, papers in fine_stage.round_papers.items():
+        if not fine_stage.round_asked[round_num]:
+            continue
+        await write_json_file(get_filename_with_suffix(coarse_output_file, f'fine_round_{round_num}'), {
+            "round": round_num,
+            "type": "fine_ranking",
+            "input_papers": len(coarse_relevant),
+            "asked_papers": len(fine_stage.round_asked[round_num]),
+            "relevant_papers_count": len(papers),
+            "relevant_papers": papers
+        })
+    selection_rate = f"{len(fine_relevant)/len(coarse_relevant)*100:.1f}%" if coarse_relevant else "0.0%"
+    fine_output_file = get_filename_with_suffix(coarse_output_file, 'fine_final')
+    await write_json_file(fine_output_file, {
+        "type": "fine_ranking_final",
+        "pipeline": True,
+        "input_papers": len(coarse_relevant),
+        "rounds_count": rounds,
+        "max_concurrent": max_concurrent,
+        "vote_rule": vote_rule,
+        "vote_threshold": threshold,
+        "rounds_executed": len(fine_stage.scheduler.round_stats),
+        "round_results": fine_stage.scheduler.round_stats,
+        "screened_papers_this_run": len(coarse_relevant),
+        "reused_relevant_papers_count": 0,
+        "usage": usage.summary("fine"),
+        "final_relevant_papers_count": len(fine_relevant),
+        "selection_rate": selection_rate,
+        "relevant_papers": fine_relevant,
+        "screened_papers": fine_stage.screened_hashes
+    })
+    journal.close(completed=True)
+    
+    coarse_stats = "\n".join(VoteScheduler.format_stats(stats, "粗筛") for stats in coarse_stage.scheduler.round_stats)
+    fine_stats = "\n".join(VoteScheduler.format_stats(stats, "精排") for stats in fine_stage.scheduler.round_stats)
+    prefilter_text = format_prefilter_report(prefilter_report) + "\n" if prefilter_report else ""
+    dedup_text = format_dedup_report(dedup.report()) + "\n" if dedup else ""
+    return f"""
+流水线筛选完成！
+
+处理统计：
+- 总论文数：{len(papers_data)}
+{prefilter_text}{dedup_text}- 共享并发数上限：{max_concurrent}（结束时 {client.limiter.current_limit}，被限流 {client.limiter.throttled} 次）
+- 投票规则：{vote_rule}，{rounds} 轮中需要 {threshold} 票
+- 判定缓存命中：{cache_hits} 次
+- 从断点日志恢复：{journal.resumed} 次
+- 总耗时：{elapsed:.1f} 秒
+{coarse_stats}
+- 粗筛结果：{len(coarse_relevant)} 篇
+{fine_stats}
+- 精排结果：{len(fine_relevant)} 篇（精排率 {selection_rate}）
+
+API 用量（粗筛 + 精排）：
+{format_usage_report(usage.summary())}
+
+粗筛结果已保存到：{coarse_output_file}
+精排结果已保存到：{fine_output_file}
+"""
@@ -0,0 +1,13 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def work_dir(tmp_path, monkeypatch):
+    # 爬虫和筛选系统都使用相对路径，每个测试在独立的临时目录中运行
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,66 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from batch_mock_server import BatchStandIn
+from screening_core import (
+    COARSE_BATCH_INSTRUCTION, COARSE_SYSTEM_PROMPT, build_coarse_batch_user_content, parse_batch_verdicts,
+    read_batch_results
+)
+
+TITLES = [
+    "Emotional Support Conversation with Large Language Models",
+    "Efficient Sparse Attention for Long Context",
+    "A Multi-Turn Dialogue Benchmark",
+    "Quantization of Vision Transformers",
+    "Psychological Counseling Agents",
+]
+
+
+def test_stand_in_answers_every_batched_title():
+    papers = [{"title": title} for title in TITLES]
+    messages = [
+        {"role": "system", "content": COARSE_SYSTEM_PROMPT.rstrip() + "\n" + COARSE_BATCH_INSTRUCTION.format(count=len(papers))},
+        {"role": "user", "content": build_coarse_batch_user_content(papers)},
+    ]
+    answer = BatchStandIn().judge(messages)["choices"][0]["message"]["content"]
+    verdicts = parse_batch_verdicts(answer, len(papers))
+    assert len(papers) - len(verdicts) == 0
+    assert verdicts == {1: True, 2: False, 3: True, 4: False, 5: True}
+
+
+def test_stand_in_single_title():
+    messages = [
+        {"role": "system", "content": COARSE_SYSTEM_PROMPT},
+        {"role": "user", "content": "论文标题: 1. Chatbot Evaluation"},
+    ]
+    assert BatchStandIn().judge(messages)["choices"][0]["message"]["content"] == "True"
+
+
+class FakeFiles:
+    def __init__(self, contents):
+        self.contents = contents
+
+    async def content(self, file_id):
+        return SimpleNamespace(text=self.contents[file_id])
+
+
+def result_line(custom_id, status_code=200, body=None, error=None):
+    return json.dumps({"custom_id": custom_id, "error": error, "response": {"status_code": status_code, "body": body}})
+
+
+def test_read_batch_results_skips_empty_answers():
+    answer = {"choices": [{"message": {"content": "True"}}], "usage": {"prompt_tokens": 10, "completion_tokens": 1}}
+    output = "\n".join([
+        result_line("ok", body=answer),
+        result_line("no-choices", body={"usage": {}}),
+        result_line("empty-choices", body={"choices": []}),
+        result_line("null-content", body={"choices": [{"message": {"content": None}}]}),
+        result_line("server-error", status_code=500),
+    ])
+    errors = result_line("expired", status_code=None, error={"code": "batch_expired"})
+    client = SimpleNamespace(files=FakeFiles({"out": output, "err": errors}))
+    batch = SimpleNamespace(output_file_id="out", error_file_id="err")
+
+    # 没有结论的请求都不出现在结果中，由调用方改为实时请求
+    assert asyncio.run(read_batch_results(client, batch)) == {"ok": True}
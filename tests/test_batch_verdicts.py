@@ -0,0 +1,39 @@
+import pytest
+
+from screening_core import parse_batch_verdicts
+
+
+@pytest.mark.parametrize("text, count, expected", [
+    ("1: True\n2: False", 2, {1: True, 2: False}),
+    ("1. True", 1, {1: True}),
+    ("[2] false", 2, {2: False}),
+    ("**3**: True", 3, {3: True}),
+    ("4：True", 4, {4: True}),
+    ("5、FALSE", 5, {5: False}),
+    ("(1) True\n#2 - False", 2, {1: True, 2: False}),
+    ("1: **True**\n2: `False`", 2, {1: True, 2: False}),
+    # 缺失的行不出现在结果中
+    ("1: True\n3: False", 3, {1: True, 3: False}),
+    # 重复且一致的编号保留，互相矛盾的编号视为格式错误
+    ("1: True\n1: True\n2: True\n2: False", 2, {1: True}),
+    # 超出范围的编号忽略
+    ("0: True\n3: True\n2: False", 2, {2: False}),
+    # 模型附带的说明文字忽略
+    ("Here are my answers:\n1: True (about counseling)\n2: False\nHope this helps.", 2, {1: True, 2: False}),
+    ("", 2, {}),
+])
+def test_parse_batch_verdicts(text, count, expected):
+    assert parse_batch_verdicts(text, count) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "1: Maybe",
+    "1: Not True",
+    "1: Yes",
+    "1: unsure, possibly False",
+    "True",
+    "Answer 1 is True",
+])
+def test_malformed_answer_is_missing_not_false(text):
+    # 无法解析的条目不能被当作 False，必须缺失以便逐条重试
+    assert 1 not in parse_batch_verdicts(text, 1)
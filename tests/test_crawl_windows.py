@@ -0,0 +1,153 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import arxiv_crawler
+from arxiv_crawler import (
+    Config, CrawlLedger, FailedIntervalQueue, FailedIntervalRetryWorker, RateLimiter, plan_time_windows, split_time_range
+)
+
+
+def test_rate_limiter_spaces_requests_across_threads():
+    limiter = RateLimiter(0.05)
+    times = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(3):
+            limiter.acquire()
+            with lock:
+                times.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 12 次请求共享同一个限速器，首尾至少相隔 11 个间隔
+    assert len(times) == 12
+    assert max(times) - min(times) >= 11 * 0.05 * 0.9
+
+
+def day(n, hour=0):
+    return datetime(2024, 3, 1, hour, tzinfo=timezone.utc) + timedelta(days=n - 1)
+
+
+def assert_contiguous(windows, start, end):
+    assert windows[0][0] == start
+    assert windows[-1][1] == end
+    for window_start, window_end in windows:
+        assert window_start < window_end
+    for (_, previous_end), (next_start, _) in zip(windows, windows[1:]):
+        assert previous_end == next_start
+
+
+@pytest.mark.parametrize("density", [
+    {},
+    {day(n).date().isoformat(): 10 for n in range(1, 31)},
+    {day(n).date().isoformat(): 2000 for n in range(1, 31)},
+    {day(n).date().isoformat(): (5 if n % 3 else 1800) for n in range(1, 31)},
+])
+def test_plan_time_windows_is_contiguous(density):
+    start, end = day(1, 6) + timedelta(minutes=30), day(20, 18)
+    assert_contiguous(plan_time_windows(start, end, density), start, end)
+
+
+def test_plan_time_windows_merges_sparse_days():
+    density = {day(n).date().isoformat(): 10 for n in range(1, 31)}
+    windows = plan_time_windows(day(1), day(29), density)
+    assert_contiguous(windows, day(1), day(29))
+    assert len(windows) == 4
+    assert all(end - start <= timedelta(days=Config.MAX_WINDOW_DAYS) for start, end in windows)
+
+
+def test_plan_time_windows_splits_dense_day():
+    density = {day(2).date().isoformat(): Config.WINDOW_TARGET_RESULTS * 4}
+    windows = plan_time_windows(day(2), day(3), density)
+    assert_contiguous(windows, day(2), day(3))
+    assert len(windows) == 4
+    assert all(end - start >= timedelta(minutes=Config.MIN_WINDOW_MINUTES) for start, end in windows)
+
+
+def test_split_time_range_is_contiguous():
+    start, end = day(1, 12), day(4, 6)
+    ranges = split_time_range(start, end)
+    assert_contiguous(ranges, start, end)
+    assert len(ranges) == 3
+
+
+def test_ledger_pending_ranges(tmp_path):
+    ledger = CrawlLedger(tmp_path / "crawl_ledger.jsonl")
+    assert ledger.pending_ranges("full_2024", day(1), day(10)) == [(day(1), day(10))]
+
+    ledger.record("full_2024", day(2), day(4), [{"arxiv_id": "2403.00001v1"}])
+    ledger.record("full_2024", day(3), day(5), [])
+    ledger.record("full_2024", day(8), day(12), [])
+    ledger.record("full_2025", day(1), day(10), [])
+    expected = [(day(1), day(2)), (day(5), day(8))]
+    assert ledger.pending_ranges("full_2024", day(1), day(10)) == expected
+
+    ledger.record("full_2024", day(1), day(2), [])
+    ledger.record("full_2024", day(5), day(7), [])
+    assert ledger.pending_ranges("full_2024", day(1), day(10)) == [(day(7), day(8))]
+
+    # 写入中断留下的半行视为该区间未完成
+    with open(tmp_path / "crawl_ledger.jsonl", 'a', encoding='utf-8') as f:
+        f.write('{"job": "full_2024", "start": "2024-03-07T00:00:00+00:00", "end": "2024-03-08')
+    assert CrawlLedger(tmp_path / "crawl_ledger.jsonl").pending_ranges("full_2024", day(1), day(10)) == [(day(7), day(8))]
+
+
+def later():
+    return datetime.now(timezone.utc) + timedelta(hours=1)
+
+
+@pytest.fixture
+def retry_state(tmp_path, monkeypatch):
+    queue = FailedIntervalQueue(tmp_path / "failed_intervals.json")
+    ledger = CrawlLedger(tmp_path / "crawl_ledger.jsonl")
+    monkeypatch.setattr(arxiv_crawler, "failed_queue", queue)
+    monkeypatch.setattr(arxiv_crawler, "crawl_ledger", ledger)
+    monkeypatch.setattr(arxiv_crawler, "paper_store", arxiv_crawler.PaperStore())
+    monkeypatch.setattr(arxiv_crawler, "add_new_papers", lambda papers: None)
+    monkeypatch.setattr(Config, "RETRY_BASE_DELAY", 0)
+    return queue, ledger
+
+
+def test_failed_queue_merges_covered_intervals(retry_state):
+    queue, _ = retry_state
+    queue.add(day(1), day(3), "timeout", "full_2024")
+    queue.add(day(1), day(2), "HTTP 503", "full_2024")
+    queue.add(day(1), day(2), "HTTP 503")
+    entries = queue.due(later())
+    assert [(e["end"], e["job"], e["error"]) for e in entries] == [
+        (day(3).isoformat(), "full_2024", "HTTP 503"),
+        (day(2).isoformat(), None, "HTTP 503"),
+    ]
+
+
+def test_failed_queue_gives_up_after_max_attempts(retry_state, monkeypatch):
+    queue, _ = retry_state
+    monkeypatch.setattr(Config, "RETRY_MAX_ATTEMPTS", 2)
+    queue.add(day(1), day(2), "timeout")
+    entry = queue.due(later())[0]
+    assert queue.mark_retry_failed(entry, "timeout") == "pending"
+    assert queue.mark_retry_failed(entry, "timeout") == "failed"
+    assert queue.due(later()) == []
+    assert queue.counts() == {"pending": 0, "resolved": 0, "failed": 1}
+
+
+def test_retry_worker_records_recovered_interval(retry_state, monkeypatch):
+    queue, ledger = retry_state
+    results = {day(1): ([{"arxiv_id": "2403.00001v1"}], True), day(2): ([], False), day(3): ([], True)}
+    monkeypatch.setattr(arxiv_crawler, "search_window", lambda start, end, **kwargs: results[start])
+    queue.add(day(1), day(2), "timeout", "full_2024")
+    queue.add(day(2), day(3), "timeout", "full_2024")
+    queue.add(day(3), day(4), "timeout")
+
+    assert FailedIntervalRetryWorker().run_once() == 2
+    assert queue.counts() == {"pending": 1, "resolved": 2, "failed": 0}
+    # 恢复的区间写入所属任务的完成记录，续传时不再重新爬取；没有所属任务的区间不写入
+    assert ledger.pending_ranges("full_2024", day(1), day(4)) == [(day(2), day(4))]
+    assert [e["count"] for e in ledger.entries("full_2024")] == [1]
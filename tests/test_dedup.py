@@ -0,0 +1,83 @@
+import pytest
+
+from screening_core import Deduplicator, MinHashLSH, apply_dedup, fold_title, get_dedup_keys, get_merge_key
+
+ABSTRACT = (
+    "We present a benchmark for emotional support conversations in which a seeker describes a personal problem "
+    "and a supporter responds over many turns, and we evaluate large language models on strategy selection, "
+    "empathy and the quality of their suggestions with both automatic metrics and human raters."
+)
+
+
+def paper(title, **fields):
+    return dict({"title": title, "abstract": ""}, **fields)
+
+
+def test_fold_title():
+    assert fold_title("  Émotional-Support   Dialogue: A SURVEY!") == fold_title("emotional support dialogue — a survey")
+
+
+@pytest.mark.parametrize("record, expected", [
+    (paper("Some Long Paper Title", arxiv_id="2401.00001v3"), [("arxiv_id", "arxiv:2401.00001"), ("title", "title:somelongpapertitle")]),
+    (paper("Short", doi="10.48550/arXiv.2401.00001"), [("arxiv_id", "arxiv:2401.00001")]),
+    (paper("Short", url="https://arxiv.org/pdf/2401.00001v2.pdf"), [("arxiv_id", "arxiv:2401.00001")]),
+    (paper("Short", doi="https://doi.org/10.18653/V1/2024.ACL-LONG.1"), [("doi", "doi:10.18653/v1/2024.acl-long.1")]),
+    (paper("Preface"), []),
+])
+def test_dedup_keys(record, expected):
+    assert get_dedup_keys(record) == expected
+
+
+def test_groups_by_id_doi_title_and_abstract():
+    papers = [
+        paper("Emotional Support Conversations at Scale", arxiv_id="2401.00001v1"),
+        paper("Emotional Support Conversations at Scale", arxiv_id="2401.00001v2"),
+        paper("ESConv at Scale (preprint)", doi="10.48550/arXiv.2401.00001"),
+        paper("Counseling Dialogue Generation", doi="10.18653/v1/2024.acl-long.1"),
+        paper("Counseling Dialogue Generation with Strategies", doi="https://doi.org/10.18653/V1/2024.ACL-LONG.1"),
+        paper("Multi-Turn Dialogue Evaluation: A Survey"),
+        paper("multi-turn dialogue evaluation — a survey"),
+        paper("A Benchmark for Supportive Conversations", abstract=ABSTRACT),
+        paper("Benchmarking LLM Supporters", abstract=ABSTRACT.replace("human raters", "expert raters")),
+        paper("Sparse Attention for Long Context", abstract=ABSTRACT.replace("emotional support", "code review")[:120]),
+        paper("Preface"),
+        paper("Preface", arxiv_id="2401.09999"),
+    ]
+    dedup = Deduplicator(papers, 0.8)
+    report = dedup.report()
+    assert report["merged_by"] == {"same_key": 1, "arxiv_id": 1, "doi": 1, "title": 1, "abstract": 1}
+    assert report["input_papers"] == 12
+    assert report["unique_papers"] == 7
+    assert dedup.duplicate_groups() == {
+        "arxiv:2401.00001": ["title:ESConv at Scale (preprint)"],
+        "title:Counseling Dialogue Generation": ["title:Counseling Dialogue Generation with Strategies"],
+        "title:Multi-Turn Dialogue Evaluation: A Survey": ["title:multi-turn dialogue evaluation — a survey"],
+        "title:A Benchmark for Supportive Conversations": ["title:Benchmarking LLM Supporters"],
+    }
+
+    # 代表论文的结论沿用到副本
+    fanned = dedup.fan_out([papers[3], papers[5]])
+    assert [p["title"] for p in fanned] == [
+        "Counseling Dialogue Generation",
+        "Multi-Turn Dialogue Evaluation: A Survey",
+        "Counseling Dialogue Generation with Strategies",
+        "multi-turn dialogue evaluation — a survey",
+    ]
+
+
+def test_minhash_separates_different_abstracts():
+    lsh = MinHashLSH(0.8)
+    assert lsh.add("a", ABSTRACT) == []
+    assert lsh.add("b", ABSTRACT.replace("human raters", "expert raters")) == ["a"]
+    assert lsh.add("c", " ".join(reversed(ABSTRACT.split()))) == []
+    assert lsh.add("d", "too short to compare") == []
+
+
+def test_dedup_is_opt_in():
+    papers = [paper("Multi-Turn Dialogue Evaluation: A Survey"), paper("multi-turn dialogue evaluation — a survey")]
+    assert apply_dedup(papers, {}) == (papers, None)
+    assert get_merge_key(None, papers[0]) == papers[0]["title"]
+
+    screened, dedup = apply_dedup(papers, {"dedup_enabled": True})
+    assert [p["title"] for p in screened] == ["Multi-Turn Dialogue Evaluation: A Survey"]
+    assert get_merge_key(dedup, papers[1]) == "title:multi-turn dialogue evaluation — a survey"
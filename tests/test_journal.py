@@ -0,0 +1,52 @@
+from screening_core import ScreeningJournal
+
+HEADER = {"stage": "coarse", "model": "m", "prompt": "p", "input": "papers.json", "rounds": 3, "vote_rule": "union"}
+PAPER = {"arxiv_id": "2403.00001v1", "title": "Emotional Support Conversation", "abstract": "..."}
+OTHER = {"arxiv_id": "2403.00002v1", "title": "Sparse Attention", "abstract": "..."}
+
+
+def test_path_for():
+    assert ScreeningJournal.path_for("out/papers_coarse_final.json") == "out/papers_coarse_final.journal.jsonl"
+
+
+def test_resume_after_crash(tmp_path):
+    path = str(tmp_path / "papers.journal.jsonl")
+    journal = ScreeningJournal(path, HEADER)
+    journal.record("coarse", 1, PAPER, True)
+    journal.record("coarse", 1, OTHER, False)
+    # 模拟进程崩溃：不调用 close，最后一行只写了一半
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"stage": "coarse", "round": 2, "key"')
+
+    resumed = ScreeningJournal(path, HEADER)
+    assert resumed.get("coarse", 1, PAPER) is True
+    assert resumed.get("coarse", 1, OTHER) is False
+    assert resumed.get("coarse", 2, PAPER) is None
+    assert resumed.get("fine", 1, PAPER) is None
+    # 新版本的同一论文内容变化时重新评估
+    assert resumed.get("coarse", 1, dict(PAPER, arxiv_id="2403.00001v2", abstract="revised")) is None
+    assert resumed.get("coarse", 1, dict(PAPER, arxiv_id="2403.00001v2")) is True
+    assert resumed.resumed == 3
+    resumed.close(False)
+
+
+def test_changed_parameters_start_over(tmp_path):
+    path = str(tmp_path / "papers.journal.jsonl")
+    journal = ScreeningJournal(path, HEADER)
+    journal.record("coarse", 1, PAPER, True)
+    journal.close(False)
+
+    restarted = ScreeningJournal(path, dict(HEADER, rounds=5))
+    assert restarted.get("coarse", 1, PAPER) is None
+    restarted.close(False)
+    fresh = ScreeningJournal(path, HEADER)
+    assert fresh.entries == {}
+    fresh.close(False)
+
+
+def test_close_after_completion_removes_journal(tmp_path):
+    path = tmp_path / "papers.journal.jsonl"
+    journal = ScreeningJournal(str(path), HEADER)
+    journal.record("coarse", 1, PAPER, True)
+    journal.close(True)
+    assert not path.exists()
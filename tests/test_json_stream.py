@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from screening_core import iter_json_array_records, iter_json_papers
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+DOCUMENT = {
+    "metadata": {"source": "arXiv", "keywords": ["dialogue", "emotion"], "total": 3, "nested": {"a": [1, {"b": None}]}},
+    "papers": [
+        {"title": "Emotional Support: \"Quotes\", [brackets] and {braces}", "authors": ["张三", "Zoë"], "score": 1.5e-3},
+        {"title": "Escapes \\ \n \t ☃", "year": 2024, "big": 12345678901234567890, "neg": -0.25, "flag": True},
+        "not a paper",
+        [],
+        {},
+    ],
+    "trailing": {"papers": ["ignored"]},
+}
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 16])
+def test_stream_matches_json_load(tmp_path, indent, ensure_ascii, chunk_size):
+    path = tmp_path / "papers.json"
+    path.write_text(json.dumps(DOCUMENT, indent=indent, ensure_ascii=ensure_ascii), encoding='utf-8')
+    with open(path, 'r', encoding='utf-8') as f:
+        expected = json.load(f)["papers"]
+    assert list(iter_json_array_records(path, 'papers', chunk_size)) == expected
+
+
+@pytest.mark.parametrize("document", [{"metadata": {}}, {"papers": []}, {}, [{"title": "top-level array"}], {"papers": "x"}])
+def test_stream_without_records(tmp_path, document):
+    path = tmp_path / "papers.json"
+    path.write_text(json.dumps(document), encoding='utf-8')
+    assert list(iter_json_array_records(path, 'papers', 3)) == []
+
+
+@pytest.mark.parametrize("text", ['{"papers": [{"title": "a"} {"title": "b"}]}', '{"papers": [{"title": "a"}', '{"papers" [1]}'])
+def test_stream_rejects_malformed_json(tmp_path, text):
+    path = tmp_path / "papers.json"
+    path.write_text(text, encoding='utf-8')
+    with pytest.raises(ValueError):
+        list(iter_json_array_records(path, 'papers', 4))
+
+
+def test_stream_matches_json_load_on_repo_files():
+    for path in [REPO_DIR / "arxiv_2025_08_llm_papers_coarse_final.json", REPO_DIR / "acl_2024_main_papers.json"]:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for key in ("papers", "relevant_papers"):
+            if isinstance(data.get(key), list):
+                expected = [paper for paper in data[key] if isinstance(paper, dict)]
+                assert list(iter_json_papers(path, key)) == expected
+                assert list(iter_json_array_records(path, key, 257)) == data[key]
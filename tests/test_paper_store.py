@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from arxiv_crawler import Config, PaperStore, get_file_path_for_date, load_existing_papers
+
+
+def make_paper(arxiv_id, published="2024-03-05T10:00:00+00:00", title=None):
+    return {
+        "arxiv_id": arxiv_id,
+        "title": title or f"Paper {arxiv_id}",
+        "abstract": "",
+        "authors": [],
+        "published": published,
+    }
+
+
+def shard_papers(published="2024-03-05T10:00:00+00:00"):
+    shard_path = get_file_path_for_date(datetime.fromisoformat(published))
+    return {paper["arxiv_id"]: paper for paper in load_existing_papers(shard_path)}
+
+
+def shard_ids():
+    return sorted(shard_papers())
+
+
+def test_reload_from_index():
+    store = PaperStore()
+    store.add([make_paper("2403.00001v1"), make_paper("2403.00002v1")])
+    assert Config.ID_INDEX_PATH.exists()
+
+    # 新实例只从索引文件恢复，已存储的论文不会再次写入
+    reloaded = PaperStore()
+    assert reloaded.contains("2403.00001v1")
+    assert reloaded.contains("2403.00002v1")
+    assert not reloaded.contains("2403.00003v1")
+    reloaded.add([make_paper("2403.00001v1"), make_paper("2403.00003v1")])
+    reloaded.compact()
+    assert shard_ids() == ["2403.00001v1", "2403.00002v1", "2403.00003v1"]
+    assert reloaded.pending_shards() == []
+
+
+def test_rebuild_index_from_shards():
+    store = PaperStore()
+    store.add([make_paper("2403.00001v1")])
+    store.compact()
+    Config.ID_INDEX_PATH.unlink()
+
+    rebuilt = PaperStore()
+    assert rebuilt.contains("2403.00001v1")
+    assert Config.ID_INDEX_PATH.exists()
+
+
+
+def test_upsert_keeps_highest_version():
+    store = PaperStore()
+    store.add([make_paper("2403.00001v1"), make_paper("2403.00002v2")])
+
+    changes = store.add([make_paper("2403.00001v2", title="Revised")])
+    assert [c["arxiv_id"] for c in changes["updated"]] == ["2403.00001v2"]
+    assert changes["updated"][0]["previous_id"] == "2403.00001v1"
+    assert changes["added"] == []
+
+    # 相同或更低的版本被忽略；同一批次中出现多个版本时只保留最高版本
+    assert store.add([make_paper("2403.00002v1"), make_paper("2403.00002v2")]) == {"added": [], "updated": []}
+    changes = store.add([make_paper("2403.00003v2"), make_paper("2403.00003v1")])
+    assert [c["arxiv_id"] for c in changes["added"]] == ["2403.00003v2"]
+
+    store.compact()
+    assert shard_ids() == ["2403.00001v2", "2403.00002v2", "2403.00003v2"]
+    assert shard_papers()["2403.00001v2"]["title"] == "Revised"
+
+
+def test_upsert_versions_survive_reload():
+    PaperStore().add([make_paper("2403.00001v1")])
+    PaperStore().add([make_paper("2403.00001v3")])
+
+    # 索引中同一论文有多行时，重新加载后以最高版本为准
+    reloaded = PaperStore()
+    assert reloaded.contains("2403.00001")
+    assert reloaded.add([make_paper("2403.00001v2")]) == {"added": [], "updated": []}
+    changes = reloaded.add([make_paper("2403.00001v4")])
+    assert changes["updated"][0]["previous_id"] == "2403.00001v3"
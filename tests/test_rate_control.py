@@ -0,0 +1,131 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from screening_core import (
+    RATE_LIMIT_HEADROOM, AdaptiveConcurrency, RateLimiter, TokenBucket, estimate_tokens, get_rate_limiter, get_retry_after
+)
+
+
+def test_aimd_grows_additively_and_halves_once_per_wave():
+    async def scenario():
+        limiter = AdaptiveConcurrency(8, min_limit=2)
+        started_at = await limiter.acquire()
+        await limiter.release()
+        limiter.on_throttle(started_at)
+        assert limiter.current_limit == 4
+        # 同一波中更早发出的请求再被限流时不会继续减半
+        limiter.on_throttle(started_at)
+        assert limiter.current_limit == 4
+        assert limiter.throttled == 2
+
+        limiter.on_throttle(await limiter.acquire())
+        limiter.on_throttle(await limiter.acquire())
+        assert limiter.current_limit == 2
+
+        for _ in range(6):
+            limiter.on_success()
+        assert limiter.current_limit == 4
+        for _ in range(100):
+            limiter.on_success()
+        assert limiter.current_limit == 8
+
+    asyncio.run(scenario())
+
+
+def test_acquire_respects_current_limit():
+    async def scenario():
+        limiter = AdaptiveConcurrency(6)
+        limiter.limit = 2
+        peak = 0
+
+        async def task():
+            nonlocal peak
+            await limiter.acquire()
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+            await limiter.release()
+
+        await asyncio.gather(*(task() for _ in range(10)))
+        assert peak == 2
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_retry_after_pauses_new_requests():
+    async def scenario():
+        limiter = AdaptiveConcurrency(4)
+        loop = asyncio.get_running_loop()
+        limiter.on_throttle(loop.time(), retry_after=0.2)
+        begin = loop.time()
+        await limiter.acquire()
+        assert loop.time() - begin >= 0.15
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"retry-after": "3"}, 3.0),
+    ({"retry-after-ms": "1500"}, 1.5),
+    ({"retry-after": "-1"}, 0.0),
+    ({"retry-after": "soon"}, None),
+    ({}, None),
+])
+def test_get_retry_after(headers, expected):
+    error = SimpleNamespace(response=SimpleNamespace(headers=headers))
+    assert get_retry_after(error) == expected
+
+
+def test_token_bucket_reserves_ahead_and_refills():
+    bucket = TokenBucket(60)
+    capacity = 60 * RATE_LIMIT_HEADROOM
+    start = bucket.updated
+    assert bucket.reserve(capacity, start) == 0.0
+    # 余额为负时返回补足欠额所需的秒数，后续请求在此基础上继续排队
+    assert bucket.reserve(9, start) == pytest.approx(9 / bucket.rate)
+    assert bucket.reserve(9, start) == pytest.approx(18 / bucket.rate)
+    assert bucket.reserve(1, start + 60) == 0.0
+    # 单个请求超过整桶额度时按整桶计
+    assert bucket.reserve(10 * capacity, start + 120) == 0.0
+
+
+def test_token_bucket_adjust_and_configure():
+    bucket = TokenBucket(100)
+    bucket.adjust(30)
+    assert bucket.level == pytest.approx(100 * RATE_LIMIT_HEADROOM - 30)
+    bucket.adjust(-1000)
+    assert bucket.level == pytest.approx(bucket.capacity)
+    bucket.configure(10)
+    assert bucket.capacity == pytest.approx(10 * RATE_LIMIT_HEADROOM)
+    assert bucket.level == pytest.approx(bucket.capacity)
+
+
+def test_estimate_tokens_counts_cjk_per_character():
+    english = [{"role": "user", "content": "a" * 40}]
+    chinese = [{"role": "user", "content": "论文标题" * 10}]
+    assert estimate_tokens(english, 0) == 10 + 4
+    assert estimate_tokens(chinese, 0) == 40 + 4
+    assert estimate_tokens(english) == estimate_tokens(english, 0) + 8
+
+
+def test_rate_limiter_corrects_reservation_with_actual_usage():
+    limiter = RateLimiter(0, 1000)
+    assert limiter.request_bucket is None
+    asyncio.run(limiter.acquire(300))
+    level = limiter.token_bucket.level
+    limiter.record_usage(300, SimpleNamespace(usage=SimpleNamespace(total_tokens=100)))
+    assert limiter.token_bucket.level == pytest.approx(level + 200, abs=1)
+    limiter.record_usage(300, SimpleNamespace(usage=None))
+    assert limiter.token_bucket.level == pytest.approx(level + 200, abs=1)
+
+
+def test_rate_limiter_is_shared_per_provider_and_model():
+    config = {"base_url": "http://127.0.0.1:8766/v1/", "model": "m", "rpm_limit": 60, "tpm_limit": 0}
+    limiter = get_rate_limiter(config)
+    assert get_rate_limiter(dict(config, base_url="http://127.0.0.1:8766/v1")) is limiter
+    assert get_rate_limiter(dict(config, model="other")) is not limiter
+    assert get_rate_limiter(dict(config, rpm_limit=120)) is limiter
+    assert limiter.rpm_limit == 120
+    assert get_rate_limiter(dict(config, rpm_limit=0)) is None
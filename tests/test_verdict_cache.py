@@ -0,0 +1,57 @@
+import itertools
+
+import screening_core
+from screening_core import VerdictCache
+
+
+def make_key(title, round_num=1):
+    return VerdictCache.make_key("model", "prompt", "coarse", round_num, f"论文标题: {title}")
+
+
+def read_back(path, key):
+    return VerdictCache(path, 0, 0).get(key)
+
+
+def test_buffered_verdicts_are_saved_at_round_end(tmp_path):
+    path = tmp_path / "cache" / "verdict_cache.jsonl"
+    cache = VerdictCache(path, 0, 0)
+    cache.put(make_key("a"), True)
+    cache.put(make_key("b"), False)
+    assert cache.get(make_key("a")) is True
+    assert read_back(path, make_key("a")) is None
+
+    cache.save_pending()
+    assert read_back(path, make_key("a")) is True
+    assert read_back(path, make_key("b")) is False
+
+
+def test_buffer_is_appended_when_full_or_stale(tmp_path):
+    path = tmp_path / "verdict_cache.jsonl"
+    cache = VerdictCache(path, 0, 0)
+    for i in range(VerdictCache.APPEND_BATCH):
+        cache.put(make_key(i), True)
+    assert read_back(path, make_key(0)) is True
+
+    cache.APPEND_INTERVAL = 0
+    cache.put(make_key("late"), False)
+    assert read_back(path, make_key("late")) is False
+
+
+def test_key_depends_on_round():
+    assert make_key("a", 1) != make_key("a", 2)
+
+
+def test_flush_keeps_most_recently_used(tmp_path, monkeypatch):
+    clock = itertools.count(1000)
+    monkeypatch.setattr(screening_core.time, "time", lambda: next(clock))
+    path = tmp_path / "verdict_cache.jsonl"
+    cache = VerdictCache(path, 2, 0)
+    for title in ("a", "b", "c"):
+        cache.put(make_key(title), True)
+    cache.get(make_key("a"))
+    cache.flush()
+
+    reloaded = VerdictCache(path, 0, 0)
+    assert reloaded.get(make_key("a")) is True
+    assert reloaded.get(make_key("c")) is True
+    assert reloaded.get(make_key("b")) is None
@@ -0,0 +1,67 @@
+import pytest
+
+from screening_core import VoteScheduler, get_vote_threshold
+
+# 每篇论文在三轮中的判定
+VOTES = {
+    "A": [True, True, True],
+    "B": [True, False, True],
+    "C": [False, False, False],
+}
+
+
+def run_rounds(rule, rounds=3, **config):
+    papers = [{"title": title} for title in VOTES]
+    scheduler = VoteScheduler(rounds, get_vote_threshold(dict(config, vote_rule=rule), rounds))
+    asked_per_round = []
+    for round_num in range(1, rounds + 1):
+        asked = list(scheduler.round_source(papers))
+        asked_per_round.append(sorted(paper["title"] for paper in asked))
+        scheduler.record_round(round_num, [paper for paper in asked if VOTES[paper["title"]][round_num - 1]])
+        if scheduler.finished():
+            break
+    return sorted(paper["title"] for paper in scheduler.final_relevant()), asked_per_round
+
+
+@pytest.mark.parametrize("config, rounds, expected", [
+    ({"vote_rule": "union"}, 3, 1),
+    ({"vote_rule": "majority"}, 3, 2),
+    ({"vote_rule": "majority"}, 4, 3),
+    ({"vote_rule": "k_of_n", "vote_k": 2}, 3, 2),
+    ({"vote_rule": "k_of_n", "vote_k": 5}, 3, 3),
+    ({"vote_rule": "k_of_n", "vote_k": 0}, 3, 1),
+    ({}, 3, 1),
+])
+def test_vote_threshold(config, rounds, expected):
+    assert get_vote_threshold(config, rounds) == expected
+
+
+def test_unknown_vote_rule():
+    with pytest.raises(ValueError):
+        get_vote_threshold({"vote_rule": "unanimous"}, 3)
+
+
+def test_union_stops_asking_decided_papers():
+    relevant, asked = run_rounds("union")
+    assert relevant == ["A", "B"]
+    # 第一轮判为相关的论文已经确定，只有 C 继续参与后续轮次
+    assert asked == [["A", "B", "C"], ["C"], ["C"]]
+
+
+def test_majority():
+    relevant, asked = run_rounds("majority")
+    assert relevant == ["A", "B"]
+    assert asked == [["A", "B", "C"], ["A", "B", "C"], ["B"]]
+
+
+def test_k_of_n():
+    relevant, asked = run_rounds("k_of_n", vote_k=3)
+    assert relevant == ["A"]
+    # C 第一轮之后已不可能达到 3 票，B 第二轮之后同样如此
+    assert asked == [["A", "B", "C"], ["A", "B"], ["A"]]
+
+
+def test_single_round_decides_everything():
+    relevant, asked = run_rounds("majority", rounds=1)
+    assert relevant == ["A", "B"]
+    assert asked == [["A", "B", "C"]]